@@ -5,19 +5,44 @@
 # April 2018
 ################################
 
-# Call: sh FLYCOP.sh <consortiumPrefix> <Y> V<A> <fitnessFunction> <numberOfConfigurations>
+# Call: sh FLYCOP.sh <consortiumPrefix> <Y> V<A> <fitnessFunction> <numberOfConfigurations> [<numberOfWorkers> [<optimizer>]]
 # Example: sh FLYCOP.sh 'ecoliLongTerm' 2 V0 'Yield' 10
+# With numberOfWorkers>1, that number of SMAC processes run at the same time in shared model mode (each one also learns from the runs of
+# the others, in the same smac-output directory), with seeds <seed of the scenario>, <seed>+1, ..., and numberOfConfigurations in total.
+# The data analysis reads the SMAC run with the seed of the scenario; the results database (resultsDB) has the configurations of all of them.
+# With optimizer 'FLYCOPdriver', SMAC is not used: Scripts/FLYCOPdriver.py is a different optimizer (random configurations and neighbours
+# of the best one, each configuration evaluated once), with numberOfWorkers evaluations at the same time. Its results are not comparable
+# with those of SMAC.
 
 domainName=$1
 id=$2 # '20', '21', ...
 templateID=$3 # 'V0', 'V1', 'V2', 'V5' ...
 fitness=$4 # 'MaxGR', 'MaxYield'
 numOfRuns=$5 # 500, 10
+numWorkers=${6:-1} # 1, 4, 8 ...
+optimizer=${7:-smac} # 'smac', 'FLYCOPdriver'
 
 logFile=FLYCOP_${domainName}_${id}_log.txt
 
 cd MicrobialCommunities
-smac --scenario-file ../Scripts/${domainName}_confFLYCOP_scenario_v${id}.txt --validation false --numberOfRunsLimit ${numOfRuns} > $logFile
+# One-time preparation of the template (initialized models), shared by the workspaces where each configuration is evaluated
+python3 ../Scripts/workspacePool.py prepare ${domainName}_TemplateOptimizeConsortium${templateID} ${domainName}
+scenarioFile=../Scripts/${domainName}_confFLYCOP_scenario_v${id}.txt
+if [ "${optimizer}" = "FLYCOPdriver" ]; then
+    python3 ../Scripts/FLYCOPdriver.py --scenario-file ${scenarioFile} --numberOfRunsLimit ${numOfRuns} --workers ${numWorkers} > $logFile
+elif [ ${numWorkers} -gt 1 ]; then
+    seed=`egrep "^seed *=" ${scenarioFile} | cut -d= -f2 | tr -d ' '`
+    seed=${seed:-123}
+    runsPerWorker=$(( (numOfRuns+numWorkers-1)/numWorkers ))
+    smac --scenario-file ${scenarioFile} --validation false --numberOfRunsLimit ${runsPerWorker} --seed ${seed} --shared-model-mode true > $logFile &
+    for i in `seq 1 $((numWorkers-1))`; do
+        smac --scenario-file ${scenarioFile} --validation false --numberOfRunsLimit ${runsPerWorker} --seed $((seed+i)) --shared-model-mode true > ${logFile%.txt}_seed$((seed+i)).txt &
+    done
+    wait
+else
+    smac --scenario-file ../Scripts/${domainName}_confFLYCOP_scenario_v${id}.txt --validation false --numberOfRunsLimit ${numOfRuns} > $logFile
+fi
+python3 ../Scripts/workspacePool.py clean ${domainName}_TemplateOptimizeConsortium${templateID} ${domainName}_TestTempV${id}
 sh ../Scripts/FLYCOPanalyzingResults_${domainName}.sh ${id} ${templateID} $fitness ${numOfRuns}
 cd ..
 
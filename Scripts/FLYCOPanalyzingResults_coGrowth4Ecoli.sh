@@ -43,9 +43,14 @@ cd ../..
 mv smac-output/${domainName}_PlotsScenario${id}/ $dataAnalysisDir/
 rm -Rf smac-output/
 cd $dataAnalysisDir
-mv ${domainName}_PlotsScenario${id}/configurationsResults* configurationsResults_Scenario${id}.txt
-sort -k3 -r configurationsResults_Scenario${id}.txt | uniq > configurationsResults_Scenario${id}_sorted.txt 
-rm configurationsResults_Scenario${id}.txt
+if [ -f ${domainName}_PlotsScenario${id}/results.sqlite ]; then
+  # Results database (see Scripts/resultsDB.py): configurations table, unique and sorted by fitness
+  python3 ../../Scripts/resultsDB.py export ${domainName}_PlotsScenario${id}/ configurationsResults_Scenario${id}_sorted.txt
+else
+  mv ${domainName}_PlotsScenario${id}/configurationsResults* configurationsResults_Scenario${id}.txt
+  sort -k3 -r configurationsResults_Scenario${id}.txt | uniq > configurationsResults_Scenario${id}_sorted.txt 
+  rm configurationsResults_Scenario${id}.txt
+fi
 cd ..
 
 # 3.- R script to build scatterplot and correlations files
@@ -0,0 +1,298 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Concurrent optimization driver: a different optimizer than SMAC (FLYCOP.sh with optimizer 'FLYCOPdriver'), evaluating several consortium
+# configurations at the same time. It has no model of the fitness nor intensification (each configuration is evaluated once), so its results
+# are not comparable with those of SMAC (for parallel SMAC runs, see FLYCOP.sh with numberOfWorkers>1).
+# It reads the same SMAC scenario (*_confFLYCOP_scenario_v<Y>.txt) and parameter (*.pcs) files, and calls the same wrapper (algo in the scenario)
+# with SMAC arguments, keeping <workers> wrapper processes running (each one checks out its own workspace, see workspacePool).
+# As soon as any evaluation finishes, its result is taken into account to propose the next configuration (asynchronous search):
+# the default configuration first, and then, either a random configuration or a neighbour (one parameter changed to an adjacent value)
+# of the best configuration found so far.
+# Output, in the same files that FLYCOPanalyzingResults_*.sh read from a SMAC run:
+#   smac-output/<scenario>/state-run<seed>/runs_and_results-it<N>.csv, paramstrings-it<N>.txt (one line per run, in finishing order)
+#   smac-output/<scenario>/log-warn<seed>.txt (wrapper result lines), log-run<seed>.txt (final incumbent)
+#
+# Call (in MicrobialCommunities directory):
+#   python3 ../Scripts/FLYCOPdriver.py --scenario-file ../Scripts/ecoliLongTerm_confFLYCOP_scenario_v1.txt --numberOfRunsLimit 500 --workers 4
+
+import os
+import os.path
+import re
+import time
+import random
+import shlex
+import argparse
+import subprocess
+import concurrent.futures
+
+randomProb=0.5 # Probability of evaluating a random configuration, instead of a neighbour of the incumbent
+crashQuality=1.0 # Quality (to minimize) of a run without result line: fitness 0 in FLYCOP wrappers, which print 1-fitness
+maxCutoff=2147483647
+resultPattern=re.compile(r'Result (?:of algorithm run|for SMAC|for ParamILS):\s*(.*)')
+
+
+################################################################
+### FUNCTION read_scenario #####################################
+# SMAC scenario file as dictionary {option: value}
+def read_scenario(scenarioFile):
+    scenario={}
+    with open(scenarioFile) as f:
+        for line in f:
+            line=line.strip()
+            if(line=='' or line.startswith('#') or '=' not in line):
+                continue
+            key,value=line.split('=',1)
+            scenario[key.strip()]=value.strip().strip('"')
+    return scenario
+### end-function-read_scenario
+################################################################
+
+
+################################################################
+### FUNCTION read_pcs ##########################################
+def read_pcs(pcsFile):
+    '''
+    Call: params, forbidden = read_pcs(pcsFile)
+
+    INPUTS: pcsFile: SMAC parameter file, with ordinal or categorical parameters (e.g. p1_glu1 ordinal {-20,-18,-16} [-18])
+            and forbidden clauses as arithmetic expressions (e.g. { abs(p3_o21+p6_o22) > 30 }).
+    OUTPUT: params: list of (name, type ('ordinal' or 'categorical'), list of values as text, default value), in file order.
+            forbidden: list of python expressions of forbidden configurations.
+    '''
+    params=[]
+    forbidden=[]
+    with open(pcsFile) as f:
+        for line in f:
+            line=line.split('#')[0].strip()
+            if(line==''):
+                continue
+            m=re.match(r'^(\S+)\s+(ordinal|categorical)\s*\{(.*)\}\s*\[(.*)\]$',line)
+            if m:
+                values=[value.strip() for value in m.group(3).split(',')]
+                params.append((m.group(1),m.group(2),values,m.group(4).strip()))
+            elif(line.startswith('{') and line.endswith('}')):
+                forbidden.append(line[1:-1].strip())
+            else:
+                raise ValueError('Parameter line not supported in '+pcsFile+': '+line)
+    return params,forbidden
+### end-function-read_pcs
+################################################################
+
+
+################################################################
+### FUNCTION is_forbidden ######################################
+def is_forbidden(config,forbidden):
+    values={}
+    for name,value in config.items():
+        try:
+            values[name]=float(value)
+        except ValueError:
+            values[name]=value
+    return any(eval(expr,{'__builtins__':{},'abs':abs},values) for expr in forbidden)
+### end-function-is_forbidden
+################################################################
+
+
+################################################################
+### FUNCTION propose ###########################################
+def propose(params,forbidden,runs,seen,rng):
+    '''
+    Call: config = propose(params,forbidden,runs,seen,rng)
+
+    INPUTS: params, forbidden: see read_pcs.
+            runs: finished runs (dictionaries with 'config' and 'quality', to minimize).
+            seen: set of configurations (tuples of values) already evaluated or running.
+            rng: random.Random object.
+    OUTPUT: config: next configuration to evaluate {name: value}, not forbidden nor seen. None if there is no new configuration.
+    '''
+    names=[name for name,paramType,values,default in params]
+    default={name:default for name,paramType,values,default in params}
+    if(tuple(default[name] for name in names) not in seen and not is_forbidden(default,forbidden)):
+        return default
+    candidates=[]
+    incumbent=best_config(runs)
+    if(incumbent is not None and rng.random()>=randomProb):
+        # One-exchange neighbourhood of the incumbent: adjacent values of ordinal parameters, any other value of categorical ones
+        for name,paramType,values,defaultValue in params:
+            pos=values.index(incumbent[name])
+            for newPos in range(len(values)):
+                if(newPos!=pos and (abs(newPos-pos)==1 or paramType=='categorical')):
+                    neighbour=dict(incumbent)
+                    neighbour[name]=values[newPos]
+                    candidates.append(neighbour)
+        rng.shuffle(candidates)
+    for i in range(1000):
+        candidates.append({name:rng.choice(values) for name,paramType,values,defaultValue in params})
+    for config in candidates:
+        if(tuple(config[name] for name in names) not in seen and not is_forbidden(config,forbidden)):
+            return config
+    return None
+### end-function-propose
+################################################################
+
+
+################################################################
+### FUNCTION best_config #######################################
+# Configuration with the lowest mean quality in the finished runs (the first one found in case of ties). None if there are no runs.
+def best_config(runs):
+    qualities={}
+    for run in runs:
+        qualities.setdefault(run['configID'],[]).append(run['quality'])
+    if not qualities:
+        return None
+    bestID=min(qualities,key=lambda configID: (sum(qualities[configID])/len(qualities[configID]),configID))
+    return next(run['config'] for run in runs if run['configID']==bestID)
+### end-function-best_config
+################################################################
+
+
+################################################################
+### FUNCTION run_configuration #################################
+# Call the wrapper as SMAC does: <algo> <instance> <instance specifics> <cutoff> <run length> <seed> -<param> <value> ...
+def run_configuration(algo,params,config,cutoff,seed):
+    cmd=shlex.split(algo)+['no_instance','0',str(cutoff),str(maxCutoff),str(seed)]
+    for name,paramType,values,default in params:
+        cmd=cmd+['-'+name,config[name]]
+    start=time.time()
+    proc=subprocess.run(cmd,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,universal_newlines=True)
+    run={'cmd':cmd,'wallTime':time.time()-start,'resultLine':None,'status':'CRASHED','runtime':0.0,'runLength':0.0,'quality':crashQuality,'additional':''}
+    for line in proc.stdout.splitlines():
+        m=resultPattern.search(line)
+        if m:
+            fields=[field.strip() for field in m.group(1).split(',')]
+            try:
+                run.update({'resultLine':m.group(0),'status':fields[0],'runtime':float(fields[1]),'runLength':float(fields[2]),
+                            'quality':float(fields[3]),'additional':','.join(fields[5:])})
+            except (IndexError,ValueError):
+                run['resultLine']=None
+    if(run['resultLine'] is None):
+        run['output']=proc.stdout[-2000:]
+    return run
+### end-function-run_configuration
+################################################################
+
+
+################################################################
+### FUNCTION write_state #######################################
+# Write runs_and_results-it<N>.csv and paramstrings-it<N>.txt (N: number of finished runs), removing the files of previous iterations.
+def write_state(stateDir,params,runs):
+    iteration=len(runs)
+    resultsFile=os.path.join(stateDir,'runs_and_results-it'+str(iteration)+'.csv')
+    paramsFile=os.path.join(stateDir,'paramstrings-it'+str(iteration)+'.txt')
+    with open(resultsFile+'.tmp','w') as f:
+        f.write('Run Number,Run History Configuration ID,Instance ID,Response Value (y),Censored?,Cutoff Time Used,Seed,Runtime,Run Length,Run Result Code,Run Quality,SMAC Iteration,SMAC Cumulative Runtime,Run Result,Additional Algorithm Run Data,Wall Clock Time,\n')
+        cumulativeRuntime=0.0
+        for num,run in enumerate(runs):
+            cumulativeRuntime=cumulativeRuntime+run['runtime']
+            resultCode={'SAT':1,'UNSAT':2,'TIMEOUT':0}.get(run['status'],-1)
+            f.write(','.join([str(num+1),str(run['configID']),'1',str(run['quality']),'0',str(run['cutoff']),str(run['seed']),str(run['runtime']),str(run['runLength']),
+                              str(resultCode),str(run['quality']),str(num),str(cumulativeRuntime),run['status'],run['additional'].replace(',',';'),str(run['wallTime'])])+',\n')
+    with open(paramsFile+'.tmp','w') as f:
+        for run in runs:
+            f.write(str(run['configID'])+': '+', '.join([name+"='"+run['config'][name]+"'" for name,paramType,values,default in params])+'\n')
+    os.replace(resultsFile+'.tmp',resultsFile)
+    os.replace(paramsFile+'.tmp',paramsFile)
+    for fileName in os.listdir(stateDir):
+        m=re.match(r'^(runs_and_results|paramstrings)-it([0-9]+)\.(csv|txt)$',fileName)
+        if(m and int(m.group(2))!=iteration):
+            os.remove(os.path.join(stateDir,fileName))
+### end-function-write_state
+################################################################
+
+
+################################################################
+### FUNCTION log ###############################################
+def log(logFile,level,message):
+    with open(logFile,'a') as f:
+        f.write(time.strftime('%H:%M:%S')+' ['+level.ljust(5)+'] '+message+'\n')
+### end-function-log
+################################################################
+
+
+################################################################
+### FUNCTION optimize ##########################################
+def optimize(scenarioFile,numberOfRuns=None,workers=1,outputDir='smac-output'):
+    '''
+    Call: incumbent = optimize(scenarioFile,numberOfRuns,workers)
+
+    INPUTS: scenarioFile: SMAC scenario file (paths inside it are relative to its directory or to the current one, as for SMAC).
+            numberOfRuns: number of configuration evaluations (default: numberOfRunsLimit in the scenario).
+            workers: number of evaluations running at the same time.
+            outputDir: root of the output files (as SMAC --output-dir).
+    OUTPUT: incumbent: best configuration found {name: value}.
+    '''
+    scenario=read_scenario(scenarioFile)
+    pcsFile=scenario['pcs-file']
+    if not os.path.exists(pcsFile):
+        pcsFile=os.path.join(os.path.dirname(scenarioFile),pcsFile)
+    params,forbidden=read_pcs(pcsFile)
+    names=[name for name,paramType,values,default in params]
+    if numberOfRuns is None:
+        numberOfRuns=int(scenario.get('numberOfRunsLimit',500))
+    seed=int(scenario.get('seed',123))
+    cutoff=scenario.get('cutoffTime',scenario.get('cutoff-time',scenario.get('cutoff_time',str(maxCutoff))))
+    rng=random.Random(seed)
+    scenarioDir=os.path.join(outputDir,os.path.splitext(os.path.basename(scenarioFile))[0])
+    stateDir=os.path.join(scenarioDir,'state-run'+str(seed))
+    os.makedirs(stateDir,exist_ok=True)
+    logRun=os.path.join(scenarioDir,'log-run'+str(seed)+'.txt')
+    logWarn=os.path.join(scenarioDir,'log-warn'+str(seed)+'.txt')
+    log(logRun,'INFO','FLYCOPdriver: '+str(numberOfRuns)+' runs of '+scenario['algo']+' with '+str(workers)+' workers')
+
+    runs=[]
+    seen=set()
+    configIDs={}
+    running={}
+    exhausted=False
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        while(len(runs)+len(running)<numberOfRuns or running):
+            # Keep all the workers busy
+            while(not exhausted and len(running)<workers and len(runs)+len(running)<numberOfRuns):
+                config=propose(params,forbidden,runs,seen,rng)
+                if config is None:
+                    exhausted=True
+                    break
+                key=tuple(config[name] for name in names)
+                seen.add(key)
+                configIDs.setdefault(key,len(configIDs)+1)
+                runSeed=rng.randint(0,maxCutoff-1)
+                future=executor.submit(run_configuration,scenario['algo'],params,config,cutoff,runSeed)
+                running[future]={'config':config,'configID':configIDs[key],'seed':runSeed,'cutoff':cutoff}
+            if not running:
+                break
+            done,notDone=concurrent.futures.wait(list(running),return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                run=running.pop(future)
+                run.update(future.result())
+                runs.append(run)
+                if(run['resultLine'] is not None):
+                    log(logWarn,'WARN',run['resultLine'])
+                else:
+                    log(logWarn,'ERROR','The following algorithm call failed: '+' '.join(shlex.quote(arg) for arg in run['cmd'])+'\n'+run['output'])
+                log(logRun,'INFO','Run '+str(len(runs))+' of configuration '+str(run['configID'])+' finished: '+run['status']+', quality '+str(run['quality']))
+            write_state(stateDir,params,runs)
+
+    incumbent=best_config(runs)
+    if incumbent is not None:
+        incumbentID=configIDs[tuple(incumbent[name] for name in names)]
+        log(logRun,'INFO','Sample call for final incumbent config '+str(incumbentID)+': cd '+shlex.quote(os.getcwd())+'; '+scenario['algo']+' no_instance 0 '+str(cutoff)+' '+str(maxCutoff)+' '+str(seed)+' '
+            +' '.join(['-'+name+" '"+incumbent[name]+"'" for name in names]))
+    return incumbent
+### end-function-optimize
+################################################################
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Concurrent FLYCOP optimization driver (random and neighbour search, a different optimizer than SMAC).')
+    parser.add_argument('--scenario-file',required=True)
+    parser.add_argument('--numberOfRunsLimit',type=int,default=None)
+    parser.add_argument('--workers',type=int,default=1)
+    parser.add_argument('--output-dir',default='smac-output')
+    args=parser.parse_args()
+    incumbent=optimize(args.scenario_file,args.numberOfRunsLimit,args.workers,args.output_dir)
+    print('Final incumbent: '+str(incumbent))
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Benchmark of the GEM to COMETS conversion: original dense (metabolite x reaction) loop versus shared sparse exporter (cometsModelIO).
+# It also checks that both .cmt files are byte-identical.
+# Call (from FLYCOP root directory):
+#python3 Scripts/benchmark_mat_to_comets.py [model1.mat model2.mat ...]
+# By default, it uses iJO1366 (ecoliLongTerm) and iAF1260 (coGrowth4Ecoli) from the templates.
+# Results (Python 3.11, COBRApy 0.32.1, one core):
+#   model         nMets  nRxns  legacy(s)  sparse(s)  speedup  identical
+#   iJO1366.mat   1805   2583   49.309     0.039      1258.7   True
+#   iAF1260.mat   1668   2382   41.96      0.145      290.0    True
+# COBRApy 0.32.1 cannot load iAF1260.mat as it is (its confidenceScores field), so it was measured on a copy without that field.
+
+import sys
+import os.path
+import time
+import filecmp
+import tempfile
+import cobra
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import cometsModelIO
+
+defaultModels=['MicrobialCommunities/ecoliLongTerm_TemplateOptimizeConsortiumV0/ModelsInput/iJO1366.mat',
+               'MicrobialCommunities/coGrowth4Ecoli_TemplateOptimizeConsortiumV0/ModelsInput/iAF1260.mat']
+
+
+################################################################
+### FUNCTION legacy_model_to_comets ############################
+# Original code in *FLYCOP.py (before cometsModelIO), kept only as reference for this benchmark. model.objective (computed for each
+# reaction) is read through cometsModelIO.objective_reactions, to run also with COBRApy>=0.6.
+def legacy_model_to_comets(model,cmtOutputFile):
+    with open(cmtOutputFile, mode='w') as f:
+        # Print the S matrix
+        f.write("SMATRIX  "+str(len(model.metabolites))+"  "+str(len(model.reactions))+"\n")
+        for x in range(len(model.metabolites)):
+            for y in range(len(model.reactions)):
+                if (model.metabolites[x] in model.reactions[y].metabolites):
+                    coeff=model.reactions[y].get_coefficient(model.metabolites[x])
+                    f.write("    "+str(x+1)+"   "+str(y+1)+"   "+str(coeff)+"\n")
+        f.write("//\n")
+        # Print the bounds
+        f.write("BOUNDS  -1000  1000\n");
+        for y in range(len(model.reactions)):
+            lb=model.reactions[y].lower_bound
+            up=model.reactions[y].upper_bound
+            f.write("    "+str(y+1)+"   "+str(lb)+"   "+str(up)+"\n")
+        f.write("//\n")
+        # Print the objective reaction
+        f.write('OBJECTIVE\n')
+        for y in range(len(model.reactions)):
+            if (model.reactions[y] in cometsModelIO.objective_reactions(model)):
+                indexObj=y+1
+        f.write("    "+str(indexObj)+"\n")
+        f.write("//\n")
+        # Print metabolite names
+        f.write("METABOLITE_NAMES\n")
+        for x in range(len(model.metabolites)):
+            f.write("    "+model.metabolites[x].id+"\n")
+        f.write("//\n")
+        # Print reaction names
+        f.write("REACTION_NAMES\n")
+        for y in range(len(model.reactions)):
+            f.write("    "+model.reactions[y].id+"\n")
+        f.write("//\n")
+        # Print exchange reactions
+        f.write("EXCHANGE_REACTIONS\n")
+        for y in range(len(model.reactions)):
+            if (model.reactions[y].id.find('EX_')==0):
+                f.write(" "+str(y+1))
+        f.write("\n//\n")
+### end-function-legacy_model_to_comets
+################################################################
+
+
+if __name__ == '__main__':
+    models=sys.argv[1:] if len(sys.argv)>1 else defaultModels
+    tmpDir=tempfile.mkdtemp()
+    print("model\tnMets\tnRxns\tlegacy(s)\tsparse(s)\tspeedup\tidentical")
+    for matFile in models:
+        model=cobra.io.load_matlab_model(matFile)
+        name=os.path.basename(matFile)
+        legacyFile=os.path.join(tmpDir,name+'.legacy.cmt')
+        newFile=os.path.join(tmpDir,name+'.cmt')
+        t0=time.perf_counter()
+        legacy_model_to_comets(model,legacyFile)
+        tLegacy=time.perf_counter()-t0
+        t0=time.perf_counter()
+        cometsModelIO.model_to_comets(model,newFile)
+        tNew=time.perf_counter()-t0
+        identical=filecmp.cmp(legacyFile,newFile,shallow=False)
+        print(name+"\t"+str(len(model.metabolites))+"\t"+str(len(model.reactions))+"\t"+str(round(tLegacy,3))+"\t"+str(round(tNew,3))+"\t"+str(round(tLegacy/tNew,1))+"\t"+str(identical))
@@ -22,11 +22,24 @@ import copy
 import csv
 import math
 import cobra.flux_analysis.variability
-import massedit
 import subprocess
 import shutil, errno
 import statistics
+import time
+import numpy as np
 from cobra import Reaction
+import cometsModelIO
+import cometsModelCache
+import cometsLayout
+import cometsLogIO
+import cometsWatcher
+import replicateRunner
+import resultsDB
+import trajectoryStore
+import dfbaEngine
+import modelCompression
+
+scriptsDir=os.path.dirname(os.path.abspath(__file__))
 
 ################################################################
 ### FUNCTION initialize_models #################################    
@@ -131,60 +144,6 @@ def initialize_models():
 ################################################################
 
 
-################################################################    
-### FUNCTION mat_to_comets #####################################    
-# mat_to_comets(modelPath)
-def mat_to_comets(matInputFile):
-    model=cobra.io.load_matlab_model(matInputFile)
-    # Open output file:
-    with open(matInputFile+'.cmt', mode='w') as f:
-        # Print the S matrix
-        f.write("SMATRIX  "+str(len(model.metabolites))+"  "+str(len(model.reactions))+"\n")
-        for x in range(len(model.metabolites)):
-            for y in range(len(model.reactions)):
-                if (model.metabolites[x] in model.reactions[y].metabolites):
-                    coeff=model.reactions[y].get_coefficient(model.metabolites[x])
-                    f.write("    "+str(x+1)+"   "+str(y+1)+"   "+str(coeff)+"\n")
-        f.write("//\n")
-        
-        # Print the bounds
-        f.write("BOUNDS  -1000  1000\n");
-        for y in range(len(model.reactions)):
-            lb=model.reactions[y].lower_bound
-            up=model.reactions[y].upper_bound
-            f.write("    "+str(y+1)+"   "+str(lb)+"   "+str(up)+"\n")
-        f.write("//\n")
-        
-        # Print the objective reaction
-        f.write('OBJECTIVE\n')
-        for y in range(len(model.reactions)):
-            if (model.reactions[y] in model.objective):
-                indexObj=y+1
-        f.write("    "+str(indexObj)+"\n")
-        f.write("//\n")
-        
-        # Print metabolite names
-        f.write("METABOLITE_NAMES\n")
-        for x in range(len(model.metabolites)):
-            f.write("    "+model.metabolites[x].id+"\n")
-        f.write("//\n")
-
-        # Print reaction names
-        f.write("REACTION_NAMES\n")
-        for y in range(len(model.reactions)):
-            f.write("    "+model.reactions[y].id+"\n")
-        f.write("//\n")
-
-        # Print exchange reactions
-        f.write("EXCHANGE_REACTIONS\n")
-        for y in range(len(model.reactions)):
-            if (model.reactions[y].id.find('EX_')==0):
-                f.write(" "+str(y+1))
-        f.write("\n//\n")                
-### end-function-mat_to_comets    
-################################################################
-
-
 ################################################################
 ### FUNCTION compute_ratioGR ###################################    
 def compute_ratioGR(GRa,GRb):
@@ -203,9 +162,180 @@ def compute_ratioGR(GRa,GRb):
 ###############################################################
 
 
+################################################################
+### FUNCTION build_strain_model ################################
+# Strain model numStrain secreting the amino acid aa (e.g. 'arg-L') at the rate coeff, as proportion of BOF flux. Exported to COMETS as cmtOutputFile.
+# New: add the extracellular(e) metabolite to secrete to the right side of BOF rxn, and the same amount of intracellular(c) metabolite to the left side of BOF rxn.  Preserving open bounds in EX_* and *tex rxns.
+# [Harcombe, 2014] "A mutant S. enterica model was constructed that excreted methionine at a rate consistent with empirical observations. To achieve this, we added on the right side of the growth reaction 0.5 mmol/gDW of excreted extracellular methionine, balanced by an equal amount of intracellular methionine consumed (at the left side of the reaction equation)."
+# Only those 2 BOF coefficients are patched in the precompiled base model of the strain (skeleton), instead of loading and exporting the whole model.
+# If this code or initialize_models() change, strainRecipe must change too, to invalidate the cache of strain models (cometsModelCache).
+strainRecipe='coGrowth4Ecoli_strain_v1'
+def load_base_model(numStrain):
+    if not(os.path.exists('ModelsInput/iAF1260_Ec'+str(numStrain)+'.mat')):
+        initialize_models()
+    if modelCompression.enabled():
+        # Reduced under the world_media of the layout (the amino acids secreted through the BOF are in it)
+        return modelCompression.reduce_mat('ModelsInput/iAF1260_Ec'+str(numStrain)+'.mat','ModelsInput/iAF1260_Ec'+str(numStrain)+'_reduced.mat',
+                                           dfbaEngine.read_layout('coGrowth4Ecoli_layout_template.txt')['media'])
+    return cobra.io.load_matlab_model('ModelsInput/iAF1260_Ec'+str(numStrain)+'.mat')
+
+# Metabolites kept in world_media of the layout even with initial value 0: those secreted by any strain, and those in the fitness.
+def layout_keep_metabolites(mediaMets):
+    return cometsLayout.secreted_metabolites('ModelsInput/iAF1260_cogrowth4Ecoli_secreted.txt',[lambda numStrain=numStrain: load_base_model(numStrain) for numStrain in range(1,5)],mediaMets)+['glc-D[e]','arg-L[e]','lys-L[e]','met-L[e]','phe-L[e]']
+
+def build_strain_model(numStrain,aa,coeff,cmtOutputFile):
+    skeleton=cometsModelCache.cached_skeleton(['ModelsInput/iAF1260.mat'],modelCompression.recipe(strainRecipe)+'_Ec'+str(numStrain),lambda: load_base_model(numStrain))
+    idBOFrxn=skeleton['objectiveId']
+    # As 'subtract_metabolites' in COBRApy: coeff is subtracted on the left side (intracellular) and added on the right side (extracellular).
+    coefficients={(idBOFrxn,aa+'[c]'):cometsModelIO.skeleton_coefficient(skeleton,idBOFrxn,aa+'[c]')-coeff,
+                  (idBOFrxn,aa+'[e]'):cometsModelIO.skeleton_coefficient(skeleton,idBOFrxn,aa+'[e]')+coeff}
+    cometsModelIO.skeleton_to_comets(skeleton,cmtOutputFile,coefficients=coefficients)
+
+# The same strain as COBRApy model, for the in-process backend (dfbaEngine).
+def strain_model(numStrain,aa,coeff):
+    model=load_base_model(numStrain)
+    bofRxn=model.reactions[dfbaEngine.objective_reaction(model)]
+    bofRxn.add_metabolites({model.metabolites.get_by_id(aa+'[c]'):-coeff,model.metabolites.get_by_id(aa+'[e]'):coeff})
+    return model
+### end-function-build_strain_model
+################################################################
+
+
+################################################################
+### FUNCTION log_needs #########################################
+# Logs needed by a fitness function (selective logging, see cometsLogIO): {'flux': reactions of the flux log per strain ('objective': its objective reaction)}.
+# All the fitness functions use the growth rate of each strain in the exponential phase.
+def log_needs(fitFunc):
+    return {'flux':['objective']}
+### end-function-log_needs
+################################################################
+
+
+################################################################
+### FUNCTION coGrowth4EcoliFLYCOP_replicate ####################
+# One COMETS run (replicate i) of a configuration, in the current directory, already with the models and layout of the configuration.
+# Steps 5-7 of coGrowth4EcoliFLYCOP_oneConf. It is run by replicateRunner, serially or in parallel (dirPlot must be absolute in the latter case).
+# With dfbaSetup (models, layout and initial biomasses), the run is simulated in-process by dfbaEngine instead of COMETS (no logs).
+def coGrowth4EcoliFLYCOP_replicate(i,biomass1,biomass2,biomass3,biomass4,arg,lys,met,phe,fitFunc,dirPlot,iniBiomass,maxBiomass,reactionNames,objRxns,dfbaSetup=None):
+    if dfbaSetup is None:
+        logs={'media':'media_log_template.txt','biomass':'total_biomass_log_template.txt','flux':'flux_log_template.txt'}
+        neededReactions={numStrain:[objRxns[numStrain] if rxnId=='objective' else rxnId for rxnId in log_needs(fitFunc)['flux']] for numStrain in objRxns}
+        # Same random stream in replicate i of every configuration, with common random numbers (see replicateRunner)
+        cometsLayout.seed_layout('coGrowth4Ecoli_layout_template.txt',replicateRunner.replicate_seed(i))
+        if cometsWatcher.fifo_logs():
+            # Logs consumed through named pipes, keeping in memory only the flux log columns needed by the fitness (nothing written to disk but an optional gzip copy)
+            lastCycle,logs=cometsWatcher.run_comets_fifo('comets_script_template','output.txt',logs,
+                                                         keep={'flux':cometsLogIO.flux_line_filter(reactionNames,neededReactions)},archive=cometsWatcher.archive_files(logs,'run'+str(i)))
+        else:
+            cometsWatcher.run_comets('comets_script_template','output.txt',logs)
+        cometsLayout.check_seed('output.txt',replicateRunner.replicate_seed(i))
+        biomass=cometsLogIO.read_total_biomass_log(logs['biomass'])
+        media=cometsLogIO.read_media_log(logs['media'])
+    else:
+        trajectories=dfbaEngine.run_dfba(dfbaSetup['models'],dfbaSetup['layout'],dfbaSetup['initialPop'],rng=replicateRunner.replicate_rng(i))
+        biomass=trajectories['biomass']
+        media=trajectories['media']
+        objRxns=trajectories['objectives']
+
+    # 6.- Biomass and media per cycle, read in a single pass over the logs (or simulated): [cycle, biomass1, ..., biomass4, metabolite1, ...]
+    cometsLogIO.write_table('biomass_vs_arg-L_lys-L_met-L_phe-L_template.txt',cometsLogIO.biomass_vs_media(biomass,media,['arg-L','lys-L','met-L','phe-L']))
+    tableGLC=cometsLogIO.biomass_vs_media(biomass,media,['glc-D'])
+    cometsLogIO.write_table('biomass_vs_glc-D_template.txt',tableGLC)
+    # [R call] Run script to generate one graph: 4 strains versus 4 aminoacids
+    subprocess.call([scriptsDir+'/plot_biomassX4_vs_4mediaItem.sh','template','arg-L','lys-L','met-L','phe-L','Ec1','Ec2','Ec3','Ec4'])
+    subprocess.call([scriptsDir+'/plot_biomassX4_vs_mediaItem.sh','template','glc-D','Ec1','Ec2','Ec3','Ec4'])
+    # 7.- Compute fitness (measure to optimize):
+    print('computing fitness...')
+    # 7.1.- Determine endCycle:  When glc is exhausted (the last cycle, if it is not exhausted or it is in cycle 0)
+    glcRows=np.flatnonzero(tableGLC[:,5]<0.001)
+    endCycle=int(tableGLC[glcRows[0],0]) if glcRows.size>0 else 0
+    if(endCycle==0):
+        endCycle=int(tableGLC[-1,0])
+    # Compute cycle of exponential grow
+    expCycle=int(endCycle-1)
+    iniExpCycle=int(0.85*endCycle)
+    numCycles=int(expCycle-iniExpCycle)
+    # 7.2.- Compute fitness elements
+    finalBiomass=float(tableGLC[expCycle,1:5].sum())
+    # Average growth rate of each strain in the exponential phase (negative values count as 0; 0 if iniExpCycle is not in the log),
+    # with the fluxes of the objective reactions read in a single pass over the flux log
+    if dfbaSetup is None:
+        if cometsWatcher.fifo_logs():
+            # Lines of the flux log already reduced to the needed reactions
+            fluxes=cometsLogIO.read_flux_log(logs['flux'],neededReactions)
+        elif cometsLogIO.selective_logs():
+            # Only the reactions and cycles needed by the fitness are read, and kept in the flux log of the run
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames,neededReactions,range(iniExpCycle,expCycle+1))
+            cometsLogIO.write_flux_log('flux_log_template.txt',fluxes)
+        else:
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames,{numStrain:[objRxns[numStrain]] for numStrain in objRxns})
+    else:
+        fluxes=trajectories['fluxes']
+    GRs=[]
+    for numStrain in range(1,5):
+        GR=cometsLogIO.mean_positive_flux(fluxes[numStrain],iniExpCycle,numCycles,objRxns[numStrain])
+        if(GR is None or GR<0.0):
+            GR=0.0
+        GRs.append(GR)
+    GR1,GR2,GR3,GR4=GRs
+    print("exp cycle range ("+str(iniExpCycle)+","+str(expCycle)+"): GR1: "+str(GR1)+" GR2: "+str(GR2)+" GR3: "+str(GR3)+" GR4: "+str(GR4))
+    avgGR=float((GR1+GR2+GR3+GR4)/4)
+    #
+    sumRatioGR=0                
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR2)
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR3)
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR4)
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR2,GR3)
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR2,GR4)
+    sumRatioGR=sumRatioGR+compute_ratioGR(GR3,GR4)
+    ratioGR=float(sumRatioGR/6)
+    #
+    fitBiomass=float((finalBiomass-iniBiomass)/maxBiomass)
+
+    if(fitFunc=='ratioGRavgGR'):
+        fitness=float(0.5*ratioGR+0.5*avgGR)
+    elif(fitFunc=='ratioGR'):
+        fitness=ratioGR
+    elif(fitFunc=='ratioGRratioBiomass'):
+        fitness=float(0.5*ratioGR+0.5*fitBiomass)
+    elif(fitFunc=='ratioGR40_Biomass60'):
+        fitness=float(0.4*ratioGR+0.6*fitBiomass)
+    elif(fitFunc=='ratioGR30_Biomass70'):
+        fitness=float(0.3*ratioGR+0.7*fitBiomass)
+    elif(fitFunc=='ratioGR20_Biomass80'):
+        fitness=float(0.2*ratioGR+0.8*fitBiomass)
+                    
+    print(" Total fitness: "+str(round(fitness,6))+", avgGR: "+str(round(avgGR,6))+", ratioGR: "+str(round(ratioGR,6))+" in cycle "+str(iniExpCycle)+" to "+str(expCycle))
+
+    # Copy individual solution
+    file='IndividualRunsResults/'+'biomass_run'+str(i)+'_'+str(fitness)+'_'+str(expCycle)+'.pdf'
+    shutil.move('biomass_vs_arg-L_lys-L_met-L_phe-L_template_plot.pdf',file)
+    plotFile=None
+    if(dirPlot != ''):
+        file2=dirPlot+'biomass_'+str(biomass1)+'_'+str(biomass2)+'_'+str(biomass3)+'_'+str(biomass4)+'_'+str(arg)+'_'+str(lys)+'_'+str(met)+'_'+str(phe)+'_run'+str(i)+'_'+str(fitness)+'_'+str(expCycle)+'.pdf'
+        shutil.copy(file,file2)
+        plotFile=os.path.basename(file2)
+    if(dfbaSetup is None and trajectoryStore.enabled()):
+        # Biomass, media and fluxes (those kept in the flux log) in the binary trajectory store of the configuration, instead of the text logs
+        if not(cometsLogIO.selective_logs() or cometsWatcher.fifo_logs()):
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames)
+        trajectoryStore.save_run('IndividualRunsResults',i,biomass,media,fluxes)
+        trajectoryStore.remove_logs(['total_biomass_log_template.txt','media_log_template.txt','flux_log_template.txt'])
+    elif(dfbaSetup is None and not cometsWatcher.fifo_logs()):
+        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
+        shutil.move('total_biomass_log_template.txt',file)
+        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
+        shutil.move('media_log_template.txt',file)
+        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
+        shutil.move('flux_log_template.txt',file)
+    return {'fitness':fitness,'expCycle':expCycle,'avgGR':avgGR,'ratioGR':ratioGR,'fitBiomass':fitBiomass,'GR1':GR1,'GR2':GR2,'GR3':GR3,'GR4':GR4,'plot':plotFile}
+### end-function-coGrowth4EcoliFLYCOP_replicate
+################################################################
+
+
 ################################################################
 ### FUNCTION coGrowth4EcoliFLYCOP_oneConf ######################
-def coGrowth4EcoliFLYCOP_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met,phe,fitFunc='ratioGRavgGR',dirPlot='',repeat=3):
+def coGrowth4EcoliFLYCOP_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met,phe,fitFunc='ratioGRavgGR',dirPlot='',repeat=3,repeatProcs=None,backend=None):
   '''
   Call: avgFitness, sdFitness = coGrowth4Ecoli_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met,phe)
 
@@ -219,14 +349,15 @@ def coGrowth4EcoliFLYCOP_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met
           phe: rate of phenilalanine to secrete by Ec4, as proportion of BOF flux.
           fitFunc: fitness function to optimize.
           dirPlot: copy of the graphs with several run results.
-          repeat: number of runs with the same configuration.
+          repeat: number of runs with the same configuration (maximum number, in adaptive mode: see replicateRunner).
+          repeatProcs: number of runs executed in parallel (default: FLYCOP_REPLICATE_PROCS environment variable, or 1).
+          backend: 'comets' (COMETS runs) or 'dfba' (in-process dynamic FBA of the layout with the COBRApy models, see dfbaEngine; without .cmt files nor logs).
+                   Default: FLYCOP_BACKEND environment variable, or 'comets'.
   OUTPUT: avgFitness: average fitness of 'repeat' COMETS runs with the same configuration (due to it is not deterministic)
           sdFitness: standard deviation of fitness during 'repeat' COMETS runs (see above)
   '''
 
-  if not(os.path.exists('ModelsInput/iAF1260_Ec1.mat')):
-      initialize_models()
-
+  startTime=time.time()
   title=str(biomass1)+'_'+str(biomass2)+'_'+str(biomass3)+'_'+str(biomass4)
 
   maxBiomass=2 # maximum to normalize increment in biomass in fitBiomass as part of fitness function.
@@ -241,64 +372,33 @@ def coGrowth4EcoliFLYCOP_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met
 
   # Single GEMs parameter modifications
   # ===================================
-  if not(os.path.exists('iAF1260_Ec1_tmp.mat.cmt')):      
-    # 1.1.- [COBRApy] Establish modifications in model 1
-    model=cobra.io.load_matlab_model('ModelsInput/iAF1260_Ec1.mat')
-    # New: add the extracellular(e) metabolite to secrete to the right side of BOF rxn, and the same amount of intracellular(c) metabolite to the left side of BOF rxn.  Preserving open bounds in EX_* and *tex rxns.
-    # [Harcombe, 2014] "A mutant S. enterica model was constructed that excreted methionine at a rate consistent with empirical observations. To achieve this, we added on the right side of the growth reaction 0.5 mmol/gDW of excreted extracellular methionine, balanced by an equal amount of intracellular methionine consumed (at the left side of the reaction equation)."
-    idBOFrxn=list(model.objective.keys())[0].id
-    coeff=arg
-    # 'subtract_metabolite' adds a term with the metabolite coefficient with the given value*-1. So, on the right side you put -coeff (-*-1=+) and on the left side coeff (+*-1=-).
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('arg-L[c]'): coeff})
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('arg-L[e]'): -coeff})
-    cobra.io.save_matlab_model(model,'iAF1260_Ec1_tmp.mat','model')
-    del(model)      
-    # 1.2.- [COBRApy] Establish modifications in model 2
-    model=cobra.io.load_matlab_model('ModelsInput/iAF1260_Ec2.mat')
-    idBOFrxn=list(model.objective.keys())[0].id
-    coeff=lys
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('lys-L[c]'): coeff})
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('lys-L[e]'): -coeff})
-    cobra.io.save_matlab_model(model,'iAF1260_Ec2_tmp.mat','model')
-    del(model)      
-    # 1.3.- [COBRApy] Establish modifications in model 3
-    model=cobra.io.load_matlab_model('ModelsInput/iAF1260_Ec3.mat')
-    idBOFrxn=list(model.objective.keys())[0].id
-    coeff=met
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('met-L[c]'): coeff})
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('met-L[e]'): -coeff})
-    cobra.io.save_matlab_model(model,'iAF1260_Ec3_tmp.mat','model')
-    del(model)      
-    # 1.4.- [COBRApy] Establish modifications in model 4
-    model=cobra.io.load_matlab_model('ModelsInput/iAF1260_Ec4.mat')
-    idBOFrxn=list(model.objective.keys())[0].id
-    coeff=phe
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('phe-L[c]'): coeff})
-    model.reactions.get_by_id(idBOFrxn).subtract_metabolites({model.metabolites.get_by_id('phe-L[e]'): -coeff})
-    cobra.io.save_matlab_model(model,'iAF1260_Ec4_tmp.mat','model')
-    del(model)      
-    
-    # 2.- [python]
-    mat_to_comets('iAF1260_Ec1_tmp.mat')
-    mat_to_comets('iAF1260_Ec2_tmp.mat')
-    mat_to_comets('iAF1260_Ec3_tmp.mat')
-    mat_to_comets('iAF1260_Ec4_tmp.mat')
+  dfbaSetup=None
+  if(dfbaEngine.backend(backend)=='dfba'):
+    # 1.- [COBRApy] Models 1-4 kept in memory, with the initial biomasses, for dfbaEngine (steps 2 and 4 are not needed).
+    dfbaSetup={'models':[strain_model(numStrain,aa,coeff) for numStrain,aa,coeff in [(1,'arg-L',arg),(2,'lys-L',lys),(3,'met-L',met),(4,'phe-L',phe)]],
+               'layout':dfbaEngine.read_layout('coGrowth4Ecoli_layout_template.txt'),'initialPop':[mass1,mass2,mass3,mass4]}
+  elif not(os.path.exists('iAF1260_Ec1_tmp.mat.cmt')):      
+    # 1.- [COBRApy] Establish modifications in models 1-4, and 2.- [python] export them to COMETS format.
+    # Through the cache of strain models: the same secretion rate per strain is only built once, in this or any previous configuration.
+    for numStrain,aa,coeff in [(1,'arg-L',arg),(2,'lys-L',lys),(3,'met-L',met),(4,'phe-L',phe)]:
+        cmtFile='iAF1260_Ec'+str(numStrain)+'_tmp.mat.cmt'
+        cometsModelCache.cached_cmt(['ModelsInput/iAF1260.mat'],modelCompression.recipe(strainRecipe),{'strain':numStrain,'aa':aa,'coeff':coeff},cmtFile,lambda: build_strain_model(numStrain,aa,coeff,cmtFile))
 
     # Community parameter modifications
     # =================================    
-    # 4.- [shell script] Write automatically the COMETS parameter about initial biomass of 4 strains, depending on proportions.
-    massedit.edit_files(['coGrowth4Ecoli_layout_template.txt'],["re.sub(r'WWW','"+str(mass1)+"',line)"], dry_run=False)
-    massedit.edit_files(['coGrowth4Ecoli_layout_template.txt'],["re.sub(r'XXX','"+str(mass2)+"',line)"], dry_run=False)
-    massedit.edit_files(['coGrowth4Ecoli_layout_template.txt'],["re.sub(r'YYY','"+str(mass3)+"',line)"], dry_run=False)
-    massedit.edit_files(['coGrowth4Ecoli_layout_template.txt'],["re.sub(r'ZZZ','"+str(mass4)+"',line)"], dry_run=False)
+    # 4.- [python] Write the COMETS layout with the initial biomass of 4 strains, depending on proportions, in a single write (world_media without metabolites that are never in the media).
+    spec=cometsLayout.read_layout_spec('coGrowth4Ecoli_layout_template.txt')
+    cometsLayout.write_layout(spec,'coGrowth4Ecoli_layout_template.txt',layout_keep_metabolites(list(spec['media'])),initialPop=[mass1,mass2,mass3,mass4])
 
     
   # 5.- [COMETS by command line] Run COMETS
-  # Compute no.rxn Growth Rate
-  numRxnGR1=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" iAF1260_Ec1_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))
-  numRxnGR2=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" iAF1260_Ec2_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))
-  numRxnGR3=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" iAF1260_Ec3_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))
-  numRxnGR4=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" iAF1260_Ec4_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))
+  # Reaction ids (columns of the flux log) and growth rate (objective) reaction of each strain
+  # (with dfbaEngine, they are in its trajectories)
+  reactionNames=None
+  objRxns=None
+  if dfbaSetup is None:
+    reactionNames={numStrain:cometsLogIO.cmt_reaction_names('iAF1260_Ec'+str(numStrain)+'_tmp.mat.cmt') for numStrain in range(1,5)}
+    objRxns={numStrain:cometsLogIO.cmt_objective('iAF1260_Ec'+str(numStrain)+'_tmp.mat.cmt') for numStrain in range(1,5)}
 
   if not(os.path.exists('IndividualRunsResults')):
     os.makedirs('IndividualRunsResults')
@@ -312,132 +412,50 @@ def coGrowth4EcoliFLYCOP_oneConf(biomass1,biomass2,biomass3,biomass4,arg,lys,met
   sumGR3=0
   sumGR4=0
   fitnessList=[]
-  # To repeat X times, due to random behaviour in COMETS:
-  for i in range(repeat):
-        with open("output.txt", "w") as f:
-            subprocess.call(['./comets_scr','comets_script_template'], stdout=f)
-    
-        # 6.- [R call] Run script to generate one graph: 4 strains versus 4 aminoacids
-        subprocess.call(['../../Scripts/plot_biomassX4_vs_4mediaItem.sh','template','arg-L','lys-L','met-L','phe-L','Ec1','Ec2','Ec3','Ec4'])
-        subprocess.call(['../../Scripts/plot_biomassX4_vs_mediaItem.sh','template','glc-D','Ec1','Ec2','Ec3','Ec4'])
-        # 7.- Compute fitness (measure to optimize):
-        print('computing fitness...')
-        # 7.1.- Determine endCycle:  When glc is exhausted
-        with open("biomass_vs_glc-D_template.txt", "r") as sourcesGLC:
-            linesGLC = sourcesGLC.readlines()
-            endCycle=0
-            for lineGLC in linesGLC:
-                glcConc=float(lineGLC.split()[5])
-                if (glcConc<0.001):
-                    endCycle=int(lineGLC.split()[0])
-                    break;
-            if(endCycle==0):
-                endCycle=int(lineGLC.split()[0])
-        # Compute cycle of exponential grow
-        expCycle=int(endCycle-1)
-        iniExpCycle=int(0.85*endCycle)
-        numCycles=int(expCycle-iniExpCycle)
-        # 7.2.- Compute fitness elements
-        finalBiomassV=linesGLC[expCycle].split()
-        finalBiomass=float(finalBiomassV[1])+float(finalBiomassV[2])+float(finalBiomassV[3])+float(finalBiomassV[4])
-        GR1=0
-        GR2=0
-        GR3=0
-        GR4=0
-        try:
-            GR1=float(subprocess.check_output(['egrep "fluxes\{.*\}\{1\}\{1\}\{1\}" flux_log_template.txt | egrep -A'+str(numCycles)+' "fluxes\{"'+str(iniExpCycle)+'"\}\{1\}\{1\}\{1\}" | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR1+1)+' | awk \'{if($1>0){sum+=$1}} END {if(NR>0){print sum/NR}}\''], shell=True))
-            if(GR1<0.0):
-                GR1=0.0
-        except:
-            GR1=0.0
-        try:
-            GR2=float(subprocess.check_output(['egrep "fluxes\{.*\}\{1\}\{1\}\{2\}" flux_log_template.txt | egrep -A'+str(numCycles)+' "fluxes\{"'+str(iniExpCycle)+'"\}\{1\}\{1\}\{2\}" | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR2+1)+' | awk \'{if($1>0){sum+=$1}} END {if(NR>0){print sum/NR}}\''], shell=True))
-            if(GR2<0.0):
-                GR2=0.0
-        except:
-            GR2=0.0
-        try:
-            GR3=float(subprocess.check_output(['egrep "fluxes\{.*\}\{1\}\{1\}\{3\}" flux_log_template.txt | egrep -A'+str(numCycles)+' "fluxes\{"'+str(iniExpCycle)+'"\}\{1\}\{1\}\{3\}" | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR3+1)+' | awk \'{if($1>0){sum+=$1}} END {if(NR>0){print sum/NR}}\''], shell=True))
-            if(GR3<0.0):
-                GR3=0.0
-        except:
-            GR3=0.0
-        try:
-            GR4=float(subprocess.check_output(['egrep "fluxes\{.*\}\{1\}\{1\}\{4\}" flux_log_template.txt | egrep -A'+str(numCycles)+' "fluxes\{"'+str(iniExpCycle)+'"\}\{1\}\{1\}\{4\}" | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR4+1)+' | awk \'{if($1>0){sum+=$1}} END {if(NR>0){print sum/NR}}\''], shell=True))
-            if(GR4<0.0):
-                GR4=0.0
-        except:
-            GR4=0.0
-                
-        print("exp cycle range ("+str(iniExpCycle)+","+str(expCycle)+"): GR1: "+str(GR1)+" GR2: "+str(GR2)+" GR3: "+str(GR3)+" GR4: "+str(GR4))
-        avgGR=float((GR1+GR2+GR3+GR4)/4)
-        #
-        sumRatioGR=0                
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR2)
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR3)
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR1,GR4)
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR2,GR3)
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR2,GR4)
-        sumRatioGR=sumRatioGR+compute_ratioGR(GR3,GR4)
-        ratioGR=float(sumRatioGR/6)
-        #
-        fitBiomass=float((finalBiomass-iniBiomass)/maxBiomass)
-
-        if(fitFunc=='ratioGRavgGR'):
-            fitness=float(0.5*ratioGR+0.5*avgGR)
-        elif(fitFunc=='ratioGR'):
-            fitness=ratioGR
-        elif(fitFunc=='ratioGRratioBiomass'):
-            fitness=float(0.5*ratioGR+0.5*fitBiomass)
-        elif(fitFunc=='ratioGR40_Biomass60'):
-            fitness=float(0.4*ratioGR+0.6*fitBiomass)
-        elif(fitFunc=='ratioGR30_Biomass70'):
-            fitness=float(0.3*ratioGR+0.7*fitBiomass)
-        elif(fitFunc=='ratioGR20_Biomass80'):
-            fitness=float(0.2*ratioGR+0.8*fitBiomass)
-                        
-        print(" Total fitness: "+str(round(fitness,6))+", avgGR: "+str(round(avgGR,6))+", ratioGR: "+str(round(ratioGR,6))+" in cycle "+str(iniExpCycle)+" to "+str(expCycle))
-
-        totfitness=totfitness+fitness
-        fitnessList.append(fitness)
-        sumTotCycle=sumTotCycle+expCycle
-        sumAvgGR=sumAvgGR+avgGR
-        sumAvgRatioGR=sumAvgRatioGR+ratioGR
-        sumAvgFitBiomass=sumAvgFitBiomass+fitBiomass
-        sumGR1=sumGR1+GR1
-        sumGR2=sumGR2+GR2
-        sumGR3=sumGR3+GR3
-        sumGR4=sumGR4+GR4
-        
-        # Copy individual solution
-        file='IndividualRunsResults/'+'biomass_run'+str(i)+'_'+str(fitness)+'_'+str(expCycle)+'.pdf'
-        shutil.move('biomass_vs_arg-L_lys-L_met-L_phe-L_template_plot.pdf',file)
-        if(dirPlot != ''):
-            file2=dirPlot+'biomass_'+str(biomass1)+'_'+str(biomass2)+'_'+str(biomass3)+'_'+str(biomass4)+'_'+str(arg)+'_'+str(lys)+'_'+str(met)+'_'+str(phe)+'_run'+str(i)+'_'+str(fitness)+'_'+str(expCycle)+'.pdf'
-            shutil.copy(file,file2)
-        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
-        shutil.move('total_biomass_log_template.txt',file)
-        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
-        shutil.move('media_log_template.txt',file)
-        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
-        shutil.move('flux_log_template.txt',file)   
-    
-  avgfitness=totfitness/repeat
+  # To repeat X times, due to random behaviour in COMETS (in parallel if repeatProcs>1, see replicateRunner; up to X times in adaptive mode):
+  results=replicateRunner.run_replicates(coGrowth4EcoliFLYCOP_replicate,repeat,
+                                         (biomass1,biomass2,biomass3,biomass4,arg,lys,met,phe,fitFunc,replicateRunner.abs_prefix(dirPlot),iniBiomass,maxBiomass,reactionNames,objRxns,dfbaSetup),
+                                         replicateRunner.replicate_procs(repeatProcs),
+                                         linkFiles=['iAF1260_Ec1_tmp.mat.cmt','iAF1260_Ec2_tmp.mat.cmt','iAF1260_Ec3_tmp.mat.cmt','iAF1260_Ec4_tmp.mat.cmt','comets_scr'],
+                                         copyFiles=['comets_script_template','coGrowth4Ecoli_layout_template.txt'],
+                                         stopCondition=replicateRunner.sequential_stop(resultsDB.incumbent(dirPlot,fitFunc)))
+  failure=replicateRunner.failed_replicate(results)
+  if failure is not None:
+      # COMETS failed in a run (see cometsWatcher.failurePatterns): the configuration gets fitness 0, and the reason is stored in the results
+      resultsDB.write_failure(dirPlot,'coGrowth4Ecoli',fitFunc,str(biomass1)+','+str(biomass2)+','+str(biomass3)+','+str(biomass4)+','+str(arg)+','+str(lys)+','+str(met)+','+str(phe),
+                              {'biomass1':biomass1,'biomass2':biomass2,'biomass3':biomass3,'biomass4':biomass4,'arg':arg,'lys':lys,'met':met,'phe':phe},failure,time.time()-startTime)
+      return 0,0
+  if trajectoryStore.enabled():
+      # Trajectories of all the runs in the binary store of the configuration
+      trajectoryStore.gather_runs('IndividualRunsResults')
+  for result in results:
+      totfitness=totfitness+result['fitness']
+      fitnessList.append(result['fitness'])
+      sumTotCycle=sumTotCycle+result['expCycle']
+      sumAvgGR=sumAvgGR+result['avgGR']
+      sumAvgRatioGR=sumAvgRatioGR+result['ratioGR']
+      sumAvgFitBiomass=sumAvgFitBiomass+result['fitBiomass']
+      sumGR1=sumGR1+result['GR1']
+      sumGR2=sumGR2+result['GR2']
+      sumGR3=sumGR3+result['GR3']
+      sumGR4=sumGR4+result['GR4']
+
+  avgfitness=totfitness/len(results)
   sdfitness=statistics.stdev(fitnessList)
-  avgAvgGR=sumAvgGR/repeat
-  avgRatioGR=sumAvgRatioGR/repeat
-  avgFitBiomass=sumAvgFitBiomass/repeat
-  avgCycle=sumTotCycle/repeat
-  avgGR1=sumGR1/repeat
-  avgGR2=sumGR2/repeat
-  avgGR3=sumGR3/repeat
-  avgGR4=sumGR4/repeat
+  avgAvgGR=sumAvgGR/len(results)
+  avgRatioGR=sumAvgRatioGR/len(results)
+  avgFitBiomass=sumAvgFitBiomass/len(results)
+  avgCycle=sumTotCycle/len(results)
+  avgGR1=sumGR1/len(results)
+  avgGR2=sumGR2/len(results)
+  avgGR3=sumGR3/len(results)
+  avgGR4=sumGR4/len(results)
   
-  print("Fitness_function\tconfiguration\tfitness\tsd\tavgGR\tratioGR\tfitBiomass\tGR1\tGR2\tGR3\tGR4\texpCycle")
-  print(fitFunc+"\t"+str(biomass1)+','+str(biomass2)+','+str(biomass3)+','+str(biomass4)+','+str(arg)+','+str(lys)+','+str(met)+','+str(phe)+"\t"+str(round(avgfitness,6))+"\t"+str(round(sdfitness,6))+"\t"+str(round(avgAvgGR,6))+"\t"+str(round(avgRatioGR,6))+"\t"+str(round(avgFitBiomass,6))+"\t"+str(round(avgGR1,6))+"\t"+str(round(avgGR2,6))+"\t"+str(round(avgGR3,6))+"\t"+str(round(avgGR4,6))+"\t"+str(round(avgCycle,1)))
-  with open(dirPlot+"configurationsResults"+fitFunc+".txt", "a") as myfile:
-      myfile.write("Fitness_function\tconfiguration\tfitness\tsd\tavgGR\tratioGR\tfitBiomass\tGR1\tGR2\tGR3\tGR4\texpCycle\n")
-      myfile.write(fitFunc+"\t"+str(biomass1)+','+str(biomass2)+','+str(biomass3)+','+str(biomass4)+','+str(arg)+','+str(lys)+','+str(met)+','+str(phe)+"\t"+str(round(avgfitness,6))+"\t"+str(round(sdfitness,6))+"\t"+str(round(avgAvgGR,6))+"\t"+str(round(avgRatioGR,6))+"\t"+str(round(avgFitBiomass,6))+"\t"+str(round(avgGR1,6))+"\t"+str(round(avgGR2,6))+"\t"+str(round(avgGR3,6))+"\t"+str(round(avgGR4,6))+"\t"+str(round(avgCycle,1))+"\n")
+  resultsDB.write_results(dirPlot,'coGrowth4Ecoli',fitFunc,str(biomass1)+','+str(biomass2)+','+str(biomass3)+','+str(biomass4)+','+str(arg)+','+str(lys)+','+str(met)+','+str(phe),
+                          {'biomass1':biomass1,'biomass2':biomass2,'biomass3':biomass3,'biomass4':biomass4,'arg':arg,'lys':lys,'met':met,'phe':phe},
+                          [('fitness',round(avgfitness,6)),('sd',round(sdfitness,6)),('avgGR',round(avgAvgGR,6)),('ratioGR',round(avgRatioGR,6)),('fitBiomass',round(avgFitBiomass,6)),
+                           ('GR1',round(avgGR1,6)),('GR2',round(avgGR2,6)),('GR3',round(avgGR3,6)),('GR4',round(avgGR4,6)),('expCycle',round(avgCycle,1))],
+                          results,time.time()-startTime)
   
   print("Avg.fitness(sd):\t"+str(avgfitness)+"\t"+str(sdfitness)+"\n")
   if(sdfitness>0.1):
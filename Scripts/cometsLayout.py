@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# COMETS layouts rendered in memory from a structured spec, used by the consortia pipelines (*FLYCOP.py) instead of substituting
+# placeholders (XXX, YYY, ...) in the layout file with massedit, once per placeholder.
+# The spec is read from the layout template of the consortium (read_layout_spec), and the layout of a configuration is written once
+# (write_layout) with its models, initial biomasses, media and parameters. world_media is sparse: only metabolites with a nonzero value,
+# and those that any strain can secrete (secreted_metabolites), or listed by the consortium (e.g. those in its fitness).
+# Example: >>import cometsLayout
+#          >>spec=cometsLayout.read_layout_spec('ecoliLongTerm_layout_template.txt')
+#          >>cometsLayout.write_layout(spec,'ecoliLongTerm_layout_template.txt',keepMets=['ac[e]'],initialPop=[0.01,0.01])
+
+import os
+import os.path
+import re
+import cobra
+import cobra.flux_analysis
+import modelCompression
+
+
+################################################################
+### FUNCTION read_layout_spec ##################################
+def read_layout_spec(layoutFile):
+    '''
+    Call: spec = read_layout_spec(layoutFile)
+
+    INPUTS: layoutFile: COMETS layout (one cell, as FLYCOP templates), possibly with placeholders.
+    OUTPUT: spec: dictionary with 'models' (model_file names), 'gridSize' (list of text), 'media' ({metabolite: value as text} in world_media,
+                  in file order), 'initialPop' (biomass of each model in the only cell, as text) and 'parameters' ({name: value as text}, in file order).
+    '''
+    spec={'models':[],'gridSize':['1','1'],'media':{},'initialPop':[],'parameters':{}}
+    section=None
+    with open(layoutFile) as f:
+        for line in f:
+            fields=line.split()
+            if(len(fields)==0):
+                continue
+            if(fields[0]=='model_file'):
+                spec['models']=fields[1:]
+            elif(fields[0]=='grid_size'):
+                spec['gridSize']=fields[1:]
+            elif(fields[0] in ['world_media','initial_pop','parameters']):
+                section=fields[0]
+            elif(fields[0]=='//'):
+                section=None
+            elif(section=='world_media' and len(fields)==2):
+                spec['media'][fields[0]]=fields[1]
+            elif(section=='initial_pop' and len(fields)>2):
+                spec['initialPop']=fields[2:]
+            elif(section=='parameters' and '=' in line):
+                name,value=line.split('=',1)
+                spec['parameters'][name.strip()]=value.strip()
+    return spec
+### end-function-read_layout_spec
+################################################################
+
+
+################################################################
+### FUNCTION layout_text #######################################
+# Text of the layout of a spec, with only the world_media metabolites with nonzero value or in keepMets.
+def layout_text(spec,keepMets=[]):
+    lines=['model_file\t'+'\t'.join(spec['models']),'\tmodel_world','\t\tgrid_size\t'+'\t'.join(spec['gridSize']),'\t\tworld_media']
+    for met,value in spec['media'].items():
+        try:
+            nonzero=(float(value)!=0.0)
+        except ValueError:
+            raise ValueError('Value of '+met+' not given in world_media: '+value)
+        if(nonzero or met in keepMets):
+            lines.append('\t\t\t'+met+'\t'+value)
+    lines.extend(['\t\t//','\t\tmedia','\t\t//','\t//','\tinitial_pop','\t\t0\t0\t'+'\t'.join(spec['initialPop']),'\t//','parameters'])
+    for name,value in spec['parameters'].items():
+        lines.append('    '+name+' = '+value)
+    lines.append('//')
+    return '\n'.join(lines)+'\n'
+### end-function-layout_text
+################################################################
+
+
+################################################################
+### FUNCTION write_layout ######################################
+def write_layout(spec,layoutFile,keepMets=[],models=None,initialPop=None,media=None,parameters=None):
+    '''
+    Call: write_layout(spec,layoutFile,keepMets,models,initialPop,media,parameters)
+
+    INPUTS: spec: layout spec (see read_layout_spec), not modified.
+            layoutFile: layout written (in a single write).
+            keepMets: world_media metabolites written even with value 0 (e.g. secreted_metabolites of the strains).
+            models: model_file names replacing those of spec.
+            initialPop: initial biomass of each model, replacing that of spec.
+            media: {metabolite: value} replacing or adding world_media values of spec (e.g. placeholders).
+            parameters: {name: value} replacing or adding parameters of spec.
+    '''
+    layout=dict(spec)
+    if models is not None:
+        layout['models']=list(models)
+    if initialPop is not None:
+        layout['initialPop']=[str(value) for value in initialPop]
+    if media is not None:
+        layout['media']=dict(spec['media'])
+        layout['media'].update({met:str(value) for met,value in media.items()})
+    if parameters is not None:
+        layout['parameters']=dict(spec['parameters'])
+        layout['parameters'].update({name:str(value) for name,value in parameters.items()})
+    text=layout_text(layout,set(keepMets))
+    with open(layoutFile,'w') as f:
+        f.write(text)
+### end-function-write_layout
+################################################################
+
+
+################################################################
+### FUNCTION set_parameters, seed_layout, check_seed ###########
+# Change (or add) parameters of a layout file in place, keeping the rest of it, e.g. the random seed of COMETS for a replicate
+# (seed None: the layout is not changed, COMETS takes a random one).
+# check_seed fails (RuntimeError) if the output of a seeded COMETS run does not report that randomSeed, i.e. if that COMETS version may not
+# read it from the layout and common random numbers (FLYCOP_CRN_SEED) would not reduce the variance among configurations.
+def set_parameters(layoutFile,parameters):
+    spec=read_layout_spec(layoutFile)
+    write_layout(spec,layoutFile,list(spec['media']),parameters=parameters)
+
+def seed_layout(layoutFile,seed):
+    if seed is not None:
+        set_parameters(layoutFile,{'randomSeed':seed})
+
+def check_seed(outputFile,seed):
+    if seed is None:
+        return
+    with open(outputFile,errors='replace') as f:
+        reported=re.findall(r'randomSeed\s*[=:]?\s*(-?\d+)',f.read())
+    if str(seed) not in reported:
+        raise RuntimeError('COMETS did not report randomSeed '+str(seed)+' in '+outputFile+' (reported: '+(','.join(reported) or 'none')+
+                           '): common random numbers are not supported by this COMETS, unset FLYCOP_CRN_SEED or use FLYCOP_BACKEND=dfba')
+### end-function-set_parameters, seed_layout, check_seed
+################################################################
+
+
+################################################################
+### FUNCTION secreted_metabolites ##############################
+def secreted_metabolites(secretedFile,loadModelFunctions,mediaMets,variableReactions=[]):
+    '''
+    Call: mets = secreted_metabolites(secretedFile,loadModelFunctions,mediaMets,variableReactions)
+
+    INPUTS: secretedFile: file with the result (one metabolite per line), as the models of initialize_models: only computed the first time.
+            loadModelFunctions: list of functions without arguments returning the COBRApy base model of each strain.
+            mediaMets: metabolites that could be in the media (uptake of other ones is closed, see modelCompression.media_model).
+            variableReactions: reactions whose bounds change among configurations, fully open (-1000,1000).
+    OUTPUT: mets: metabolites (e.g. 'ac[e]') whose exchange reaction can have positive flux (FVA with fraction of optimum 0) in any strain.
+    '''
+    if not(os.path.exists(secretedFile)):
+        mets=set()
+        for loadModelFunction in loadModelFunctions:
+            model=modelCompression.media_model(loadModelFunction(),mediaMets,{rxnId:(-1000,1000) for rxnId in variableReactions})
+            exchanges=[rxn for rxn in model.reactions if modelCompression.is_exchange(rxn) and rxn.upper_bound>0]
+            fva=cobra.flux_analysis.flux_variability_analysis(model,[rxn.id for rxn in exchanges],fraction_of_optimum=0)
+            if hasattr(fva,'loc'): # COBRApy>=0.6: DataFrame
+                maximum=fva['maximum'].to_dict()
+            else:
+                maximum={rxnId:values['maximum'] for rxnId,values in fva.items()}
+            mets.update(next(iter(rxn.metabolites)).id for rxn in exchanges if maximum[rxn.id]>1e-9)
+        with open(secretedFile,'w') as f:
+            f.write(''.join(met+'\n' for met in sorted(mets)))
+    with open(secretedFile) as f:
+        return [line.strip() for line in f if line.strip()!='']
+### end-function-secreted_metabolites
+################################################################
@@ -0,0 +1,477 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Reading of COMETS output logs in python, without shell pipelines (egrep, cut, awk) over the log files, used by the consortia pipelines (*FLYCOP.py).
+# Example: >>import cometsLogIO
+#          >>names={1:cometsLogIO.cmt_reaction_names('ecoli_1_tmp.mat.cmt'),2:cometsLogIO.cmt_reaction_names('ecoli_2_tmp.mat.cmt')}
+#          >>fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',names,{1:['EX_ac(e)'],2:['EX_ac(e)']})
+#          >>uptakeAc1=cometsLogIO.flux_at(fluxes[1],2,'EX_ac(e)')
+#          >>media=cometsLogIO.read_media_log('media_log_template.txt')
+#          >>metDict=cometsLogIO.media_composition('media_log_template.txt',media,100)
+# Flux log lines (one per cycle and model): fluxes{cycle}{1}{1}{model} = [flux1 flux2 ... fluxN];  (fluxes in .cmt reaction order)
+# Media log: media_names = { 'met1[e]', 'met2[e]', ... }; and, per cycle and metabolite, media_<cycle>{<met>} = sparse(1, 1);
+#            followed by media_<cycle>{<met>}(1, 1) = <value>; if the concentration is not 0 (the last value in a cycle is the valid one).
+# Total biomass log: <cycle> <biomass strain1> <biomass strain2> ...
+#
+# Call from command line (in the directory of the logs, used by plot_*.sh):
+#   python3 cometsLogIO.py biomass_vs_media <suffix> <met1 (without [e])> ... <metN>   # writes biomass_vs_<met1>_..._<metN>_<suffix>.txt
+#   python3 cometsLogIO.py media_composition <suffix> <cycle>                           # writes media_cycle_<cycle>.txt (get_media_composition_oneCycle.sh)
+#
+# Selective logging: each consortium declares the logs and flux log reactions needed by its fitness functions (log_needs in *FLYCOP.py).
+# A flux log not needed is not written by COMETS (writefluxlog = false in the layout), and the flux log of each run is replaced by the
+# reactions and cycles read for the fitness (write_flux_log), with '% reactions{model} = id1 id2 ...' header lines naming its columns.
+#
+# Logs consumed through named pipes (cometsWatcher.run_comets_fifo) are kept in memory as lists of lines: the read_* functions take either
+# a log file or that list of lines (a flux log reduced to some columns by flux_line_filter).
+#
+# Environment variables:
+#  FLYCOP_SELECTIVE_LOGS: 0 to always write and keep complete COMETS logs (default: 1).
+
+import os
+import os.path
+import sys
+import collections
+import contextlib
+import numpy as np
+
+
+################################################################
+### FUNCTION log_lines #########################################
+# Lines of a log: the open log file, or the log itself if it is already a list of lines in memory (see cometsWatcher.run_comets_fifo).
+@contextlib.contextmanager
+def log_lines(log,mode='r'):
+    if isinstance(log,str):
+        with open(log,mode,buffering=1024*1024) as f:
+            yield f
+    else:
+        yield log
+### end-function-log_lines
+################################################################
+
+
+################################################################
+### FUNCTION cmt_section #######################################
+# Lines (stripped) of a section of a COMETS model file (.cmt), between its name and '//'
+def cmt_section(cmtFile,section):
+    lines=[]
+    with open(cmtFile) as f:
+        inSection=False
+        for line in f:
+            line=line.strip()
+            if inSection:
+                if(line=='//'):
+                    break
+                lines.append(line)
+            elif(line.split(' ')[0]==section):
+                inSection=True
+    return lines
+### end-function-cmt_section
+################################################################
+
+
+################################################################
+### FUNCTION cmt_reaction_names, cmt_objective #################
+# Reaction ids of a .cmt model in COMETS order (the column order of the flux log), and id of its objective reaction.
+def cmt_reaction_names(cmtFile):
+    return cmt_section(cmtFile,'REACTION_NAMES')
+
+def cmt_objective(cmtFile):
+    return cmt_reaction_names(cmtFile)[int(cmt_section(cmtFile,'OBJECTIVE')[0])-1]
+### end-function-cmt_reaction_names, cmt_objective
+################################################################
+
+
+################################################################
+### FUNCTION selective_logs ####################################
+def selective_logs():
+    return os.environ.get('FLYCOP_SELECTIVE_LOGS','1')!='0'
+### end-function-selective_logs
+################################################################
+
+
+################################################################
+### FUNCTION read_flux_log #####################################
+def read_flux_log(fluxLogFile,reactionNames,reactions=None,cycles=None):
+    '''
+    Call: fluxes = read_flux_log(fluxLogFile,reactionNames,reactions,cycles)
+
+    INPUTS: fluxLogFile: COMETS flux log (e.g. 'flux_log_template.txt'), complete or written by write_flux_log, or its lines (see log_lines).
+            reactionNames: dictionary {model number (1-based, as in the log): list of reaction ids in COMETS order} (see cmt_reaction_names).
+                           Models not in this dictionary are skipped. None: those in the header lines of a log written by write_flux_log.
+            reactions: dictionary {model number: list of reaction ids} with the only reactions to keep per model (default: all of them).
+            cycles: cycles to keep (default: all of them). Lines of other cycles are skipped without parsing their fluxes.
+    OUTPUT: fluxes: dictionary {model number: flux table}, read in a single pass over the log. Each flux table is a dictionary with:
+                    'cycles': array with the cycle of each row, in log order.
+                    'fluxes': array (cycles x reactions) with the fluxes of the kept reactions.
+                    'index': {reaction id: column in 'fluxes'}.
+    '''
+    if reactionNames is None:
+        reactionNames={}
+        with log_lines(fluxLogFile) as f:
+            for line in f:
+                if line.startswith('% reactions{'):
+                    key,names=line.split('=',1)
+                    reactionNames[int(key.strip()[12:-1])]=names.split()
+                elif line.startswith('fluxes{'):
+                    break
+    columns={}
+    for model,names in reactionNames.items():
+        if(reactions is None or model not in reactions):
+            columns[model]=list(range(len(names)))
+        else:
+            position={rxnId:y for y,rxnId in enumerate(names)}
+            columns[model]=[position[rxnId] for rxnId in reactions[model]]
+    # Fluxes after the last kept column are not split
+    maxSplit={model:(max(cols)+1 if len(cols)>0 else 0) for model,cols in columns.items()}
+    if cycles is not None:
+        cycles=set(cycles)
+    logCycles={model:[] for model in columns}
+    rows={model:[] for model in columns}
+    with log_lines(fluxLogFile) as f:
+        for line in f:
+            if not line.startswith('fluxes{'):
+                continue
+            key,values=line.split('=',1)
+            keyV=key.strip()[7:-1].split('}{')
+            model=int(keyV[3])
+            if model not in columns:
+                continue
+            cycle=int(keyV[0])
+            if(cycles is not None and cycle not in cycles):
+                continue
+            valuesV=values.strip().lstrip('[').rstrip('];').split(None,maxSplit[model])
+            logCycles[model].append(cycle)
+            rows[model].append([float(valuesV[y]) for y in columns[model]])
+    fluxes={}
+    for model,cols in columns.items():
+        names=[reactionNames[model][y] for y in cols]
+        fluxes[model]={'cycles':np.array(logCycles[model],dtype=int),
+                       'fluxes':np.array(rows[model],dtype=float).reshape(len(rows[model]),len(cols)),
+                       'index':{rxnId:x for x,rxnId in enumerate(names)}}
+    return fluxes
+### end-function-read_flux_log
+################################################################
+
+
+################################################################
+### FUNCTION write_flux_log ####################################
+# Flux log with only the reactions and cycles of some flux tables (as read_flux_log), in COMETS format, with header lines naming the columns.
+def write_flux_log(fluxLogFile,fluxes):
+    lines=[]
+    for model,fluxTable in sorted(fluxes.items()):
+        names=sorted(fluxTable['index'],key=lambda rxnId: fluxTable['index'][rxnId])
+        lines.append('% reactions{'+str(model)+'} = '+' '.join(names)+'\n')
+    rows=[(cycle,model,row) for model,fluxTable in fluxes.items() for cycle,row in zip(fluxTable['cycles'],fluxTable['fluxes'])]
+    for cycle,model,row in sorted(rows,key=lambda item: (item[0],item[1])):
+        lines.append('fluxes{'+str(cycle)+'}{1}{1}{'+str(model)+'} = ['+' '.join(str(float(value)) for value in row)+'];\n')
+    with open(fluxLogFile,'w') as f:
+        f.write(''.join(lines))
+### end-function-write_flux_log
+################################################################
+
+
+################################################################
+### FUNCTION flux_line_filter ##################################
+# Function reducing a flux log line to the fluxes of some reactions ({model number: reaction ids}, as in read_flux_log) in that order, and None
+# for lines of other models, to keep only those columns of a flux log read through a named pipe (see cometsWatcher.run_comets_fifo).
+# The kept lines are then read with read_flux_log(lines,reactions).
+def flux_line_filter(reactionNames,reactions):
+    columns={model:[reactionNames[model].index(rxnId) for rxnId in rxnIds] for model,rxnIds in reactions.items()}
+    maxSplit={model:(max(cols)+1 if len(cols)>0 else 0) for model,cols in columns.items()}
+    def flux_line(line):
+        if not line.startswith('fluxes{'):
+            return None
+        key,values=line.split('=',1)
+        key=key.strip()
+        model=int(key[7:-1].split('}{')[3])
+        if model not in columns:
+            return None
+        valuesV=values.strip().lstrip('[').rstrip('];').split(None,maxSplit[model])
+        return key+' = ['+' '.join([valuesV[y] for y in columns[model]])+'];'
+    return flux_line
+### end-function-flux_line_filter
+################################################################
+
+
+################################################################
+### FUNCTION flux_at ###########################################
+# Flux of reaction rxnId in the given cycle (the last row of that cycle). None if the cycle is not in the log.
+def flux_at(fluxTable,cycle,rxnId):
+    rows=np.flatnonzero(fluxTable['cycles']==cycle)
+    if(rows.size==0):
+        return None
+    return float(fluxTable['fluxes'][rows[-1],fluxTable['index'][rxnId]])
+### end-function-flux_at
+################################################################
+
+
+################################################################
+### FUNCTION mean_positive_flux ################################
+# Sum of the positive fluxes of reaction rxnId divided by the number of rows (i.e. negative fluxes count as 0), in the window of
+# numCycles+1 consecutive rows of the log beginning with the first row of cycle firstCycle (equivalent to egrep -A<numCycles>).
+# None if firstCycle is not in the log.
+def mean_positive_flux(fluxTable,firstCycle,numCycles,rxnId):
+    rows=np.flatnonzero(fluxTable['cycles']==firstCycle)
+    if(rows.size==0):
+        return None
+    window=fluxTable['fluxes'][rows[0]:rows[0]+numCycles+1,fluxTable['index'][rxnId]]
+    return float(np.where(window>0,window,0.0).sum()/window.size)
+### end-function-mean_positive_flux
+################################################################
+
+
+################################################################
+### FUNCTION media_index #######################################
+# {metabolite id, with and without compartment (e.g. 'glc_D[e]' and 'glc_D'): position in names}
+def media_index(names):
+    index={}
+    for x,name in enumerate(names):
+        index[name]=x
+        index[name.split('[')[0]]=x
+    return index
+### end-function-media_index
+################################################################
+
+
+################################################################
+### FUNCTION read_media_log ####################################
+def read_media_log(mediaLogFile):
+    '''
+    Call: media = read_media_log(mediaLogFile)
+
+    INPUTS: mediaLogFile: COMETS media log (e.g. 'media_log_template.txt'), or its lines (see log_lines).
+    OUTPUT: media: dictionary, read in a single pass over the log, with:
+                   'cycles': array with the cycles in the log, in log order.
+                   'media': dense array (cycles x metabolites) with the concentration of each metabolite (0.0 if sparse).
+                   'names': metabolite ids, in media_names order.
+                   'index': {metabolite id, with and without compartment (e.g. 'glc_D[e]' and 'glc_D'): column in 'media'}.
+                   'offsets': {cycle: [first byte, end byte]} of the lines of each cycle in the log (see media_composition); [first line, end line] for lines.
+    '''
+    names=[]
+    cycles=[]
+    rows=[]
+    rowOfCycle={}
+    offsets={}
+    offset=0
+    with log_lines(mediaLogFile,'rb') as f:
+        for lineB in f:
+            lineStart=offset
+            if isinstance(lineB,bytes):
+                offset=offset+len(lineB)
+                line=lineB.decode('utf-8')
+            else:
+                offset=offset+1
+                line=lineB
+            if line.startswith('media_names'):
+                names=[name.strip().strip("'") for name in line.split('{',1)[1].split('}',1)[0].split(',')]
+                continue
+            if not line.startswith('media_'):
+                continue
+            brace=line.index('{')
+            cycle=int(line[6:brace])
+            closeBrace=line.index('}',brace)
+            met=int(line[brace+1:closeBrace])-1
+            if cycle not in rowOfCycle:
+                rowOfCycle[cycle]=len(rows)
+                cycles.append(cycle)
+                rows.append([0.0]*len(names))
+                offsets[cycle]=[lineStart,offset]
+            else:
+                offsets[cycle][1]=offset
+            if line.startswith('(1, 1)',closeBrace+1):
+                rows[rowOfCycle[cycle]][met]=float(line.split('=',1)[1].strip().rstrip(';'))
+            else: # sparse(1, 1): concentration 0
+                rows[rowOfCycle[cycle]][met]=0.0
+    return {'cycles':np.array(cycles,dtype=int),'media':np.array(rows,dtype=float).reshape(len(rows),len(names)),'names':names,'index':media_index(names),'offsets':offsets}
+### end-function-read_media_log
+################################################################
+
+
+################################################################
+### FUNCTION media_composition #################################
+def media_composition(mediaLogFile,media,cycle):
+    '''
+    Call: metDict = media_composition(mediaLogFile,media,cycle)
+
+    INPUTS: mediaLogFile: COMETS media log (or its lines), already read with read_media_log.
+            media: output of read_media_log(mediaLogFile), with the byte offsets of each cycle.
+            cycle: cycle to get the media composition.
+    OUTPUT: metDict: {metabolite id without compartment: concentration as written in the log ('0.0' if sparse)}, for all the
+                     metabolites in media_names, read with a single seek over the lines of that cycle (as get_media_composition_oneCycle.sh).
+    '''
+    metDict={name.split('[')[0]:'0.0' for name in media['names']}
+    if cycle not in media['offsets']:
+        return metDict
+    firstByte,endByte=media['offsets'][cycle]
+    prefix='media_'+str(cycle)+'{'
+    if isinstance(mediaLogFile,str):
+        with open(mediaLogFile,'rb') as f:
+            f.seek(firstByte)
+            lines=f.read(endByte-firstByte).decode('utf-8').splitlines()
+    else:
+        lines=mediaLogFile[firstByte:endByte]
+    for line in lines:
+        if not line.startswith(prefix):
+            continue
+        closeBrace=line.index('}')
+        met=media['names'][int(line[len(prefix):closeBrace])-1].split('[')[0]
+        if line.startswith('(1, 1)',closeBrace+1):
+            metDict[met]=line.split('=',1)[1].strip().rstrip(';')
+        else: # sparse(1, 1): concentration 0
+            metDict[met]='0.0'
+    return metDict
+### end-function-media_composition
+################################################################
+
+
+################################################################
+### FUNCTION log_cycle #########################################
+# Cycle of a media (prefix 'media_', sep '{') or flux (prefix 'fluxes{', sep '}') log line, and position of sep. None if other line.
+def log_cycle(line,prefix,sep):
+    if not line.startswith(prefix):
+        return None,-1
+    end=line.find(sep,len(prefix))
+    if(end<0 or not line[len(prefix):end].isdigit()):
+        return None,-1
+    return int(line[len(prefix):end]),end
+### end-function-log_cycle
+################################################################
+
+
+################################################################
+### FUNCTION stitch_cycle_lines ################################
+# Streaming concatenation of two phases of a media or flux log (files or lines): the lines of log1 before firstLine2 (the first line of
+# cycle endCycle+1), and the lines of cycles 1..maxCycles2 of log2 renumbered as endCycle+1..endCycle+maxCycles2.
+# One pass over each log (logs are ordered by cycle), as the previous egrep|sed per cycle.
+def stitch_cycle_lines(log1,log2,prefix,sep,firstLine2,endCycle,maxCycles2):
+    with log_lines(log1) as f:
+        for line in f:
+            if line.startswith(firstLine2):
+                break
+            yield line
+    with log_lines(log2) as f:
+        for line in f:
+            cycle,end=log_cycle(line,prefix,sep)
+            if(cycle is not None and cycle>=1 and cycle<=maxCycles2):
+                yield prefix+str(cycle+endCycle)+line[end:].rstrip('\n')+'\n'
+### end-function-stitch_cycle_lines
+################################################################
+
+
+################################################################
+### FUNCTION stitch_biomass_lines ##############################
+# Concatenation of two phases of a total biomass log (files or lines): first endCycle+1 lines of the first log and last maxCycles2 lines
+# of the second log, renumbered (only two strains).
+def stitch_biomass_lines(log1,log2,endCycle,maxCycles2):
+    with log_lines(log1) as f:
+        for x,line in enumerate(f):
+            if(x>endCycle):
+                break
+            yield line
+    with log_lines(log2) as f:
+        lines2=collections.deque(f,maxlen=maxCycles2)
+    for count,line in enumerate(lines2,start=endCycle+1):
+        yield str(count)+"\t"+str(line.split()[1])+"\t"+str(line.split()[2])+"\n"
+### end-function-stitch_biomass_lines
+################################################################
+
+
+################################################################
+### FUNCTION stitch_logs #######################################
+def stitch_logs(suffix1,suffix2,suffix,endCycle,maxCycles2):
+    '''
+    Call: stitch_logs(suffix1,suffix2,suffix,endCycle,maxCycles2)
+
+    INPUTS: suffix1, suffix2: suffixes of the logs of the first and second COMETS runs (e.g. 'template1', 'template2').
+            suffix: suffix of the combined logs (e.g. 'template').
+            endCycle: last cycle of the first run kept. The second run started from the biomass and media in this cycle.
+            maxCycles2: number of cycles of the second run.
+    OUTPUT: total_biomass_log_<suffix>.txt, media_log_<suffix>.txt and flux_log_<suffix>.txt, with cycles 0..endCycle of the first run
+            followed by cycles 1..maxCycles2 of the second one renumbered, written in one streaming pass over each log.
+    '''
+    logNames={'biomass':'total_biomass_log_','media':'media_log_','flux':'flux_log_'}
+    # Flux log not written by COMETS if the fitness does not need it (see selective logging)
+    logs1={logKind:logName+suffix1+'.txt' for logKind,logName in logNames.items() if os.path.exists(logName+suffix1+'.txt')}
+    logs2={logKind:logName+suffix2+'.txt' for logKind,logName in logNames.items() if os.path.exists(logName+suffix2+'.txt')}
+    for logKind,lines in stitch_log_lines(logs1,logs2,endCycle,maxCycles2).items():
+        with open(logNames[logKind]+suffix+'.txt','w',buffering=1024*1024) as fout:
+            fout.writelines(lines)
+### end-function-stitch_logs
+################################################################
+
+
+################################################################
+### FUNCTION stitch_log_lines ##################################
+# Logs of two COMETS runs ({log kind: log file or lines}, e.g. of cometsWatcher.run_comets_fifo) combined as in stitch_logs, for log kinds
+# in both runs: {log kind: generator of the combined lines}, read in a streaming pass when consumed.
+def stitch_log_lines(logs1,logs2,endCycle,maxCycles2):
+    stitched={}
+    # A.- biomass
+    if('biomass' in logs1 and 'biomass' in logs2):
+        stitched['biomass']=stitch_biomass_lines(logs1['biomass'],logs2['biomass'],endCycle,maxCycles2)
+    # B.- media: media_<cycle>{met}
+    if('media' in logs1 and 'media' in logs2):
+        stitched['media']=stitch_cycle_lines(logs1['media'],logs2['media'],'media_','{','media_'+str(endCycle+1)+'{1}',endCycle,maxCycles2)
+    # C.- fluxes: fluxes{cycle}{1}{1}{modelNumber}. The first cycle of the second run is kept: it is different, given the last biomass and media composition in the first run.
+    if('flux' in logs1 and 'flux' in logs2):
+        stitched['flux']=stitch_cycle_lines(logs1['flux'],logs2['flux'],'fluxes{','}','fluxes{'+str(endCycle+1)+'}{1}{1}{1}',endCycle,maxCycles2)
+    return stitched
+### end-function-stitch_log_lines
+################################################################
+
+
+################################################################
+### FUNCTION read_total_biomass_log ############################
+# Total biomass log (or its lines) as array (cycles x (1+strains)): cycle and biomass of each strain.
+def read_total_biomass_log(biomassLogFile):
+    with log_lines(biomassLogFile) as f:
+        rows=[[float(value) for value in line.split()] for line in f if line.strip()!='']
+    return np.array(rows,dtype=float)
+### end-function-read_total_biomass_log
+################################################################
+
+
+################################################################
+### FUNCTION biomass_vs_media ##################################
+# Table (cycles x (1+strains+mets)) with cycle, biomass of each strain and concentration of each metabolite in mets (ids with or
+# without compartment), as the biomass_vs_*.txt files of plot_*.sh. Rows are aligned by cycle number: only the cycles of the biomass
+# log also in the media log (e.g. with different log rates, or a log cut at a different cycle), in biomass log order.
+def biomass_vs_media(biomass,media,mets):
+    rowOfCycle={int(cycle):x for x,cycle in enumerate(media['cycles'])}
+    biomassRows=[x for x in range(biomass.shape[0]) if int(biomass[x,0]) in rowOfCycle]
+    mediaRows=[rowOfCycle[int(biomass[x,0])] for x in biomassRows]
+    columns=[media['index'][met] for met in mets]
+    return np.hstack([biomass[biomassRows],media['media'][mediaRows][:,columns]])
+### end-function-biomass_vs_media
+################################################################
+
+
+################################################################
+### FUNCTION write_table #######################################
+# Write a biomass_vs_media table as tab-separated text file (cycle as integer), input of plot.*.r scripts.
+def write_table(outFile,table):
+    with open(outFile,'w') as f:
+        f.write(''.join([str(int(row[0]))+'\t'+'\t'.join([repr(float(value)) for value in row[1:]])+'\n' for row in table]))
+### end-function-write_table
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv)>3 and sys.argv[1]=='biomass_vs_media'):
+        suffix=sys.argv[2]
+        mets=sys.argv[3:]
+        table=biomass_vs_media(read_total_biomass_log('total_biomass_log_'+suffix+'.txt'),read_media_log('media_log_'+suffix+'.txt'),mets)
+        write_table('biomass_vs_'+'_'.join(mets)+'_'+suffix+'.txt',table)
+    elif(len(sys.argv)==4 and sys.argv[1]=='media_composition'):
+        suffix=sys.argv[2]
+        cycle=int(sys.argv[3])
+        mediaLogFile='media_log_'+suffix+'.txt'
+        metDict=media_composition(mediaLogFile,read_media_log(mediaLogFile),cycle)
+        with open('media_cycle_'+str(cycle)+'.txt','w') as f:
+            f.write('#met\tvalueOneCycle\n'+''.join([met+'\t'+value+'\n' for met,value in metDict.items()]))
+    else:
+        print('Usage: cometsLogIO.py biomass_vs_media <suffix> <met1> ... <metN> | media_composition <suffix> <cycle>')
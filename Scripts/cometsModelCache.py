@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Persistent, content-addressed cache of COMETS model files (.cmt), shared by all the FLYCOP runs in the same machine.
+# The key of a strain model is: hash(original GEM files) + recipe (consortium-specific modification code, with version) + strain parameters.
+# So the same strain (e.g. the same (glu,ac,o2) tuple in ecoliLongTerm) is only built and exported once, even between strain 1 and strain 2,
+# or among different SMAC evaluations. Cached files are hard-linked (or symlinked/copied) into the working directory.
+# Example: >>cached_cmt(['ModelsInput/iJO1366.mat'],'ecoliLongTerm_strain_v1',{'glu':-10.0,'ac':-2.0,'o2':-12.0},'ecoli_1_tmp.mat.cmt',buildFunction)
+#
+# It also keeps the precompiled skeleton of each base model (see cometsModelIO.model_skeleton), to build new strains by patching it.
+#
+# Environment variables:
+#  FLYCOP_CACHE_DIR: root directory of FLYCOP caches (default: ~/.cache/FLYCOP). .cmt files are stored in its 'cmt' subdirectory.
+#  FLYCOP_CMT_CACHE: '0' to disable this cache (always build models in the working directory, as before).
+#  FLYCOP_CMT_CACHE_MAXMB: maximum size of the .cmt cache, in MB (default: 2048). Least recently used files are removed first.
+
+import os
+import os.path
+import errno
+import fcntl
+import hashlib
+import json
+import pickle
+import shutil
+import tempfile
+from contextlib import contextmanager
+import cometsModelIO
+
+cacheRoot=os.environ.get('FLYCOP_CACHE_DIR',os.path.join(os.path.expanduser('~'),'.cache','FLYCOP'))
+cacheDir=os.path.join(cacheRoot,'cmt')
+enabled=(os.environ.get('FLYCOP_CMT_CACHE','1')!='0')
+maxBytes=int(float(os.environ.get('FLYCOP_CMT_CACHE_MAXMB','2048'))*1024*1024)
+skeletonDir=os.path.join(cacheRoot,'skeleton')
+
+# Skeletons already loaded in this process: {key: skeleton}
+_skeletons={}
+
+# Hashes of source files already computed in this process: {absolutePath: (mtime,size,sha256)}
+_fileHashes={}
+
+
+################################################################
+### FUNCTION file_hash #########################################
+# sha256 of a file content, computed once per (path, mtime, size) in this process.
+def file_hash(path):
+    path=os.path.abspath(path)
+    st=os.stat(path)
+    if path in _fileHashes and _fileHashes[path][0:2]==(st.st_mtime,st.st_size):
+        return _fileHashes[path][2]
+    h=hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1024*1024), b''):
+            h.update(block)
+    _fileHashes[path]=(st.st_mtime,st.st_size,h.hexdigest())
+    return h.hexdigest()
+### end-function-file_hash
+################################################################
+
+
+################################################################
+### FUNCTION cache_key #########################################
+# Key of a strain model. Numeric parameters are canonicalized as float, so -10 and -10.0 give the same key.
+def cache_key(sourceModelFiles,recipe,params):
+    canonicalParams={}
+    for name,value in params.items():
+        if isinstance(value,(int,float)) and not isinstance(value,bool):
+            value=repr(float(value))
+        canonicalParams[name]=value
+    content={'sources':[file_hash(f) for f in sourceModelFiles],'recipe':recipe,'params':canonicalParams}
+    return hashlib.sha256(json.dumps(content,sort_keys=True).encode('utf-8')).hexdigest()
+### end-function-cache_key
+################################################################
+
+
+################################################################
+### FUNCTION file_lock #########################################
+# Exclusive lock among processes (fcntl.flock on a lock file), to make safe the concurrent access to the cache.
+@contextmanager
+def file_lock(lockFile):
+    with open(lockFile,'a') as f:
+        fcntl.flock(f,fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f,fcntl.LOCK_UN)
+### end-function-file_lock
+################################################################
+
+
+################################################################
+### FUNCTION link_file #########################################
+# Link src into dst: hard link if possible (same filesystem), otherwise symlink, otherwise copy.
+# dst is always removed before, so a previous hard-linked file is never overwritten in place (it would change the cached file).
+def link_file(src,dst):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src,dst)
+    except OSError as exc:
+        if exc.errno==errno.ENOENT:
+            raise
+        try:
+            os.symlink(os.path.abspath(src),dst)
+        except OSError:
+            shutil.copy(src,dst)
+### end-function-link_file
+################################################################
+
+
+################################################################
+### FUNCTION evict #############################################
+# Remove least recently used .cmt files (by mtime, updated in each hit) until the cache size is below maxBytes.
+def evict():
+    with file_lock(os.path.join(cacheDir,'cache.lock')):
+        entries=[]
+        for name in os.listdir(cacheDir):
+            if name.endswith('.cmt'):
+                try:
+                    st=os.stat(os.path.join(cacheDir,name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime,st.st_size,name))
+        totalSize=sum(size for mtime,size,name in entries)
+        for mtime,size,name in sorted(entries):
+            if totalSize<=maxBytes:
+                break
+            try:
+                os.remove(os.path.join(cacheDir,name))
+                totalSize=totalSize-size
+            except FileNotFoundError:
+                pass
+### end-function-evict
+################################################################
+
+
+################################################################
+### FUNCTION cached_cmt ########################################
+def cached_cmt(sourceModelFiles,recipe,params,cmtFile,buildFunction):
+    '''
+    Call: hit = cached_cmt(sourceModelFiles,recipe,params,cmtFile,buildFunction)
+
+    INPUTS: sourceModelFiles: list of original GEM files the strain model is derived from (e.g. ['ModelsInput/iJO1366.mat']).
+            recipe: identifier of the code building the strain model from the GEM. Change its version when that code changes.
+            params: dictionary with the strain-level parameters.
+            cmtFile: COMETS model file required in the working directory (e.g. 'ecoli_1_tmp.mat.cmt').
+            buildFunction: function without arguments writing cmtFile in the working directory. Only called in a cache miss.
+    OUTPUT: hit: True if cmtFile was linked from the cache, False if it was built.
+    '''
+    if not enabled:
+        buildFunction()
+        return False
+    os.makedirs(cacheDir,exist_ok=True)
+    key=cache_key(sourceModelFiles,recipe,params)
+    cachedFile=os.path.join(cacheDir,key+'.cmt')
+    # 1.- Hit
+    try:
+        os.utime(cachedFile,None)
+        link_file(cachedFile,cmtFile)
+        return True
+    except FileNotFoundError:
+        pass
+    # 2.- Miss: only one process builds each key, the others wait and link the result.
+    with file_lock(os.path.join(cacheDir,key+'.lock')):
+        if os.path.exists(cachedFile):
+            os.utime(cachedFile,None)
+            link_file(cachedFile,cmtFile)
+            return True
+        buildFunction()
+        # Atomic publication: a temporary file in the cache directory is renamed to its final name.
+        fd,tmpFile=tempfile.mkstemp(dir=cacheDir,suffix='.tmp')
+        os.close(fd)
+        shutil.copy(cmtFile,tmpFile)
+        os.replace(tmpFile,cachedFile)
+    try:
+        os.remove(os.path.join(cacheDir,key+'.lock'))
+    except FileNotFoundError:
+        pass
+    evict()
+    return False
+### end-function-cached_cmt
+################################################################
+
+
+################################################################
+### FUNCTION cached_skeleton ###################################
+def cached_skeleton(sourceModelFiles,recipe,loadModelFunction):
+    '''
+    Call: skeleton = cached_skeleton(sourceModelFiles,recipe,loadModelFunction)
+
+    INPUTS: sourceModelFiles: list of original GEM files the base model is derived from (e.g. ['ModelsInput/iJO1366.mat']).
+            recipe: identifier of the code building the base model from the GEM. Change its version when that code changes.
+            loadModelFunction: function without arguments returning the base COBRApy model. Only called in a cache miss.
+    OUTPUT: skeleton: precompiled base model (see cometsModelIO.model_skeleton), loaded once per process and stored in disk (pickle).
+    '''
+    key=cache_key(sourceModelFiles,recipe,{})
+    if key in _skeletons:
+        return _skeletons[key]
+    if not enabled:
+        _skeletons[key]=cometsModelIO.model_skeleton(loadModelFunction())
+        return _skeletons[key]
+    os.makedirs(skeletonDir,exist_ok=True)
+    skeletonFile=os.path.join(skeletonDir,key+'.pkl')
+    with file_lock(os.path.join(skeletonDir,key+'.lock')):
+        if os.path.exists(skeletonFile):
+            with open(skeletonFile,'rb') as f:
+                skeleton=pickle.load(f)
+        else:
+            skeleton=cometsModelIO.model_skeleton(loadModelFunction())
+            fd,tmpFile=tempfile.mkstemp(dir=skeletonDir,suffix='.tmp')
+            with os.fdopen(fd,'wb') as f:
+                pickle.dump(skeleton,f,protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpFile,skeletonFile)
+    _skeletons[key]=skeleton
+    return skeleton
+### end-function-cached_skeleton
+################################################################
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Shared conversion of GEMs (COBRApy models) into COMETS model files (.cmt), used by all the consortia pipelines (*FLYCOP.py).
+# Example: >>import cometsModelIO
+#          >>cometsModelIO.mat_to_comets('ecoli_1_tmp.mat')   # writes ecoli_1_tmp.mat.cmt
+# A model can also be precompiled once as 'skeleton' (model_skeleton), and then new .cmt files are written patching only the bounds
+# or S matrix coefficients that change among strains (skeleton_to_comets), without loading or exporting the whole model again.
+
+import os
+import cobra
+
+
+################################################################
+### FUNCTION stoichiometric_coo ################################
+# Build the stoichiometric matrix in COO format (0-based metabolite index, 0-based reaction index, coefficient) straight from
+# the sparse structure of the model (each reaction only knows its own metabolites), sorted by metabolite and then by reaction,
+# i.e. in the same order that the SMATRIX section of a .cmt file is written.
+def stoichiometric_coo(model):
+    metIndex={met:x for x,met in enumerate(model.metabolites)}
+    rowsByMet=[[] for x in range(len(model.metabolites))]
+    for y,rxn in enumerate(model.reactions):
+        for met,coeff in rxn.metabolites.items():
+            # Reactions are visited in increasing order, so every metabolite row is already sorted by reaction index.
+            rowsByMet[metIndex[met]].append((y,coeff))
+    cooRows=[]
+    cooCols=[]
+    cooValues=[]
+    for x,row in enumerate(rowsByMet):
+        for y,coeff in row:
+            cooRows.append(x)
+            cooCols.append(y)
+            cooValues.append(coeff)
+    return cooRows,cooCols,cooValues
+### end-function-stoichiometric_coo
+################################################################
+
+
+################################################################
+### FUNCTION objective_reactions, objective_index ##############
+# Reactions of the objective: model.objective is a dictionary {reaction: coefficient} up to COBRApy 0.5, and an optlang objective afterwards.
+def objective_reactions(model):
+    objective=model.objective
+    if not(isinstance(objective,dict)): # COBRApy>=0.6
+        objective=cobra.util.solver.linear_reaction_coefficients(model)
+    return objective
+
+# 1-based index of the objective reaction (the last one, if several). The objective is computed only once.
+def objective_index(model):
+    objective=objective_reactions(model)
+    return max(model.reactions.index(rxn) for rxn in objective)+1
+### end-function-objective_reactions, objective_index
+################################################################
+
+
+################################################################
+### FUNCTION model_skeleton ####################################
+# Precompiled .cmt of a model: every section already formatted, plus the numeric values needed to patch it.
+# With numbers formatted with str(), as in the original COMETS matlab/python conversion code, to produce identical files.
+# Dictionary keys:
+#  metIds, rxnIds, metIndex, rxnIndex: metabolite/reaction ids and their 0-based positions.
+#  rows: S matrix row per metabolite, as list of [0-based reaction index, coefficient], sorted by reaction. rowText: its SMATRIX lines.
+#  bounds: (lower,upper) per reaction. boundText: its BOUNDS lines.
+#  objectiveId: objective reaction id. head, tail: invariant text before SMATRIX lines and from OBJECTIVE to the end.
+def model_skeleton(model):
+    metIds=[met.id for met in model.metabolites]
+    rxnIds=[rxn.id for rxn in model.reactions]
+    cooRows,cooCols,cooValues=stoichiometric_coo(model)
+    rows=[[] for x in range(len(metIds))]
+    for x,y,coeff in zip(cooRows,cooCols,cooValues):
+        rows[x].append([y,coeff])
+    bounds=[(rxn.lower_bound,rxn.upper_bound) for rxn in model.reactions]
+    indexObj=objective_index(model)
+    tail=["OBJECTIVE\n    "+str(indexObj)+"\n//\n"]
+    tail.append("METABOLITE_NAMES\n"+''.join(["    "+metId+"\n" for metId in metIds])+"//\n")
+    tail.append("REACTION_NAMES\n"+''.join(["    "+rxnId+"\n" for rxnId in rxnIds])+"//\n")
+    tail.append("EXCHANGE_REACTIONS\n"+''.join([" "+str(y+1) for y,rxnId in enumerate(rxnIds) if rxnId.find('EX_')==0])+"\n//\n")
+    skeleton={'metIds':metIds,'rxnIds':rxnIds,
+              'metIndex':{metId:x for x,metId in enumerate(metIds)},'rxnIndex':{rxnId:y for y,rxnId in enumerate(rxnIds)},
+              'rows':rows,'rowText':[smatrix_row_text(x,row) for x,row in enumerate(rows)],
+              'bounds':bounds,'boundText':[bound_text(y,lb,ub) for y,(lb,ub) in enumerate(bounds)],
+              'objectiveId':rxnIds[indexObj-1],
+              'head':"SMATRIX  "+str(len(metIds))+"  "+str(len(rxnIds))+"\n",
+              'tail':''.join(tail)}
+    return skeleton
+### end-function-model_skeleton
+################################################################
+
+
+################################################################
+### FUNCTION smatrix_row_text, bound_text ######################
+# Lines of the SMATRIX section for metabolite x (0-based), and line of the BOUNDS section for reaction y (0-based).
+def smatrix_row_text(x,row):
+    return ''.join(["    "+str(x+1)+"   "+str(y+1)+"   "+str(coeff)+"\n" for y,coeff in row])
+
+def bound_text(y,lb,ub):
+    return "    "+str(y+1)+"   "+str(lb)+"   "+str(ub)+"\n"
+### end-function-smatrix_row_text, bound_text
+################################################################
+
+
+################################################################
+### FUNCTION skeleton_coefficient ##############################
+# Current coefficient of metabolite metId in reaction rxnId (0.0 if it is not in the reaction).
+def skeleton_coefficient(skeleton,rxnId,metId):
+    y=skeleton['rxnIndex'][rxnId]
+    for yRow,coeff in skeleton['rows'][skeleton['metIndex'][metId]]:
+        if(yRow==y):
+            return coeff
+    return 0.0
+### end-function-skeleton_coefficient
+################################################################
+
+
+################################################################
+### FUNCTION skeleton_text #####################################
+def skeleton_text(skeleton,bounds=None,coefficients=None):
+    '''
+    Call: text = skeleton_text(skeleton,{'O2tex':(0,12.0)},{('BIOMASS_Ec_iAF1260_core_59p81M','arg-L[e]'):0.1})
+
+    INPUTS: skeleton: precompiled model (see model_skeleton).
+            bounds: dictionary {rxnId:(lower,upper)} with the bounds to change.
+            coefficients: dictionary {(rxnId,metId):coefficient} with the S matrix entries to change (or to add). 0 removes the entry.
+    OUTPUT: text: content of the .cmt file. Only the patched SMATRIX rows and BOUNDS lines are formatted again.
+            New values are formatted as float, as they would be after saving the model in a .mat file and loading it again.
+    '''
+    rowText=skeleton['rowText']
+    if coefficients:
+        rowText=list(rowText)
+        patchedRows={}
+        for (rxnId,metId),coeff in coefficients.items():
+            x=skeleton['metIndex'][metId]
+            y=skeleton['rxnIndex'][rxnId]
+            row=patchedRows.setdefault(x,[list(entry) for entry in skeleton['rows'][x]])
+            entries=[entry for entry in row if entry[0]!=y]
+            if(float(coeff)!=0.0):
+                entries.append([y,float(coeff)])
+            entries.sort(key=lambda entry: entry[0])
+            patchedRows[x]=entries
+        for x,row in patchedRows.items():
+            rowText[x]=smatrix_row_text(x,row)
+    boundText=skeleton['boundText']
+    if bounds:
+        boundText=list(boundText)
+        for rxnId,(lb,ub) in bounds.items():
+            y=skeleton['rxnIndex'][rxnId]
+            boundText[y]=bound_text(y,float(lb),float(ub))
+    return skeleton['head']+''.join(rowText)+"//\nBOUNDS  -1000  1000\n"+''.join(boundText)+"//\n"+skeleton['tail']
+### end-function-skeleton_text
+################################################################
+
+
+################################################################
+### FUNCTION skeleton_to_comets ################################
+# skeleton_to_comets(skeleton,cmtOutputFile,bounds,coefficients): write a patched precompiled model (see skeleton_text) as COMETS model file.
+# A previous cmtOutputFile is removed, not overwritten, because it could be a hard link to a cached model (cometsModelCache).
+def skeleton_to_comets(skeleton,cmtOutputFile,bounds=None,coefficients=None):
+    if os.path.lexists(cmtOutputFile):
+        os.remove(cmtOutputFile)
+    with open(cmtOutputFile, mode='w') as f:
+        f.write(skeleton_text(skeleton,bounds,coefficients))
+### end-function-skeleton_to_comets
+################################################################
+
+
+################################################################
+### FUNCTION model_to_comets ###################################
+# model_to_comets(model,cmtOutputFile): write an already loaded COBRApy model as COMETS model file, in a single buffered write.
+def model_to_comets(model,cmtOutputFile):
+    with open(cmtOutputFile, mode='w') as f:
+        f.write(skeleton_text(model_skeleton(model)))
+### end-function-model_to_comets
+################################################################
+
+
+################################################################
+### FUNCTION mat_to_comets #####################################
+# mat_to_comets(modelPath)
+# Re-code in python from COMETS code. Output: matInputFile+'.cmt'
+def mat_to_comets(matInputFile):
+    model=cobra.io.load_matlab_model(matInputFile)
+    model_to_comets(model,matInputFile+'.cmt')
+### end-function-mat_to_comets
+################################################################
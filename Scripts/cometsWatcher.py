@@ -0,0 +1,528 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Run of COMETS (./comets_scr) watching its logs while it runs, used by the consortia pipelines (*FLYCOP.py).
+# The media log is read incrementally and, once the stop condition of the consortium (the end of the experiment, as computed
+# in its fitness) holds in a cycle, COMETS is stopped after a few extra cycles are complete in all the watched logs.
+# The logs are then truncated to those complete cycles. So idle cycles after the end of the experiment are not simulated.
+# Logs can also be consumed live through named pipes (run_comets_fifo): COMETS writes its logs in FIFOs read by python threads, and only
+# the lines needed (e.g. some flux log columns, see cometsLogIO.flux_line_filter) are kept in memory, without writing nor reading the logs
+# on disk (optionally, a compressed copy is streamed to IndividualRunsResults).
+# Example: >>import cometsWatcher
+#          >>cometsWatcher.run_comets('comets_script_template','output.txt',{'media':'media_log_template.txt','biomass':'total_biomass_log_template.txt','flux':'flux_log_template.txt'},
+#                                     lambda cycle,concentrations: concentrations['glc_D']==0.0)
+#          >>lastCycle,logLines=cometsWatcher.run_comets_fifo('comets_script_template','output.txt',{'media':'media_log_template.txt','biomass':'total_biomass_log_template.txt'},
+#                                     lambda cycle,concentrations: concentrations['glc_D']==0.0)
+#          >>media=cometsLogIO.read_media_log(logLines['media'])
+# The wall-clock cutoff of an evaluation (given by SMAC to the wrappers) is enforced on COMETS runs (and dfbaEngine cycles): once its deadline
+# is over, the COMETS process tree is stopped and CutoffExceeded is raised, so the wrapper reports TIMEOUT. With adaptive capping, the cutoff
+# is limited to a multiple of the wall time of the best configuration found so far (see evaluation_cutoff), so slow configurations are
+# stopped early.
+#          >>cometsWatcher.set_deadline(cometsWatcher.evaluation_cutoff(cutoff,resultsDB.incumbent_runtime(dirPlot,fitFunc)),startTime)
+# The standard output and error of COMETS (in outputFile, e.g. output.txt) are also read while it runs, looking for known COMETS and solver
+# failures (failurePatterns): only messages printed on fatal errors (uncaught exception in the main thread, Java out of memory, Gurobi error
+# codes in an error message, infeasible models while they are loaded). An infeasible LP in a cycle is not a failure: it is the normal state
+# of the models once the nutrients are exhausted. On the first one, COMETS is stopped and CometsFailure is raised with its reason, so the
+# replicate is aborted (see replicateRunner) instead of plotting and parsing useless logs.
+#
+# Call from command line, to see which lines of COMETS outputs match failurePatterns (e.g. IndividualRunsResults/output*.txt of a FLYCOP run):
+#   python3 cometsWatcher.py check <output.txt> ... <output.txt>   # each line with its failure reason, or '-'
+#   python3 cometsWatcher.py check                                 # outputExamples, with their expected reason
+#
+# Environment variables:
+#  FLYCOP_EARLY_STOP: 0 to always run COMETS up to maxCycles of the layout (default: 1).
+#  FLYCOP_LOG_FIFO: 1 to consume COMETS logs through named pipes in the consortia pipelines (default: 0, logs written to disk).
+#  FLYCOP_LOG_ARCHIVE: 1 to keep a gzip copy of the logs consumed through named pipes in IndividualRunsResults (default: 0).
+#  FLYCOP_ADAPTIVE_CAPPING: 1 to cap the cutoff of an evaluation with the wall time of the best configuration so far (default: 0).
+#  FLYCOP_CAPPING_FACTOR: cutoff in adaptive capping, as a multiple of the wall time of the best configuration (default: 2).
+#  FLYCOP_FAILURE_MONITOR: 0 to not look for failures in the output of COMETS (default: 1).
+#  FLYCOP_DEADLINE: deadline of the current evaluation (time.time() value), set by set_deadline and inherited by replicate processes.
+
+import os
+import os.path
+import sys
+import re
+import time
+import gzip
+import queue
+import signal
+import threading
+import subprocess
+import cometsLogIO
+
+# Catalog of known failures in the output of COMETS: (reason, pattern of the line, only while loading: before the first cycle), checked in order
+failurePatterns=[('out_of_memory',re.compile(r'java\.lang\.OutOfMemoryError'),False),
+                 ('java_not_started',re.compile(r'Could not find or load main class|Could not create the Java Virtual Machine'),False),
+                 ('gurobi_error',re.compile(r'\b(error|exception)\b.*\bGR[BV]\.\d{4,5}\b|\bGR[BV]\.\d{4,5}\b.*\b(error|exception)\b|GRBException: .*error code:? \d{4,5}\b',re.IGNORECASE),False),
+                 ('infeasible_model',re.compile(r'\binfeasible\b',re.IGNORECASE),True),
+                 ('java_exception',re.compile(r'^Exception in thread "main"'),False)]
+cyclePattern=re.compile(r'^\s*Cycle \d+') # first line of each cycle in the output of COMETS
+
+# Lines of the output of COMETS (in order, as one output) with the failure reason expected for each one (None: not a failure), see check
+outputExamples=[("Loading layout file 'ecoliLongTerm_layout_template.txt'...",None),
+                ("Loading 'ecoli_1_tmp.mat.cmt' ...",None),
+                ('Academic license - for non-commercial use only',None),
+                ('Model ecoli_2_tmp.mat.cmt is infeasible','infeasible_model'),
+                ('Cycle 1',None),
+                ('Total biomass:',None),
+                ('Model 0: 0.01',None),
+                ('Model ecoli_2_tmp.mat.cmt is infeasible',None),
+                ('LP infeasible for model 1 in this cycle',None),
+                ('Model 1: NaN',None),
+                ('Exception in thread "AWT-EventQueue-0" java.awt.HeadlessException',None),
+                ('GRB 12345 variables',None),
+                ('Cycle 240',None),
+                ('Exception in thread "main" gurobi.GRBException: Error code 10005','gurobi_error'),
+                ('Error GRV.5000 in model 1','gurobi_error'),
+                ('Exception in thread "main" java.lang.NullPointerException','java_exception'),
+                ('Exception in thread "main" java.lang.OutOfMemoryError: Java heap space','out_of_memory'),
+                ('Error: Could not find or load main class edu.bu.segrelab.comets.Comets','java_not_started')]
+
+################################################################
+### CLASS CutoffExceeded #######################################
+# Raised when the wall-clock cutoff of the evaluation is over (COMETS already stopped).
+class CutoffExceeded(Exception):
+    pass
+### end-class-CutoffExceeded
+################################################################
+
+
+################################################################
+### CLASS CometsFailure ########################################
+# Raised when a known failure (reason in failurePatterns) is found in the output of COMETS (already stopped), with the line of the output.
+class CometsFailure(Exception):
+    def __init__(self,reason,line):
+        super().__init__(reason,line)
+        self.reason=reason
+        self.line=line
+### end-class-CometsFailure
+################################################################
+
+
+################################################################
+### FUNCTION set_deadline, check_deadline ######################
+# Deadline of the evaluation: seconds from startTime (default: now), None to remove it. It is kept in the environment, so the replicates
+# run in other processes (replicateRunner) share it.
+def set_deadline(seconds,startTime=None):
+    if seconds is None:
+        os.environ.pop('FLYCOP_DEADLINE',None)
+    else:
+        os.environ['FLYCOP_DEADLINE']=repr((time.time() if startTime is None else startTime)+seconds)
+
+def check_deadline():
+    deadline=os.environ.get('FLYCOP_DEADLINE','')
+    if(deadline!='' and time.time()>float(deadline)):
+        raise CutoffExceeded('wall-clock cutoff of the evaluation exceeded')
+### end-function-set_deadline, check_deadline
+################################################################
+
+
+################################################################
+### FUNCTION evaluation_cutoff #################################
+# Cutoff (seconds) of an evaluation: SMAC cutoff or, with adaptive capping, FLYCOP_CAPPING_FACTOR times the wall time of the best
+# configuration so far (incumbentRuntime, None if there is none yet), if shorter.
+def evaluation_cutoff(cutoff,incumbentRuntime=None):
+    if(os.environ.get('FLYCOP_ADAPTIVE_CAPPING','0')=='1' and incumbentRuntime is not None):
+        return min(cutoff,float(os.environ.get('FLYCOP_CAPPING_FACTOR','2'))*incumbentRuntime)
+    return cutoff
+### end-function-evaluation_cutoff
+################################################################
+
+
+################################################################
+### FUNCTION failure_monitor, output_state ####################
+# State to read the output of COMETS while it runs (as a log, see read_new_lines), None if failures are not monitored.
+def failure_monitor():
+    return os.environ.get('FLYCOP_FAILURE_MONITOR','1')!='0'
+
+def output_state(outputFile):
+    if not failure_monitor():
+        return None
+    return {'file':outputFile,'kind':'output','offset':0,'partial':b'','cycle':-1,'completeCycle':-1,'loading':True}
+### end-function-failure_monitor, output_state
+################################################################
+
+
+################################################################
+### FUNCTION match_failure #####################################
+# Failure reason of a line of the output of COMETS (None if it is not a failure). outputState['loading'] is True until the first cycle.
+def match_failure(line,outputState):
+    if cyclePattern.match(line):
+        outputState['loading']=False
+    for reason,pattern,loadingOnly in failurePatterns:
+        if((outputState['loading'] or not loadingOnly) and pattern.search(line)):
+            return reason
+    return None
+### end-function-match_failure
+################################################################
+
+
+################################################################
+### FUNCTION check_output, check_run ###########################
+# Raise CometsFailure on the first line of the output written since the last call matching failurePatterns (finished: also the last line,
+# without newline). check_run also checks the deadline of the evaluation: called in every poll of a running COMETS.
+def check_output(outputState,finished=False):
+    if outputState is None:
+        return
+    lines=read_new_lines(outputState)
+    if finished:
+        lines.append(outputState['partial'].decode('utf-8',errors='replace'))
+    for line in lines:
+        reason=match_failure(line,outputState)
+        if reason is not None:
+            raise CometsFailure(reason,line.strip()[:500])
+
+def check_run(outputState,finished=False):
+    check_deadline()
+    check_output(outputState,finished)
+### end-function-check_output, check_run
+################################################################
+
+
+################################################################
+### FUNCTION early_stop_enabled ################################
+def early_stop_enabled():
+    return os.environ.get('FLYCOP_EARLY_STOP','1')!='0'
+### end-function-early_stop_enabled
+################################################################
+
+
+################################################################
+### FUNCTION fifo_logs, log_archive ############################
+def fifo_logs():
+    return os.environ.get('FLYCOP_LOG_FIFO','0')=='1' and hasattr(os,'mkfifo')
+
+def log_archive():
+    return os.environ.get('FLYCOP_LOG_ARCHIVE','0')=='1'
+### end-function-fifo_logs, log_archive
+################################################################
+
+
+################################################################
+### FUNCTION archive_files #####################################
+# Compressed copies of the logs of a run in IndividualRunsResults (e.g. {'media':'IndividualRunsResults/media_log_run1.txt.gz'}, for runName 'run1'),
+# to be streamed by run_comets_fifo. No copies ({}) unless FLYCOP_LOG_ARCHIVE=1.
+def archive_files(logs,runName):
+    if not log_archive():
+        return {}
+    logNames={'media':'media_log','biomass':'total_biomass_log','flux':'flux_log'}
+    return {logKind:'IndividualRunsResults/'+logNames[logKind]+'_'+runName+'.txt.gz' for logKind in logs}
+### end-function-archive_files
+################################################################
+
+
+################################################################
+### FUNCTION line_cycle ########################################
+# Cycle of a line of a COMETS log of the given kind ('media', 'biomass' or 'flux'). None if it is not a line of a cycle (e.g. media_names).
+def line_cycle(line,logKind):
+    if(logKind=='media'):
+        return cometsLogIO.log_cycle(line,'media_','{')[0]
+    elif(logKind=='flux'):
+        return cometsLogIO.log_cycle(line,'fluxes{','}')[0]
+    fields=line.split()
+    if(len(fields)>0 and fields[0].isdigit()):
+        return int(fields[0])
+    return None
+### end-function-line_cycle
+################################################################
+
+
+################################################################
+### FUNCTION read_new_lines ####################################
+# Complete lines appended to a log since the last call (the incomplete last line is kept for the next one), and update of the
+# last complete cycle in the log: a cycle is complete when a line of a later cycle is written.
+# Logs read through a named pipe (run_comets_fifo) take the lines in the queue of its thread instead (logState['closed'] at the end).
+def read_new_lines(logState):
+    if 'queue' in logState:
+        linesB=[]
+        while not logState['closed']:
+            try:
+                lineB=logState['queue'].get_nowait()
+            except queue.Empty:
+                break
+            if lineB is None:
+                logState['closed']=True
+            elif lineB.endswith(b'\n'): # the last line is incomplete if COMETS was stopped
+                linesB.append(lineB[:-1])
+    else:
+        if not os.path.exists(logState['file']):
+            return []
+        with open(logState['file'],'rb') as f:
+            f.seek(logState['offset'])
+            data=f.read()
+        logState['offset']=logState['offset']+len(data)
+        linesB=(logState['partial']+data).split(b'\n')
+        logState['partial']=linesB.pop()
+    lines=[lineB.decode('utf-8',errors='replace') for lineB in linesB]
+    for line in lines:
+        cycle=line_cycle(line,logState['kind'])
+        if(cycle is not None and cycle>logState['cycle']):
+            logState['completeCycle']=logState['cycle']
+            logState['cycle']=cycle
+    return lines
+### end-function-read_new_lines
+################################################################
+
+
+################################################################
+### FUNCTION truncate_log ######################################
+# Keep in a log only the complete lines up to lastCycle (and lines without cycle, such as the media_names header).
+def truncate_log(logFile,logKind,lastCycle):
+    if not os.path.exists(logFile):
+        return
+    with open(logFile,'r') as f:
+        lines=f.readlines()
+    with open(logFile,'w') as f:
+        for line in lines:
+            if not line.endswith('\n'):
+                break
+            cycle=line_cycle(line,logKind)
+            if(cycle is None or cycle<=lastCycle):
+                f.write(line)
+### end-function-truncate_log
+################################################################
+
+
+################################################################
+### FUNCTION read_fifo, release_fifo ###########################
+# Thread reading a named pipe until COMETS closes it, putting its lines (bytes) in a queue, and None at the end.
+def read_fifo(fifoFile,lineQueue):
+    with open(fifoFile,'rb',buffering=1024*1024) as f:
+        for lineB in f:
+            lineQueue.put(lineB)
+    lineQueue.put(None)
+
+# Unblock the thread of a named pipe never opened by COMETS (e.g. a log not written), opening and closing its writing end.
+def release_fifo(fifoFile):
+    try:
+        os.close(os.open(fifoFile,os.O_WRONLY|os.O_NONBLOCK))
+    except OSError: # no reader waiting
+        pass
+### end-function-read_fifo, release_fifo
+################################################################
+
+
+################################################################
+### FUNCTION stop_process_group ################################
+# Stop COMETS (comets_scr and its JVM, in their own process group): SIGTERM and, if it does not finish in a few seconds, SIGKILL.
+def stop_process_group(proc):
+    try:
+        os.killpg(proc.pid,signal.SIGTERM)
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid,signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        proc.wait()
+### end-function-stop_process_group
+################################################################
+
+
+################################################################
+### FUNCTION wait_comets #######################################
+# Wait for COMETS to finish, stopping it (and raising CutoffExceeded or CometsFailure) if the deadline of the evaluation is over or a
+# failure is found in its output (outputState, see output_state).
+def wait_comets(proc,pollInterval,outputState=None):
+    if(os.environ.get('FLYCOP_DEADLINE','')=='' and outputState is None):
+        proc.wait()
+        return
+    try:
+        while(proc.poll() is None):
+            check_run(outputState)
+            time.sleep(pollInterval)
+        check_output(outputState,True)
+    finally:
+        if(proc.poll() is None):
+            stop_process_group(proc)
+### end-function-wait_comets
+################################################################
+
+
+################################################################
+### FUNCTION watch_logs ########################################
+# Read the logs of a running COMETS until it finishes (None) or, once stopCondition holds in a cycle of the media log, until extraCycles more
+# cycles are complete in all the logs (returns that last cycle). Lines of logs with logState['kept'] are kept in memory (see run_comets_fifo).
+# The deadline and the output of COMETS (outputState) are checked in every poll (see check_run).
+def watch_logs(proc,logStates,stopCondition,extraCycles,pollInterval,outputState=None):
+    names=[]
+    concentrations={}
+    mediaCycle=-1
+    lastCycle=None
+    while True:
+        finished=(proc.poll() is not None)
+        check_run(outputState,finished)
+        for logKind,logState in logStates.items():
+            lines=read_new_lines(logState)
+            if 'kept' in logState:
+                keep_lines(logState,lines,lastCycle)
+            if(stopCondition is None or logKind!='media' or lastCycle is not None):
+                continue
+            for line in lines:
+                if line.startswith('media_names'):
+                    names=[name.strip().strip("'").split('[')[0] for name in line.split('{',1)[1].split('}',1)[0].split(',')]
+                    continue
+                cycle=line_cycle(line,'media')
+                if cycle is None:
+                    continue
+                if(cycle!=mediaCycle):
+                    # Previous cycle complete: evaluate the stop condition on its composition
+                    if(mediaCycle>=0 and lastCycle is None and stopCondition(mediaCycle,concentrations)):
+                        lastCycle=mediaCycle+extraCycles
+                    mediaCycle=cycle
+                    concentrations={name:0.0 for name in names}
+                closeBrace=line.index('}')
+                met=names[int(line[line.index('{')+1:closeBrace])-1]
+                if line.startswith('(1, 1)',closeBrace+1):
+                    concentrations[met]=float(line.split('=',1)[1].strip().rstrip(';'))
+                else: # sparse(1, 1): concentration 0
+                    concentrations[met]=0.0
+        if finished:
+            # Named pipes: until all their lines are read
+            openStates=[logState for logState in logStates.values() if not logState.get('closed',True)]
+            if(len(openStates)==0):
+                return None
+            for logState in openStates:
+                release_fifo(logState['file'])
+        elif(lastCycle is not None and all(logState['completeCycle']>=lastCycle for logState in logStates.values())):
+            return lastCycle
+        time.sleep(pollInterval)
+### end-function-watch_logs
+################################################################
+
+
+################################################################
+### FUNCTION keep_lines ########################################
+# Lines of a log read through a named pipe kept in memory (as given by logState['keep'], a function line -> kept line or None), and streamed
+# to its compressed copy. Lines after lastCycle are skipped (as truncate_log).
+def keep_lines(logState,lines,lastCycle):
+    for line in lines:
+        if lastCycle is not None:
+            cycle=line_cycle(line,logState['kind'])
+            if(cycle is not None and cycle>lastCycle):
+                continue
+        if logState['archive'] is not None:
+            logState['archive'].write(line+'\n')
+        if logState['keep'] is None:
+            logState['kept'].append(line+'\n')
+        else:
+            keptLine=logState['keep'](line)
+            if keptLine is not None:
+                logState['kept'].append(keptLine+'\n')
+### end-function-keep_lines
+################################################################
+
+
+################################################################
+### FUNCTION run_comets ########################################
+def run_comets(scriptFile,outputFile,logs,stopCondition=None,extraCycles=2,pollInterval=0.5):
+    '''
+    Call: lastCycle = run_comets(scriptFile,outputFile,logs,stopCondition,extraCycles,pollInterval)
+
+    INPUTS: scriptFile: COMETS script (e.g. 'comets_script_template'), run with ./comets_scr in the current directory.
+            outputFile: file for the standard output and error of COMETS (e.g. 'output.txt'), where failures are looked for while it runs.
+            logs: dictionary {'media': media log, 'biomass': total biomass log, 'flux': flux log} written by the layout.
+            stopCondition: function stopCondition(cycle,concentrations), with concentrations {metabolite id without compartment: value}
+                           in that cycle of the media log, True when the experiment is finished (None: run up to maxCycles; logs are not read).
+            extraCycles: cycles after the first one fulfilling stopCondition kept in the logs (needed by the fitness computation).
+            pollInterval: seconds between reads of the logs.
+    OUTPUT: lastCycle: last cycle in the logs if COMETS was stopped before maxCycles, None if it finished by itself.
+            CutoffExceeded is raised (COMETS stopped) if the deadline of the evaluation is over (see set_deadline), and CometsFailure
+            if a known failure is found in its output (see failurePatterns).
+    '''
+    with open(outputFile,'w') as f:
+        proc=subprocess.Popen(['./comets_scr',scriptFile],stdout=f,stderr=subprocess.STDOUT,start_new_session=True)
+        if(stopCondition is None or not early_stop_enabled()):
+            wait_comets(proc,pollInterval,output_state(outputFile))
+            return None
+        logStates={logKind:{'file':logFile,'kind':logKind,'offset':0,'partial':b'','cycle':-1,'completeCycle':-1} for logKind,logFile in logs.items()}
+        try:
+            lastCycle=watch_logs(proc,logStates,stopCondition,extraCycles,pollInterval,output_state(outputFile))
+        finally:
+            if(proc.poll() is None):
+                stop_process_group(proc)
+    if lastCycle is None:
+        return None
+    for logKind,logFile in logs.items():
+        truncate_log(logFile,logKind,lastCycle)
+    return lastCycle
+### end-function-run_comets
+################################################################
+
+
+################################################################
+### FUNCTION run_comets_fifo ###################################
+def run_comets_fifo(scriptFile,outputFile,logs,stopCondition=None,extraCycles=2,keep={},archive={},pollInterval=0.1):
+    '''
+    Call: lastCycle, logLines = run_comets_fifo(scriptFile,outputFile,logs,stopCondition,extraCycles,keep,archive,pollInterval)
+
+    INPUTS: scriptFile, outputFile, logs, stopCondition, extraCycles: as in run_comets. Logs are created as named pipes (FIFOs), read by one
+                  thread each while COMETS writes them, and removed at the end: they are never written to disk.
+            keep: {log kind: function line -> kept line (without newline) or None} for logs whose lines are not fully kept in memory
+                  (e.g. {'flux': cometsLogIO.flux_line_filter(...)}, only the flux log columns needed by the fitness).
+            archive: {log kind: gzip file} with a compressed copy of the whole log (see archive_files).
+            pollInterval: seconds between reads of the queues of the threads.
+    OUTPUT: lastCycle: as in run_comets (also CutoffExceeded and CometsFailure).
+            logLines: {log kind: kept lines, up to lastCycle}, read by cometsLogIO functions as the log files (e.g. read_media_log(logLines['media'])).
+    '''
+    logStates={}
+    threads=[]
+    for logKind,logFile in logs.items():
+        if os.path.exists(logFile):
+            os.remove(logFile)
+        os.mkfifo(logFile)
+        logStates[logKind]={'file':logFile,'kind':logKind,'cycle':-1,'completeCycle':-1,'queue':queue.Queue(),'closed':False,
+                            'keep':keep.get(logKind),'kept':[],'archive':gzip.open(archive[logKind],'wt') if logKind in archive else None}
+        thread=threading.Thread(target=read_fifo,args=(logFile,logStates[logKind]['queue']),daemon=True)
+        thread.start()
+        threads.append(thread)
+    if not early_stop_enabled():
+        stopCondition=None
+    try:
+        with open(outputFile,'w') as f:
+            proc=subprocess.Popen(['./comets_scr',scriptFile],stdout=f,stderr=subprocess.STDOUT,start_new_session=True)
+            try:
+                lastCycle=watch_logs(proc,logStates,stopCondition,extraCycles,pollInterval,output_state(outputFile))
+            finally:
+                if(proc.poll() is None):
+                    stop_process_group(proc)
+    finally:
+        for logState,thread in zip(logStates.values(),threads):
+            while thread.is_alive():
+                release_fifo(logState['file'])
+                thread.join(0.1)
+            os.remove(logState['file'])
+            if logState['archive'] is not None:
+                logState['archive'].close()
+    logLines={}
+    for logKind,logState in logStates.items():
+        logLines[logKind]=logState['kept']
+        if lastCycle is not None:
+            logLines[logKind]=[line for line in logState['kept'] if line_cycle(line,logKind) is None or line_cycle(line,logKind)<=lastCycle]
+    return lastCycle,logLines
+### end-function-run_comets_fifo
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv)>2 and sys.argv[1]=='check'):
+        for outputFile in sys.argv[2:]:
+            outputState={'loading':True}
+            with open(outputFile,errors='replace') as f:
+                for num,line in enumerate(f):
+                    reason=match_failure(line.rstrip('\n'),outputState)
+                    print(outputFile+':'+str(num+1)+'\t'+('-' if reason is None else reason)+'\t'+line.rstrip('\n'))
+    elif(len(sys.argv)==2 and sys.argv[1]=='check'):
+        errors=0
+        outputState={'loading':True}
+        for line,expected in outputExamples:
+            reason=match_failure(line,outputState)
+            print(('-' if reason is None else reason)+'\t'+line+('' if reason==expected else '\t<- expected: '+str(expected)))
+            errors=errors+(reason!=expected)
+        print(str(errors)+' unexpected results')
+        sys.exit(1 if errors>0 else 0)
+    else:
+        print('Usage: cometsWatcher.py check [<output.txt> ... <output.txt>]')
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Report of the variance reduction with common random numbers (FLYCOP_CRN_SEED, see replicateRunner) in a consortium. Two configurations
+# are evaluated with 'repeat' runs each (*FLYCOP_oneConf, each one in a workspace of workspacePool), first with independent random streams
+# and then with common random numbers. The variance of the difference of their fitness, run by run, determines how many runs are needed
+# to rank both configurations with the same confidence: the ratio of both variances is the fraction of runs needed with common random numbers.
+# Call from command line (in MicrobialCommunities directory), e.g. for the 3 consortia:
+#   python3 ../Scripts/crnReport.py ecoliLongTerm ecoliLongTerm_TemplateOptimizeConsortiumV0 Yield 10 -10,-16,-11,-12,-6,-16 -12,-6,-16,-10,-16,-11
+#   python3 ../Scripts/crnReport.py coGrowth4Ecoli coGrowth4Ecoli_TemplateOptimizeConsortiumV0 ratioGR 10 0.25,0.25,0.25,0.25,1.5,1.5,1.5,1.5 0.3,0.2,0.3,0.2,1.5,1.5,1.5,1.5
+#   python3 ../Scripts/crnReport.py synKtPHA synKtPHA_TemplateOptimizeConsortiumV0 MaxPHA 10 30,3.5,0.1,18 40,3.5,0.1,18
+# It writes crnReport_<consortiumPrefix>/ (results database of all the runs, see resultsDB) and crnReport_<consortiumPrefix>.tsv.
+#
+# Environment variables:
+#  FLYCOP_CRN_SEED: seed of the common random numbers in the report (default: 1).
+
+import os
+import os.path
+import sys
+import importlib
+import statistics
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import workspacePool
+import resultsDB
+
+
+################################################################
+### FUNCTION evaluate ##########################################
+# Evaluate each configuration in a workspace of the template src (as the wrappers), with the random streams of crnSeed (None: independent).
+def evaluate(module,consortium,src,configurations,fitFunc,repeat,dirPlot,crnSeed):
+    if crnSeed is None:
+        os.environ.pop('FLYCOP_CRN_SEED',None)
+    else:
+        os.environ['FLYCOP_CRN_SEED']=str(crnSeed)
+    for configuration in configurations:
+        workspace=workspacePool.checkout(src,'crnReport_'+consortium+'_Test',module.initialize_models)
+        os.chdir(workspace['dir'])
+        try:
+            getattr(module,consortium+'FLYCOP_oneConf')(*configuration,fitFunc=fitFunc,dirPlot=dirPlot,repeat=repeat)
+        finally:
+            os.chdir('..')
+            workspacePool.release(workspace)
+### end-function-evaluate
+################################################################
+
+
+################################################################
+### FUNCTION difference_stats ##################################
+# Mean and sd of the fitness of both configurations, and mean and variance of their difference run by run.
+def difference_stats(fitnessA,fitnessB):
+    differences=[a-b for a,b in zip(fitnessA,fitnessB)]
+    return [statistics.mean(fitnessA),statistics.stdev(fitnessA),statistics.mean(fitnessB),statistics.stdev(fitnessB),
+            statistics.mean(differences),statistics.variance(differences)]
+### end-function-difference_stats
+################################################################
+
+
+################################################################
+### FUNCTION crn_report ########################################
+def crn_report(consortium,src,fitFunc,repeat,configurationA,configurationB,crnSeed=1):
+    '''
+    Call: varianceRatio = crn_report(consortium,src,fitFunc,repeat,configurationA,configurationB,crnSeed)
+
+    INPUTS: consortium: consortium prefix (e.g. 'ecoliLongTerm').
+            src: template directory of the consortium (in the current directory, MicrobialCommunities).
+            fitFunc: fitness function.
+            repeat: number of runs of each configuration.
+            configurationA, configurationB: tuples of parameter values, as arguments of *FLYCOP_oneConf.
+            crnSeed: seed of the common random numbers.
+    OUTPUT: varianceRatio: variance of the difference of fitness with common random numbers / with independent runs (None if it cannot
+            be computed). The report is printed and written in crnReport_<consortium>.tsv.
+    '''
+    module=importlib.import_module(consortium+'FLYCOP')
+    reportDir=os.path.abspath('crnReport_'+consortium)+'/'
+    if os.path.exists(resultsDB.db_file(reportDir)):
+        os.remove(resultsDB.db_file(reportDir))
+    os.environ['FLYCOP_RESULTS_DB']='1'
+    os.environ['FLYCOP_ADAPTIVE_REPEAT']='0'
+    evaluate(module,consortium,src,[configurationA,configurationB],fitFunc,repeat,reportDir,None)
+    evaluate(module,consortium,src,[configurationA,configurationB],fitFunc,repeat,reportDir,crnSeed)
+    evaluated=resultsDB.replicates_fitness(reportDir)
+    if(len(evaluated)!=4):
+        print('CRN report: some configuration was discarded, '+str(len(evaluated))+' of 4 evaluations stored in '+reportDir)
+        return None
+    rows=[['independent']+difference_stats(evaluated[0][1],evaluated[1][1]),['crn']+difference_stats(evaluated[2][1],evaluated[3][1])]
+    varianceRatio=rows[1][6]/rows[0][6] if rows[0][6]>0 else None
+    lines=['mode\tavgFitnessA\tsdFitnessA\tavgFitnessB\tsdFitnessB\tavgDifference\tvarDifference']
+    lines.extend(['\t'.join([str(value) for value in row]) for row in rows])
+    lines.append('# '+consortium+', '+fitFunc+', '+str(repeat)+' runs, A='+','.join([str(value) for value in configurationA])+
+                 ' B='+','.join([str(value) for value in configurationB]))
+    if varianceRatio is not None:
+        lines.append('# variance of the difference with common random numbers: '+str(round(100*varianceRatio,1))+'% (reduction: '+
+                     str(round(100*(1-varianceRatio),1))+'%), i.e. runs needed for the same ranking confidence')
+    print('\n'.join(lines))
+    with open('crnReport_'+consortium+'.tsv','w') as f:
+        f.write('\n'.join(lines)+'\n')
+    return varianceRatio
+### end-function-crn_report
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv)==7):
+        crn_report(sys.argv[1],sys.argv[2],sys.argv[3],int(sys.argv[4]),tuple(float(value) for value in sys.argv[5].split(',')),
+                   tuple(float(value) for value in sys.argv[6].split(',')),int(os.environ.get('FLYCOP_CRN_SEED','1')))
+    else:
+        print('Usage: crnReport.py <consortiumPrefix> <templateDir> <fitnessFunction> <repeat> <configurationA> <configurationB>')
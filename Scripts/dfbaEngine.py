@@ -0,0 +1,369 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# In-process dynamic FBA of a well-mixed community, as alternative backend to COMETS for layouts with grid_size 1 1 (backend='dfba' in *FLYCOP_oneConf).
+# It follows the semantics of the COMETS layout: world_media, initial_pop and parameters maxCycles, timeStep, deathRate, spaceWidth and
+# exchangestyle (Standard, or Monod Style with defaultKm and defaultVmax). In each cycle, each model (in random order, as COMETS):
+#  1) gets the lower bound of its exchange reactions (EX_*, met[e] <=>) limited by the media available for its biomass in this time step,
+#  2) runs FBA (maximizing its objective) on its LP problem, built only once: only exchange bounds change between cycles (warm start),
+#     or reuses the fluxes of a previous cycle with the same exchange bounds (quantized), kept in a LRU cache of solutions per model,
+#  3) grows as biomass*(1+(mu-deathRate)*timeStep), and changes the media by flux*biomass*timeStep.
+# Trajectories are returned as the structures of cometsLogIO (read_total_biomass_log, read_media_log, read_flux_log), without .cmt or log files.
+# Example: >>import dfbaEngine
+#          >>layout=dfbaEngine.read_layout('ecoliLongTerm_layout_template.txt')
+#          >>trajectories=dfbaEngine.run_dfba([model1,model2],layout,[0.01,0.01])
+#          >>table=cometsLogIO.biomass_vs_media(trajectories['biomass'],trajectories['media'],['glc_D','ac'])
+#
+# Environment variables:
+#  FLYCOP_BACKEND: default backend of *FLYCOP_oneConf, 'comets' or 'dfba' (default: 'comets').
+#  FLYCOP_LP_CACHE: maximum number of LP solutions kept per model in a run (default: 256; 0 to solve the LP in every cycle).
+
+import os
+import random
+import collections
+import numpy as np
+import cobra
+import cometsModelIO
+import cometsLayout
+import cometsLogIO
+import cometsWatcher
+
+
+################################################################
+### FUNCTION backend ###########################################
+# Simulation backend of a configuration: the given one, or FLYCOP_BACKEND (default 'comets').
+def backend(name=None):
+    if name is None:
+        name=os.environ.get('FLYCOP_BACKEND','comets')
+    if name not in ['comets','dfba']:
+        raise ValueError('Unknown simulation backend: '+name)
+    return name
+### end-function-backend
+################################################################
+
+
+################################################################
+### FUNCTION lp_cache_size #####################################
+# Maximum number of LP solutions cached per model: the given one, or FLYCOP_LP_CACHE (default 256).
+def lp_cache_size(cacheSize=None):
+    if cacheSize is None:
+        cacheSize=int(os.environ.get('FLYCOP_LP_CACHE','256'))
+    return max(0,cacheSize)
+### end-function-lp_cache_size
+################################################################
+
+
+################################################################
+### FUNCTION read_layout #######################################
+# COMETS layout as dictionary: 'models' (model_file names), 'media' ({metabolite: value as text} in world_media, placeholders included),
+# 'initialPop' (biomass of each model in the only cell of initial_pop, None if it is a placeholder), 'parameters' ({lowercase name: value as text}).
+def read_layout(layoutFile):
+    spec=cometsLayout.read_layout_spec(layoutFile)
+    return {'models':spec['models'],'media':spec['media'],'initialPop':[to_float(value) for value in spec['initialPop']],
+            'parameters':{name.lower():value for name,value in spec['parameters'].items()}}
+### end-function-read_layout
+################################################################
+
+
+################################################################
+### FUNCTION to_float ##########################################
+def to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+### end-function-to_float
+################################################################
+
+
+################################################################
+### FUNCTION objective_reaction ################################
+# 0-based index of the objective reaction of a model (the last one, if several), as the OBJECTIVE of its .cmt file.
+def objective_reaction(model):
+    if hasattr(model,'slim_optimize'): # COBRApy>=0.6 (optlang)
+        return max(model.reactions.index(rxn) for rxn in cobra.util.solver.linear_reaction_coefficients(model))
+    return cometsModelIO.objective_index(model)-1
+### end-function-objective_reaction
+################################################################
+
+
+################################################################
+### FUNCTION fba_problem #######################################
+# LP problem of a model, built once and solved again after changing bounds, as dictionary of functions:
+#  'set_bounds'(y,lb,ub): bounds of reaction y (0-based). 'solve'(): array of fluxes of all the reactions (None if not optimal).
+# With COBRApy>=0.6, the optlang problem of the model (its bounds are changed). With COBRApy 0.5, a problem of its solver interface.
+def fba_problem(model):
+    if hasattr(model,'slim_optimize'):
+        variables=[(rxn.forward_variable.name,rxn.reverse_variable.name) for rxn in model.reactions]
+        def set_bounds(y,lb,ub):
+            model.reactions[y].bounds=(lb,ub)
+        def solve():
+            if np.isnan(model.slim_optimize(error_value=float('nan'))):
+                return None
+            primal=model.solver.primal_values
+            return np.array([primal[forward]-primal[reverse] for forward,reverse in variables])
+    else:
+        interface=cobra.solvers.solver_dict[cobra.solvers.get_solver_name()]
+        lp=interface.create_problem(model)
+        def set_bounds(y,lb,ub):
+            interface.change_variable_bounds(lp,y,lb,ub)
+        def solve():
+            interface.solve_problem(lp)
+            if(interface.get_status(lp)!='optimal'):
+                return None
+            return np.array(interface.format_solution(lp,model).x,dtype=float)
+    return {'set_bounds':set_bounds,'solve':solve}
+### end-function-fba_problem
+################################################################
+
+
+################################################################
+### FUNCTION concat_trajectories ###############################
+# Trajectories of two consecutive runs (the second one started from cycle endCycle of the first one): cycles 0..endCycle of the first one
+# and cycles 1..end of the second one, renumbered (as cometsLogIO.stitch_logs with COMETS logs). Media columns follow the first run.
+def concat_trajectories(first,second,endCycle):
+    biomass2=second['biomass'][1:].copy()
+    biomass2[:,0]=biomass2[:,0]+endCycle
+    media2=np.zeros((second['media']['media'].shape[0]-1,len(first['media']['names'])))
+    for x,name in enumerate(first['media']['names']):
+        if name in second['media']['index']:
+            media2[:,x]=second['media']['media'][1:,second['media']['index'][name]]
+    fluxes={}
+    for model,fluxTable in first['fluxes'].items():
+        rows=np.flatnonzero(fluxTable['cycles']<=endCycle)
+        fluxes[model]={'cycles':np.concatenate([fluxTable['cycles'][rows],second['fluxes'][model]['cycles']+endCycle]),
+                       'fluxes':np.vstack([fluxTable['fluxes'][rows],second['fluxes'][model]['fluxes']]),
+                       'index':second['fluxes'][model]['index']}
+    cycles=np.concatenate([first['media']['cycles'][:endCycle+1],second['media']['cycles'][1:]+endCycle])
+    return {'biomass':np.vstack([first['biomass'][:endCycle+1],biomass2]),
+            'media':{'cycles':cycles,'media':np.vstack([first['media']['media'][:endCycle+1],media2]),'names':first['media']['names'],
+                     'index':first['media']['index'],'offsets':{}},
+            'fluxes':fluxes,'objectives':second['objectives']}
+### end-function-concat_trajectories
+################################################################
+
+
+################################################################
+### FUNCTION run_dfba ##########################################
+def run_dfba(models,layout,initialPop=None,media=None,maxCycles=None,stopCondition=None,extraCycles=2,randomOrder=True,rng=None,lpCacheSize=None,boundQuantum=1e-6):
+    '''
+    Call: trajectories = run_dfba(models,layout,initialPop,media,maxCycles,stopCondition,extraCycles,randomOrder,rng,lpCacheSize,boundQuantum)
+
+    INPUTS: models: COBRApy models of the community, in the order of model_file (their bounds are restored at the end).
+            layout: COMETS layout (see read_layout).
+            initialPop: initial biomass of each model (default: initial_pop of the layout).
+            media: {metabolite: value} replacing world_media values of the layout (e.g. placeholders).
+            maxCycles: number of cycles (default: maxCycles of the layout).
+            stopCondition: function stopCondition(cycle,concentrations), as in cometsWatcher.run_comets: the run finishes extraCycles
+                           after the first cycle where it is True (unless FLYCOP_EARLY_STOP=0).
+            randomOrder: if False, models run in model_file order in every cycle.
+            rng: random.Random for the order of models (default: a new one).
+            lpCacheSize: maximum number of LP solutions cached per model, least recently used are removed first (default: see lp_cache_size).
+            boundQuantum: bounds are rounded to multiples of boundQuantum in the keys of the LP cache.
+    OUTPUT: trajectories: dictionary with:
+                  'biomass': array (cycles x (1+models)), as cometsLogIO.read_total_biomass_log.
+                  'media': dictionary as cometsLogIO.read_media_log, for the exchange metabolites of all the models (0.0 if not in world_media).
+                  'fluxes': {model number (1-based): flux table}, as cometsLogIO.read_flux_log (all the reactions, from cycle 1).
+                  'objectives': {model number: id of its objective reaction}.
+                  'lpCache': {'hits': cycles reusing a cached LP solution, 'solved': LP solved, 'hitRate': hits/(hits+solved)}.
+    '''
+    return run_dfba_batch(models,layout,[{'initialPop':initialPop,'media':media}],maxCycles,stopCondition,extraCycles,randomOrder,rng,lpCacheSize,boundQuantum)[0]
+### end-function-run_dfba
+################################################################
+
+
+################################################################
+### FUNCTION run_dfba_batch ####################################
+def run_dfba_batch(models,layout,configurations,maxCycles=None,stopCondition=None,extraCycles=2,randomOrder=True,rng=None,lpCacheSize=None,boundQuantum=1e-6):
+    '''
+    Call: trajectoriesList = run_dfba_batch(models,layout,configurations,maxCycles,stopCondition,extraCycles,randomOrder,rng,lpCacheSize,boundQuantum)
+
+    Runs several configurations of the same community in lockstep: cycle by cycle, biomass and media of all the configurations are updated
+    as arrays (configurations x models, configurations x metabolites), and the LP problem of each base model (a model object can be given
+    several times, e.g. two strains of the same GEM) is shared by all the strains and configurations, changing its bounds in place.
+    The cache of LP solutions (see lp_cache_size) is shared too: a solution is reused by any strain or configuration with the same bounds.
+
+    INPUTS: models: COBRApy base models of the community, in the order of model_file (their bounds are restored at the end).
+            layout: COMETS layout (see read_layout).
+            configurations: list of dictionaries, each one with the optional keys:
+                            'bounds': {model number (1-based): {reaction id: (lower bound, upper bound)}} changed in the base model for that strain.
+                            'initialPop', 'media': as in run_dfba (default: those of the layout).
+                            'stopCondition': stop condition of this configuration (default: stopCondition).
+                            'rng': random.Random for the order of models in this configuration (default: rng), e.g. the same stream in
+                                   the same replicate of different configurations (common random numbers, see replicateRunner.replicate_rng).
+            maxCycles, stopCondition, extraCycles, randomOrder, rng, lpCacheSize, boundQuantum: as in run_dfba. Each configuration
+                            finishes independently, and models run in a random order per configuration.
+    OUTPUT: trajectoriesList: list of trajectories (see run_dfba), one per configuration.
+    '''
+    params=layout['parameters']
+    timeStep=float(params.get('timestep','0.1'))
+    deathRate=float(params.get('deathrate','0'))
+    volume=(float(params.get('spacewidth','0.1'))**3)/1000 # box volume in L (spaceWidth in cm)
+    monod=params.get('exchangestyle','Standard').lower().startswith('monod')
+    km=float(params.get('defaultkm','0.01'))
+    vmax=float(params.get('defaultvmax','10'))
+    if maxCycles is None:
+        maxCycles=int(params['maxcycles'])
+    if rng is None:
+        rng=random.Random()
+    numConfs=len(configurations)
+    rngs=[configuration.get('rng') or rng for configuration in configurations]
+    # Exchange metabolites of all the models (media columns), in order of appearance, and exchange reactions of each model: [reaction, media column]
+    names=[]
+    nameIndex={}
+    exchanges=[]
+    for model in models:
+        modelExchanges=[]
+        for y,rxn in enumerate(model.reactions):
+            if(rxn.id.find('EX_')==0 and len(rxn.metabolites)==1):
+                metId=next(iter(rxn.metabolites)).id
+                if metId not in nameIndex:
+                    nameIndex[metId]=len(names)
+                    names.append(metId)
+                modelExchanges.append((y,nameIndex[metId]))
+        exchanges.append(modelExchanges)
+    objIndex=[objective_reaction(model) for model in models]
+    # One LP problem per base model (p), and reactions whose bounds change in it: exchanges and bounds of any configuration
+    baseModels=[]
+    problemOf=[]
+    for model in models:
+        if not any(model is baseModel for baseModel in baseModels):
+            baseModels.append(model)
+        problemOf.append(next(p for p,baseModel in enumerate(baseModels) if model is baseModel))
+    changed=[set() for model in baseModels]
+    for k,model in enumerate(models):
+        changed[problemOf[k]].update(y for y,x in exchanges[k])
+        for configuration in configurations:
+            changed[problemOf[k]].update(model.reactions.index(rxnId) for rxnId in configuration.get('bounds',{}).get(k+1,{}))
+    changed=[sorted(reactions) for reactions in changed]
+    baseLb=[np.array([baseModel.reactions[y].lower_bound for y in changed[p]],dtype=float) for p,baseModel in enumerate(baseModels)]
+    baseUb=[np.array([baseModel.reactions[y].upper_bound for y in changed[p]],dtype=float) for p,baseModel in enumerate(baseModels)]
+    # Per strain (k): bounds of the changed reactions of its problem in each configuration (configurations x reactions), and position of its exchanges
+    confLb=[]
+    confUb=[]
+    exPos=[]
+    for k,model in enumerate(models):
+        p=problemOf[k]
+        position={y:z for z,y in enumerate(changed[p])}
+        lbs=np.tile(baseLb[p],(numConfs,1))
+        ubs=np.tile(baseUb[p],(numConfs,1))
+        for c,configuration in enumerate(configurations):
+            for rxnId,(lb,ub) in configuration.get('bounds',{}).get(k+1,{}).items():
+                z=position[model.reactions.index(rxnId)]
+                lbs[c,z]=lb
+                ubs[c,z]=ub
+        confLb.append(lbs)
+        confUb.append(ubs)
+        exPos.append(np.array([position[y] for y,x in exchanges[k]],dtype=int))
+    exY=[np.array([y for y,x in modelExchanges],dtype=int) for modelExchanges in exchanges]
+    exCols=[np.array([x for y,x in modelExchanges],dtype=int) for modelExchanges in exchanges]
+    problems=[fba_problem(baseModel) for baseModel in baseModels]
+    currentLb=[lbs.copy() for lbs in baseLb]
+    currentUb=[ubs.copy() for ubs in baseUb]
+    # LP solutions per problem: {quantized bounds of its changed reactions: fluxes (None if not feasible)}, in order of use
+    lpCacheSize=lp_cache_size(lpCacheSize)
+    lpCaches=[collections.OrderedDict() for baseModel in baseModels]
+    lpHits=0
+    lpSolved=0
+    # Batch state: media amounts (configurations x metabolites) and biomass (configurations x models)
+    amounts=np.zeros((numConfs,len(names)))
+    biomass=np.zeros((numConfs,len(models)))
+    stopConditions=[]
+    for c,configuration in enumerate(configurations):
+        worldMedia=dict(layout['media'])
+        if configuration.get('media') is not None:
+            worldMedia.update(configuration['media'])
+        amounts[c]=[float(worldMedia.get(name,0.0)) for name in names]
+        initialPop=configuration.get('initialPop')
+        biomass[c]=layout['initialPop'] if initialPop is None else initialPop
+        stopConditions.append(configuration.get('stopCondition',stopCondition))
+    if not cometsWatcher.early_stop_enabled():
+        stopConditions=[None]*numConfs
+    biomassRows=[[[0.0]+list(biomass[c])] for c in range(numConfs)]
+    mediaRows=[[amounts[c].copy()] for c in range(numConfs)]
+    fluxRows=[[[] for model in models] for c in range(numConfs)]
+    orders=[list(range(len(models))) for c in range(numConfs)]
+    lastCycles=[None]*numConfs
+    running=list(range(numConfs))
+    try:
+        for cycle in range(0,maxCycles+1):
+            cometsWatcher.check_deadline() # wall-clock cutoff of the evaluation, as in COMETS runs
+            if(cycle>0):
+                if randomOrder:
+                    for c in running:
+                        rngs[c].shuffle(orders[c])
+                for step in range(len(models)):
+                    # Configurations running model k in this step
+                    for k in range(len(models)):
+                        confs=np.array([c for c in running if orders[c][step]==k],dtype=int)
+                        if(confs.size==0):
+                            continue
+                        p=problemOf[k]
+                        confBiomass=biomass[confs,k]
+                        confAmounts=amounts[np.ix_(confs,exCols[k])]
+                        with np.errstate(divide='ignore',invalid='ignore'):
+                            available=confAmounts/(confBiomass[:,None]*timeStep)
+                            if monod:
+                                concentration=confAmounts/volume
+                                available=np.minimum(available,vmax*concentration/(km+concentration))
+                        lbs=confLb[k][confs]
+                        ubs=confUb[k][confs]
+                        lbs[:,exPos[k]]=np.minimum(np.maximum(lbs[:,exPos[k]],-available),ubs[:,exPos[k]])
+                        fluxes=np.zeros((confs.size,len(models[k].reactions)))
+                        for r in np.flatnonzero(confBiomass>0):
+                            lpKey=np.rint(np.concatenate([lbs[r],ubs[r]])/boundQuantum).astype(np.int64).tobytes()
+                            if lpKey in lpCaches[p]:
+                                # Same constraints as a previous cycle, strain or configuration: same solution
+                                solution=lpCaches[p][lpKey]
+                                lpCaches[p].move_to_end(lpKey)
+                                lpHits=lpHits+1
+                            else:
+                                for z in np.flatnonzero((lbs[r]!=currentLb[p])|(ubs[r]!=currentUb[p])):
+                                    problems[p]['set_bounds'](changed[p][z],lbs[r,z],ubs[r,z])
+                                currentLb[p]=lbs[r].copy()
+                                currentUb[p]=ubs[r].copy()
+                                solution=problems[p]['solve']()
+                                lpSolved=lpSolved+1
+                                if(lpCacheSize>0):
+                                    lpCaches[p][lpKey]=solution
+                                    if(len(lpCaches[p])>lpCacheSize):
+                                        lpCaches[p].popitem(last=False)
+                            if solution is not None: # no biomass or not feasible: no growth (fluxes 0)
+                                fluxes[r]=solution
+                        amounts[np.ix_(confs,exCols[k])]=np.maximum(0.0,confAmounts+fluxes[:,exY[k]]*confBiomass[:,None]*timeStep)
+                        biomass[confs,k]=np.maximum(0.0,confBiomass*(1+(fluxes[:,objIndex[k]]-deathRate)*timeStep))
+                        for r,c in enumerate(confs):
+                            fluxRows[c][k].append(fluxes[r])
+                for c in running:
+                    biomassRows[c].append([float(cycle)]+list(biomass[c]))
+                    mediaRows[c].append(amounts[c].copy())
+            for c in list(running):
+                if(stopConditions[c] is not None and lastCycles[c] is None and stopConditions[c](cycle,{name.split('[')[0]:float(amounts[c,x]) for x,name in enumerate(names)})):
+                    lastCycles[c]=cycle+extraCycles
+                if(lastCycles[c] is not None and cycle>=lastCycles[c]):
+                    running.remove(c)
+            if(len(running)==0):
+                break
+    finally:
+        for p,baseModel in enumerate(baseModels):
+            for z in np.flatnonzero((currentLb[p]!=baseLb[p])|(currentUb[p]!=baseUb[p])):
+                problems[p]['set_bounds'](changed[p][z],baseLb[p][z],baseUb[p][z])
+    print('dFBA: '+str(numConfs)+' configuration(s), '+str(sum(len(rows)-1 for rows in biomassRows))+' cycles, '+str(lpSolved)+' LP solved, LP cache hit rate: '+str(round(float(lpHits)/max(1,lpHits+lpSolved),3)))
+    lpStats={'hits':lpHits,'solved':lpSolved,'hitRate':float(lpHits)/max(1,lpHits+lpSolved)}
+    trajectoriesList=[]
+    for c in range(numConfs):
+        numCycles=len(biomassRows[c])
+        trajectoriesList.append({'biomass':np.array(biomassRows[c],dtype=float),
+                                 'media':{'cycles':np.arange(numCycles),'media':np.array(mediaRows[c],dtype=float).reshape(numCycles,len(names)),'names':names,
+                                          'index':cometsLogIO.media_index(names),'offsets':{}},
+                                 'fluxes':{k+1:{'cycles':np.arange(1,numCycles),'fluxes':np.array(fluxRows[c][k],dtype=float).reshape(numCycles-1,len(model.reactions)),
+                                                'index':{rxn.id:y for y,rxn in enumerate(model.reactions)}} for k,model in enumerate(models)},
+                                 'objectives':{k+1:model.reactions[objIndex[k]].id for k,model in enumerate(models)},
+                                 'lpCache':lpStats})
+    return trajectoriesList
+### end-function-run_dfba_batch
+################################################################
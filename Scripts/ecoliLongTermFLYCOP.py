@@ -9,6 +9,8 @@
 #          >>avgfitness,sdfitness=ecoliLongTermFLYCOP_oneConf(-10,-10,-20,-5,-15,-10)
 # Goal: individual test to improve consortium {E.coli-E.coli}, depending on glucose, acetate and oxygen uptakes in each of the two strains:
 # Run through the function ecoliLongTermFLYCOP_oneConf
+# Several configurations with the in-process backend (dfbaEngine), simulated in lockstep: ecoliLongTermFLYCOP_sweep
+#          >>results=ecoliLongTermFLYCOP_sweep([(-10,-10,-20,-5,-15,-10),(-8,-10,-20,-5,-15,-10)])
 
  
 import cobra
@@ -22,11 +24,25 @@ import copy
 import csv
 import math
 import cobra.flux_analysis.variability
-import massedit
 import subprocess
 import shutil, errno
 import statistics
+import time
+import numpy as np
 from cobra import Reaction
+import cometsModelIO
+import cometsModelCache
+import cometsLayout
+import cometsLogIO
+import cometsWatcher
+import dfbaEngine
+import modelCompression
+import replicateRunner
+import trajectoryStore
+import fitnessArchive
+import resultsDB
+
+scriptsDir=os.path.dirname(os.path.abspath(__file__))
 
 
 ################################################################
@@ -71,65 +87,280 @@ def initialize_models():
 ################################################################
 
 
-################################################################    
-### FUNCTION mat_to_comets #####################################    
-# mat_to_comets(modelPath)
-# Re-code in python from COMETS code
-def mat_to_comets(matInputFile):
-    model=cobra.io.load_matlab_model(matInputFile)
-    # Open output file:
-    with open(matInputFile+'.cmt', mode='w') as f:
-        # Print the S matrix
-        f.write("SMATRIX  "+str(len(model.metabolites))+"  "+str(len(model.reactions))+"\n")
-        for x in range(len(model.metabolites)):
-            for y in range(len(model.reactions)):
-                if (model.metabolites[x] in model.reactions[y].metabolites):
-                    coeff=model.reactions[y].get_coefficient(model.metabolites[x])
-                    f.write("    "+str(x+1)+"   "+str(y+1)+"   "+str(coeff)+"\n")
-        f.write("//\n")
-        
-        # Print the bounds
-        f.write("BOUNDS  -1000  1000\n");
-        for y in range(len(model.reactions)):
-            lb=model.reactions[y].lower_bound
-            up=model.reactions[y].upper_bound
-            f.write("    "+str(y+1)+"   "+str(lb)+"   "+str(up)+"\n")
-        f.write("//\n")
-        
-        # Print the objective reaction
-        f.write('OBJECTIVE\n')
-        for y in range(len(model.reactions)):
-            if (model.reactions[y] in model.objective):
-                indexObj=y+1
-        f.write("    "+str(indexObj)+"\n")
-        f.write("//\n")
+################################################################
+### FUNCTION strain_bounds #####################################
+# Bounds changed in the base model (iJO1366py_tmp.mat) for a strain with the given uptakes (glucose, acetate and oxygen lower bounds), as {rxnId:(lower,upper)}
+def strain_bounds(glu,ac,o2):
+    bounds={'EX_glc__D(e)':(-1000,1000),'EX_o2(e)':(-1000,1000),'GLCtex_copy1':(0,-glu),'O2tex':(0,-o2)}
+    if(ac<=0):
+        bounds['ACtex']=(-1000,-ac)
+        bounds['EX_ac(e)']=(ac,1000)
+    else:
+        bounds['ACtex']=(-ac,1000)
+        bounds['EX_ac(e)']=(-1000,ac)
+    return bounds
+### end-function-strain_bounds
+################################################################
+
+
+################################################################
+### FUNCTION build_strain_model ################################
+# Strain model with the given uptakes, exported to COMETS as cmtOutputFile.
+# Only the bounds in strain_bounds() are patched in the precompiled base model (skeleton), instead of loading and exporting the whole model.
+# If this code or initialize_models() change, strainRecipe must change too, to invalidate the cache of strain models (cometsModelCache).
+strainRecipe='ecoliLongTerm_strain_v1'
+def load_base_model():
+    if not(os.path.exists('ModelsInput/iJO1366py_tmp.mat')):
+        initialize_models()
+    if modelCompression.enabled():
+        # Reduced under the world_media of the layout, keeping the reactions whose bounds change among strains
+        return modelCompression.reduce_mat('ModelsInput/iJO1366py_tmp.mat','ModelsInput/iJO1366py_tmp_reduced.mat',
+                                           dfbaEngine.read_layout('ecoliLongTerm_layout_template.txt')['media'],list(strain_bounds(0,0,0)))
+    return cobra.io.load_matlab_model('ModelsInput/iJO1366py_tmp.mat')
+
+# Metabolites kept in world_media of the layout even with initial value 0: those secreted by any strain, and those in the fitness.
+def layout_keep_metabolites(mediaMets):
+    return cometsLayout.secreted_metabolites('ModelsInput/iJO1366py_tmp_secreted.txt',[load_base_model],mediaMets,list(strain_bounds(0,0,0)))+['glc_D[e]','ac[e]']
+
+def build_strain_model(glu,ac,o2,cmtOutputFile):
+    skeleton=cometsModelCache.cached_skeleton(['ModelsInput/iJO1366.mat'],modelCompression.recipe(strainRecipe),load_base_model)
+    cometsModelIO.skeleton_to_comets(skeleton,cmtOutputFile,bounds=strain_bounds(glu,ac,o2))
+
+# The same strains for the in-process backend, as configuration of a batch of dfbaEngine.run_dfba_batch on the base model (both strains).
+def dfba_configuration(glu1,ac1,o21,glu2,ac2,o22,biomass1,biomass2):
+    return {'bounds':{1:strain_bounds(glu1,ac1,o21),2:strain_bounds(glu2,ac2,o22)},'initialPop':[biomass1,biomass2],
+            'stopCondition':lambda cycle,concentrations: end_of_experiment(concentrations,ac1,ac2)}
+### end-function-build_strain_model
+################################################################
+
+
+################################################################
+### FUNCTION end_of_experiment #################################
+# Stop condition of COMETS runs (see cometsWatcher): glucose exhausted, and acetate too if any strain takes it (as endCycle in fitness).
+def end_of_experiment(concentrations,ac1,ac2):
+    if((ac1>=0)and(ac2>=0)):
+        return concentrations['glc_D']==0.0
+    return (concentrations['glc_D']==0.0)and(concentrations['ac']==0.0)
+### end-function-end_of_experiment
+################################################################
+
+
+################################################################
+### FUNCTION experiment_cycles #################################
+# End of the experiment in a run, from its table [cycle, biomass1, biomass2, glc_D, ac]: (endRow, endCycle, endGlcCycle)
+def experiment_cycles(table,ac1,ac2):
+    # endCycle: when glucose and acetate are exhausted (or only glucose, if acetate is not taken by any strain)
+    glcExhausted=(table[:,3]==0.0)
+    if((ac1>=0)and(ac2>=0)):
+        endRows=np.flatnonzero(glcExhausted)
+    else:
+        endRows=np.flatnonzero(glcExhausted&(table[:,4]==0.0))
+    endRow=endRows[0] if endRows.size>0 else table.shape[0]-1
+    endCycle=int(table[endRow,0])
+    # endGlcCycle: first cycle (>0) with glucose exhausted, up to endCycle (0 if none)
+    glcRows=np.flatnonzero(glcExhausted[:endRow+1]&(table[:endRow+1,0]>0))
+    endGlcCycle=int(table[glcRows[0],0]) if glcRows.size>0 else 0
+    return endRow,endCycle,endGlcCycle
+### end-function-experiment_cycles
+################################################################
+
+
+################################################################
+### FUNCTION replicate_measures ################################
+# Measures of a run used by the fitness functions, from its table (see experiment_cycles) and fluxes of the objective (if read) and acetate
+# exchange reactions of both strains.
+def replicate_measures(table,fluxes,objRxn1,objRxn2,ac1,ac2):
+    endRow,endCycle,endGlcCycle=experiment_cycles(table,ac1,ac2)
+    iniBiomass=float(table[0,1]+table[0,2])
+    totGlc=float(table[0,3])
+    # Biomass yield= sum(increment in biomass per strain (i.e. biomass final point-biomass initial point))/initial concentration of glucose in the media (total glucose, because the end of our experiment is after glucose finished). In gDW/mmol.
+    # To compute final biomass as the maximum biomass of each strain
+    finalBiomass1=max(0.0,float(table[:endCycle+2,1].max()))
+    finalBiomass2=max(0.0,float(table[:endCycle+2,2].max()))
+    finalBiomass=finalBiomass1+finalBiomass2
+    biomassYieldNew=float((finalBiomass-iniBiomass)/(totGlc*0.1801559)) # molecular weigth glucose per mmol
+    # Time: minimize endCycle
+    fitTime=1-(float(endCycle)/float(240))
+    # Growth rate at the cycle before glucose is exhausted (0 if that cycle is not in the log; None if objective fluxes were not read)
+    fitGR=None
+    if(objRxn1 in fluxes[1]['index'] and objRxn2 in fluxes[2]['index']):
+        GR1=cometsLogIO.flux_at(fluxes[1],endGlcCycle-1,objRxn1)
+        GR2=cometsLogIO.flux_at(fluxes[2],endGlcCycle-1,objRxn2)
+        fitGR=((GR1 if GR1 is not None else 0.0)+(GR2 if GR2 is not None else 0.0))/2
+    # Acetate uptake: flux of EX_ac(e) in cycle 2 (the first one is usually 0)
+    uptakeAc1=cometsLogIO.flux_at(fluxes[1],2,'EX_ac(e)')
+    uptakeAc2=cometsLogIO.flux_at(fluxes[2],2,'EX_ac(e)')
+    return {'endCycle':endCycle,'endGlcCycle':endGlcCycle,'iniBiomass':iniBiomass,'finalBiomass':finalBiomass,'biomassYield':biomassYieldNew,
+            'fitTime':fitTime,'GR':fitGR,'uptakeAc1':uptakeAc1,'uptakeAc2':uptakeAc2}
+### end-function-replicate_measures
+################################################################
+
+
+################################################################
+### FUNCTION fitness functions #################################
+# Registered fitness functions: {fitFunc: function of the measures of a run (see replicate_measures)}. They can be optimized (fitFunc argument)
+# or applied to the archived runs of a FLYCOP run (ecoliLongTermFLYCOP_rescore). A fitness function using fluxes needs them in log_needs.
+MaximumYield=0.6 # For normalizing yield
+fitnessFunctions={
+    'Yield': lambda measures: measures['biomassYield']/MaximumYield, # Normalizing Yield
+    'MaxYield_MinTime': lambda measures: 0.5*(measures['biomassYield']/MaximumYield)+0.5*measures['fitTime'], # Normalizing yield
+    'YieldNewScattered': lambda measures: (measures['biomassYield']**4)*10, # (biomass^4)*10: To spread values from ~0.45-0.55 values to 0.5 to 1
+    'MaxYieldNewScattered_MinTime': lambda measures: 0.5*((measures['biomassYield']**4)*10)+0.5*measures['fitTime'],
+    'Biomass': lambda measures: float(measures['finalBiomass']-measures['iniBiomass']),
+    'MaxBiomass_MinTime': lambda measures: 0.5*(float(measures['finalBiomass']-measures['iniBiomass']))+0.5*measures['fitTime'],
+    'GR': lambda measures: measures['GR'],
+    'MaxGR_MinTime': lambda measures: 0.5*measures['GR']+0.5*measures['fitTime'],
+}
+
+# Fitness of a run, with the fitness function fitFunc
+def replicate_fitness(fitFunc,measures):
+    if fitFunc not in fitnessFunctions:
+        raise ValueError('Unknown fitness function: '+fitFunc+' (registered: '+', '.join(fitnessFunctions)+')')
+    fitness=fitnessFunctions[fitFunc](measures)
+    # To avoid unrealistic cases, because with 10mM of glc the strains can't reach more than ~1 gr/L. I'm not sure if the relation is lineal with less or more glucose, but this solution is better than >1, which it will be very ad-hoc to totGlc=10.
+    #if(float(finalBiomass-iniBiomass) > (totGlc/10)):
+    if(float(measures['finalBiomass']-measures['iniBiomass']) > 1.03):  # Given that with both strains with WT, total biomass=1.028
+        fitness=0
+    return fitness
+### end-function-fitness functions
+################################################################
+
+
+################################################################
+### FUNCTION log_needs #########################################
+# Logs needed by a fitness function (selective logging, see cometsLogIO): {'flux': reactions of the flux log per strain ('objective': its objective reaction)}.
+# Acetate exchange is always needed (uptake in cycle 2, in the results), and the objective only for growth rate (in the cycle before glucose is exhausted).
+# fitFunc None: those of all the fitness functions (e.g. to archive the runs, see fitnessArchive).
+def log_needs(fitFunc):
+    if fitFunc in [None,'GR','MaxGR_MinTime']:
+        return {'flux':['objective','EX_ac(e)']}
+    return {'flux':['EX_ac(e)']}
+### end-function-log_needs
+################################################################
+
+
+################################################################
+### FUNCTION ecoliLongTermFLYCOP_replicate #####################
+# One COMETS run (replicate i) of a configuration, in the current directory, already with the models and layout of the configuration.
+# Steps 5-7 of ecoliLongTermFLYCOP_oneConf. It is run by replicateRunner, serially or in parallel (dirPlot must be absolute in the latter case).
+# With dfbaSetup ('trajectories' of all the replicates, already simulated in-process by dfbaEngine), COMETS is not run (no logs).
+def ecoliLongTermFLYCOP_replicate(i,glu1,ac1,o21,glu2,ac2,o22,fitFunc,dirPlot,dfbaSetup=None):
+    if dfbaSetup is None:
+        # COMETS stopped 2 cycles after the end of the experiment (fitness uses biomass up to endCycle+1 and fluxes in cycle 2), instead of running up to maxCycles.
+        logs={'media':'media_log_template.txt','biomass':'total_biomass_log_template.txt','flux':'flux_log_template.txt'}
+        stopCondition=lambda cycle,concentrations: end_of_experiment(concentrations,ac1,ac2)
+        objRxn1=cometsLogIO.cmt_objective('ecoli_1_tmp.mat.cmt')
+        objRxn2=cometsLogIO.cmt_objective('ecoli_2_tmp.mat.cmt')
+        reactionNames={1:cometsLogIO.cmt_reaction_names('ecoli_1_tmp.mat.cmt'),2:cometsLogIO.cmt_reaction_names('ecoli_2_tmp.mat.cmt')}
+        # Reactions needed by the fitness (by all the fitness functions, if the runs are archived for re-scoring)
+        needs=log_needs(None if fitnessArchive.enabled() else fitFunc)
+        # Same random stream in replicate i of every configuration, with common random numbers (see replicateRunner)
+        cometsLayout.seed_layout('ecoliLongTerm_layout_template.txt',replicateRunner.replicate_seed(i))
+        neededReactions={numStrain:[objRxn if rxnId=='objective' else rxnId for rxnId in needs['flux']] for numStrain,objRxn in [(1,objRxn1),(2,objRxn2)]}
+        if cometsWatcher.fifo_logs():
+            # Logs consumed through named pipes, keeping in memory only the flux log columns needed by the fitness (nothing written to disk but an optional gzip copy)
+            lastCycle,logs=cometsWatcher.run_comets_fifo('comets_script_template','output.txt',logs,stopCondition,extraCycles=2,
+                                                         keep={'flux':cometsLogIO.flux_line_filter(reactionNames,neededReactions)},archive=cometsWatcher.archive_files(logs,'run'+str(i)))
+        else:
+            cometsWatcher.run_comets('comets_script_template','output.txt',logs,stopCondition,extraCycles=2)
+        cometsLayout.check_seed('output.txt',replicateRunner.replicate_seed(i))
+        biomass=cometsLogIO.read_total_biomass_log(logs['biomass'])
+        media=cometsLogIO.read_media_log(logs['media'])
+    else:
+        trajectories=dfbaSetup['trajectories'][i]
+        biomass=trajectories['biomass']
+        media=trajectories['media']
+
+    # 6.- Biomass and media (glucose and acetate) per cycle, read in a single pass over the logs (or simulated): [cycle, biomass1, biomass2, glc_D, ac]
+    table=cometsLogIO.biomass_vs_media(biomass,media,['glc_D','ac'])
+    cometsLogIO.write_table('biomass_vs_glc_D_ac_template.txt',table)
+    # [R call] Run script to generate one graph: strains versus metabolite/s
+    subprocess.call([scriptsDir+'/plot_biomassX2_vs_2mediaItem.sh','template','glc_D','ac','Ecoli1','Ecoli2'])
+
+    # 7.- Compute fitness (measure to optimize):
+    print('computing fitness...')
+    # 7.1.- Determine endCycle: when glucose and acetate are exhausted (or only glucose, if acetate is not taken by any strain)
+    endRow,endCycle,endGlcCycle=experiment_cycles(table,ac1,ac2)
+    # Fluxes of the objective (growth rate) and acetate exchange reactions of both strains, read in a single pass over the flux log
+    if dfbaSetup is None:
+        if cometsWatcher.fifo_logs():
+            # Lines of the flux log already reduced to the needed reactions
+            fluxes=cometsLogIO.read_flux_log(logs['flux'],neededReactions)
+        elif cometsLogIO.selective_logs():
+            # Only the reactions and cycles needed by the fitness are read, and kept in the flux log of the run
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames,neededReactions,[2,endGlcCycle-1])
+            cometsLogIO.write_flux_log('flux_log_template.txt',fluxes)
+        else:
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames,{1:[objRxn1,'EX_ac(e)'],2:[objRxn2,'EX_ac(e)']})
+    else:
+        objRxn1=trajectories['objectives'][1]
+        objRxn2=trajectories['objectives'][2]
+        fluxes=trajectories['fluxes']
+    # 7.2.- Compute fitness elements (maximize biomass yield, minimize time, growth rate) and 7.3.- joint fitness, with the registered fitness function
+    measures=replicate_measures(table,fluxes,objRxn1,objRxn2,ac1,ac2)
+    fitness=replicate_fitness(fitFunc,measures)
+    finalBiomass=measures['finalBiomass']
+    biomassYieldNew=measures['biomassYield']
+    uptakeAc1=measures['uptakeAc1']
+    uptakeAc2=measures['uptakeAc2']
         
-        # Print metabolite names
-        f.write("METABOLITE_NAMES\n")
-        for x in range(len(model.metabolites)):
-            f.write("    "+model.metabolites[x].id+"\n")
-        f.write("//\n")
-
-        # Print reaction names
-        f.write("REACTION_NAMES\n")
-        for y in range(len(model.reactions)):
-            f.write("    "+model.reactions[y].id+"\n")
-        f.write("//\n")
-
-        # Print exchange reactions
-        f.write("EXCHANGE_REACTIONS\n")
-        for y in range(len(model.reactions)):
-            if (model.reactions[y].id.find('EX_')==0):
-                f.write(" "+str(y+1))
-        f.write("\n//\n")                
-### end-function-mat_to_comets    
+    print(" Total biomass: "+str(round(finalBiomass,6))+" in cycle "+str(endCycle)+". Biomass yield="+str(round(biomassYieldNew,6)))
+
+    # Copy individual solution
+    file='IndividualRunsResults/'+'biomass_vs_glc_D_ac_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'        
+    shutil.move('biomass_vs_glc_D_ac_template_plot.pdf',file)
+    plotFile=None
+    if(dirPlot != ''):
+        file2=dirPlot+'biomass_vs_glc_D_ac_'+str(glu1)+'_'+str(ac1)+'_'+str(o21)+'_'+str(glu2)+'_'+str(ac2)+'_'+str(o22)+'_'+str(round(uptakeAc1,1))+'_'+str(round(uptakeAc2,1))+'_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
+        shutil.copy(file,file2)
+        plotFile=os.path.basename(file2)
+    if((dfbaSetup is None and trajectoryStore.enabled()) or fitnessArchive.enabled()):
+        # Biomass, media and fluxes (those kept in the flux log) of the run, for the binary trajectory store of the configuration, instead of
+        # the text logs, and/or the archive of the FLYCOP run for re-scoring (see ecoliLongTermFLYCOP_oneConf)
+        if(dfbaSetup is None and trajectoryStore.enabled() and not(cometsLogIO.selective_logs() or cometsWatcher.fifo_logs())):
+            fluxes=cometsLogIO.read_flux_log('flux_log_template.txt',reactionNames)
+        trajectoryStore.save_run('IndividualRunsResults',i,biomass,media,fluxes,{1:objRxn1,2:objRxn2})
+    if(dfbaSetup is None and trajectoryStore.enabled()):
+        trajectoryStore.remove_logs(['total_biomass_log_template.txt','media_log_template.txt','flux_log_template.txt'])
+    elif(dfbaSetup is None and not cometsWatcher.fifo_logs()):
+        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
+        shutil.move('total_biomass_log_template.txt',file)
+        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
+        shutil.move('media_log_template.txt',file)
+        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
+        shutil.move('flux_log_template.txt',file)
+    return {'fitness':fitness,'finalBiomass':finalBiomass,'biomassYield':biomassYieldNew,'endCycle':endCycle,'uptakeAc1':uptakeAc1,'uptakeAc2':uptakeAc2,'plot':plotFile}
+### end-function-ecoliLongTermFLYCOP_replicate
 ################################################################
 
 
+################################################################
+### FUNCTION configuration_results #############################
+# Average and standard deviation of the fitness of the runs of a configuration (results of ecoliLongTermFLYCOP_replicate), printed and
+# stored in the results of fitFunc in dirPlot (see resultsDB), with the wall time and other artifacts of the configuration.
+def configuration_results(configuration,fitFunc,results,dirPlot,wallTime=None,artifacts={}):
+    glu1,ac1,o21,glu2,ac2,o22=configuration
+    fitnessList=[result['fitness'] for result in results]
+    avgfitness=sum(fitnessList)/len(results)
+    sdfitness=statistics.stdev(fitnessList)
+    avgBiomass=sum([result['finalBiomass'] for result in results])/len(results)
+    avgYield=sum([result['biomassYield'] for result in results])/len(results)
+    # Values of the last run
+    endCycle=results[-1]['endCycle']
+    uptakeAc1=results[-1]['uptakeAc1']
+    uptakeAc2=results[-1]['uptakeAc2']
+    resultsDB.write_results(dirPlot,'ecoliLongTerm',fitFunc,str(glu1)+','+str(ac1)+','+str(o21)+','+str(glu2)+','+str(ac2)+','+str(o22)+','+str(round(uptakeAc1,1))+','+str(round(uptakeAc2,1)),
+                            dict(zip(['glu1','ac1','o21','glu2','ac2','o22'],configuration)),
+                            [('fitness',round(avgfitness,6)),('sd',sdfitness),('avg.Biomass',round(avgBiomass,6)),('avg.Yield',round(avgYield,6)),('endCycle',endCycle)],
+                            results,wallTime,artifacts)
+    return avgfitness,sdfitness
+### end-function-configuration_results
+################################################################
+
 
 ################################################################
 ### FUNCTION ecoliLongTermFLYCOP_oneConf #######################   
-def ecoliLongTermFLYCOP_oneConf(glu1,ac1,o21,glu2,ac2,o22,fitFunc='MaxYield_MinTime',dirPlot='',repeat=10):
+def ecoliLongTermFLYCOP_oneConf(glu1,ac1,o21,glu2,ac2,o22,fitFunc='MaxYield_MinTime',dirPlot='',repeat=10,repeatProcs=None,backend=None,trajectories=None):
   '''
   Call: avgFitness, sdFitness = ecoliLongTerm_oneConf(glu1,ac1,o21,glu2,ac2,o22)
 
@@ -140,14 +371,16 @@ def ecoliLongTermFLYCOP_oneConf(glu1,ac1,o21,glu2,ac2,o22,fitFunc='MaxYield_MinT
           ace2: lower bound of acetate uptake in model 2.
           o22: lower bound of oxygen uptake in model 2.
           dirPlot: copy of the graphs with several run results.
-          repeat: number of runs with the same configuration.
+          repeat: number of runs with the same configuration (maximum number, in adaptive mode: see replicateRunner).
+          repeatProcs: number of runs executed in parallel (default: FLYCOP_REPLICATE_PROCS environment variable, or 1).
+          backend: 'comets' (COMETS runs) or 'dfba' (in-process dynamic FBA of the layout with the COBRApy models, see dfbaEngine; without .cmt files nor logs).
+                   Default: FLYCOP_BACKEND environment variable, or 'comets'.
+          trajectories: with backend 'dfba', the trajectories of the 'repeat' runs if they were already simulated (see ecoliLongTermFLYCOP_sweep).
   OUTPUT: avgFitness: average fitness of 'repeat' COMETS runs with the same configuration (due to it is not deterministic)
           sdFitness: standard deviation of fitness during 'repeat' COMETS runs (see above)
   '''
 
-  if not(os.path.exists('ModelsInput/iJO1366py_tmp.mat')):
-      initialize_models()
-
+  startTime=time.time()
   # Determine initial biomasses.
   biomass1=0.01
   biomass2=0.01
@@ -156,176 +389,50 @@ def ecoliLongTermFLYCOP_oneConf(glu1,ac1,o21,glu2,ac2,o22,fitFunc='MaxYield_MinT
 
   # Single GEMs parameter modifications
   # ===================================
-  if not(os.path.exists('ecoli_1_tmp.mat.cmt')):
-    # 1.1.- [COBRApy] Establish modifications in model 1 
-    model=cobra.io.load_matlab_model('ModelsInput/iJO1366py_tmp.mat')
-    model.reactions.get_by_id('EX_glc__D(e)').bounds=(-1000,1000)
-    model.reactions.get_by_id('EX_o2(e)').bounds=(-1000,1000)
-    model.reactions.get_by_id('GLCtex_copy1').bounds=(0,-glu1)
-    model.reactions.get_by_id('O2tex').bounds=(0,-o21)
-    if(ac1<=0):
-        model.reactions.get_by_id('ACtex').lower_bound=-1000
-        model.reactions.get_by_id('ACtex').upper_bound=-ac1
-        model.reactions.get_by_id('EX_ac(e)').bounds=(ac1,1000)
-    else:
-        model.reactions.get_by_id('ACtex').lower_bound=-ac1
-        model.reactions.get_by_id('ACtex').upper_bound=1000
-        model.reactions.get_by_id('EX_ac(e)').bounds=(-1000,ac1)
-    cobra.io.save_matlab_model(model,'ecoli_1_tmp.mat','model')
-    del(model)
-      
-    # 1.2.- [COBRApy] Establish modifications in model 2
-    model=cobra.io.load_matlab_model('ModelsInput/iJO1366py_tmp.mat')
-    model.reactions.get_by_id('EX_glc__D(e)').bounds=(-1000,1000)
-    model.reactions.get_by_id('EX_o2(e)').bounds=(-1000,1000)
-    model.reactions.get_by_id('GLCtex_copy1').bounds=(0,-glu2)
-    model.reactions.get_by_id('O2tex').bounds=(0,-o22)
-    if(ac2<=0):
-        model.reactions.get_by_id('ACtex').lower_bound=-1000
-        model.reactions.get_by_id('ACtex').upper_bound=-ac2
-        model.reactions.get_by_id('EX_ac(e)').bounds=(ac2,1000)
-    else:
-        model.reactions.get_by_id('ACtex').lower_bound=-ac2
-        model.reactions.get_by_id('ACtex').upper_bound=1000
-        model.reactions.get_by_id('EX_ac(e)').bounds=(-1000,ac2)
-    cobra.io.save_matlab_model(model,'ecoli_2_tmp.mat','model')
-    del(model)
-    
-    # 2.- [python] 
-    mat_to_comets('ecoli_1_tmp.mat')
-    mat_to_comets('ecoli_2_tmp.mat')
+  dfbaSetup=None
+  if(dfbaEngine.backend(backend)=='dfba'):
+    # 1.- [COBRApy] Models 1 and 2 as bounds of the base model, with the initial biomasses, and 5.- all the runs simulated in lockstep by dfbaEngine (steps 2 and 4 are not needed).
+    if trajectories is None:
+      configuration=dfba_configuration(glu1,ac1,o21,glu2,ac2,o22,biomass1,biomass2)
+      baseModel=load_base_model()
+      trajectories=dfbaEngine.run_dfba_batch([baseModel,baseModel],dfbaEngine.read_layout('ecoliLongTerm_layout_template.txt'),
+                                            [dict(configuration,rng=replicateRunner.replicate_rng(i)) for i in range(repeat)],extraCycles=2)
+    dfbaSetup={'trajectories':trajectories}
+  elif not(os.path.exists('ecoli_1_tmp.mat.cmt')):
+    # 1.- [COBRApy] Establish modifications in models 1 and 2, and 2.- [python] export them to COMETS format.
+    # Through the cache of strain models: the same (glu,ac,o2) uptakes are only built once, in this or any previous configuration.
+    cometsModelCache.cached_cmt(['ModelsInput/iJO1366.mat'],modelCompression.recipe(strainRecipe),{'glu':glu1,'ac':ac1,'o2':o21},'ecoli_1_tmp.mat.cmt',lambda: build_strain_model(glu1,ac1,o21,'ecoli_1_tmp.mat.cmt'))
+    cometsModelCache.cached_cmt(['ModelsInput/iJO1366.mat'],modelCompression.recipe(strainRecipe),{'glu':glu2,'ac':ac2,'o2':o22},'ecoli_2_tmp.mat.cmt',lambda: build_strain_model(glu2,ac2,o22,'ecoli_2_tmp.mat.cmt'))
 
     # Community parameter modifications
     # =================================        
-    # 4.- [shell script] Write automatically the COMETS parameter about initial biomass of strains.
-    massedit.edit_files(['ecoliLongTerm_layout_template.txt'],["re.sub(r'XXX','"+str(biomass1)+"',line)"], dry_run=False)
-    massedit.edit_files(['ecoliLongTerm_layout_template.txt'],["re.sub(r'YYY','"+str(biomass2)+"',line)"], dry_run=False)        
+    # 4.- [python] Write the COMETS layout with the initial biomass of strains, in a single write (world_media without metabolites that are never in the media).
+    spec=cometsLayout.read_layout_spec('ecoliLongTerm_layout_template.txt')
+    cometsLayout.write_layout(spec,'ecoliLongTerm_layout_template.txt',layout_keep_metabolites(list(spec['media'])),initialPop=[biomass1,biomass2])
 
   # 5.- [COMETS by command line] Run COMETS
   if not(os.path.exists('IndividualRunsResults')):
     os.makedirs('IndividualRunsResults')
-  totfitness=0
-  sumTotBiomass=0
-  sumTotYield=0
-  fitnessList=[]
-  # To repeat X times, due to random behaviour in COMETS:
-  for i in range(repeat):
-        with open("output.txt", "w") as f:
-            subprocess.call(['./comets_scr','comets_script_template'], stdout=f)
-    
-        # 6.- [R call] Run script to generate one graph: strains versus metabolite/s
-        subprocess.call(['../../Scripts/plot_biomassX2_vs_2mediaItem.sh','template','glc_D','ac','Ecoli1','Ecoli2'])
-
-        # 7.- Compute fitness (measure to optimize):
-        print('computing fitness...')
-        # 7.1.- Determine endCycle: when glucose and acetate are exhausted
-        with open("biomass_vs_glc_D_ac_template.txt", "r") as sources:
-            lines = sources.readlines()
-            iniPointV=lines[0].split()
-            iniBiomass=float(iniPointV[1])+float(iniPointV[2])
-            totGlc=float(iniPointV[3])
-            endGlcCycle=0
-            for line in lines:
-                endCycle=int(line.split()[0])
-                glcConc=float(line.split()[3])
-                acConc=float(line.split()[4])
-                if((endGlcCycle==0)and(glcConc==0.0)):
-                    endGlcCycle=endCycle
-                if((glcConc==0.0)and(acConc==0.0)):
-                    break;
-                if((glcConc==0.0)and(ac1>=0)and(ac2>=0)):
-                    break;
-            endPointV=lines[endCycle].split()
-        # 7.2.- Compute first element fitness: maximize biomass yield
-        # biomass yield= sum(increment in biomass per strain (i.e. biomass final point-biomass initial point))/initial concentration of glucose in the media (total glucose, because the end of our experiment is after glucose finished). In gDW/mmol.
-        # To compute final biomass as the maximum biomass of each strain
-        finalBiomass1=0
-        finalBiomass2=0
-        count=0
-        for line in lines:
-            if(float(line.split()[1])>finalBiomass1):
-                finalBiomass1=float(line.split()[1])
-            if(float(line.split()[2])>finalBiomass2):
-                finalBiomass2=float(line.split()[2])
-            if(count>endCycle):
-                break;
-            count=count+1
-        finalBiomass=finalBiomass1+finalBiomass2
-        biomassYieldNew=float((finalBiomass-iniBiomass)/(totGlc*0.1801559)) # molecular weigth glucose per mmol
-        # For normalizing yield
-        MaximumYield=0.6
-        # 7.3.- Compute second element fitnes: minimize time        
-        fitTime=1-(float(endCycle)/float(240))
-        # 7.4.- Compute joint fitness, as a 50% each element.
-        if(fitFunc=='Yield'):
-            fitness=(biomassYieldNew/MaximumYield) # Normalizing Yield
-        elif(fitFunc=='MaxYield_MinTime'):
-            fitness=0.5*(biomassYieldNew/MaximumYield)+0.5*fitTime #Normalizing yield
-        elif(fitFunc=='YieldNewScattered'): # (biomass^4)*10: To spread values from ~0.45-0.55 values to 0.5 to 1
-            fitness=(biomassYieldNew**4)*10
-        elif(fitFunc=='MaxYieldNewScattered_MinTime'):
-            fitness=0.5*((biomassYieldNew**4)*10)+0.5*fitTime
-        elif(fitFunc=='Biomass'):
-            fitness=float(finalBiomass-iniBiomass)
-        elif(fitFunc=='MaxBiomass_MinTime'):
-            fitness=0.5*(float(finalBiomass-iniBiomass))+0.5*fitTime
-        elif((fitFunc=='GR')or(fitFunc=='MaxGR_MinTime')):
-            numRxnGR1=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" ecoli_1_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))
-            numRxnGR2=int(subprocess.check_output(['egrep -A1 "OBJECTIVE" ecoli_2_tmp.mat.cmt | tail -1 | tr -d \[:space:\]'], shell=True))            
-            try:
-                GR1=float(subprocess.check_output(['egrep "fluxes\{"'+str(endGlcCycle-1)+'"\}\{1\}\{1\}\{1\}" flux_log_template.txt | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR1+1)], shell=True))
-            except:
-                GR1=0.0
-            try:
-                GR2=float(subprocess.check_output(['egrep "fluxes\{"'+str(endGlcCycle-1)+'"\}\{1\}\{1\}\{2\}" flux_log_template.txt | cut -d"=" -f2 | cut -d" " -f'+str(numRxnGR2+1)], shell=True))
-            except:
-                GR2=0.0
-            fitGR=(GR1+GR2)/2
-            if(fitFunc=='GR'):
-                fitness=fitGR
-            elif(fitFunc=='MaxGR_MinTime'):
-                fitness=0.5*fitGR+0.5*fitTime
-
-        # To avoid unrealistic cases, because with 10mM of glc the strains can't reach more than ~1 gr/L. I'm not sure if the relation is lineal with less or more glucose, but this solution is better than >1, which it will be very ad-hoc to totGlc=10.
-        #if(float(finalBiomass-iniBiomass) > (totGlc/10)):
-        if(float(finalBiomass-iniBiomass) > 1.03):  # Given that with both strains with WT, total biomass=1.028
-            fitness=0
-
-        # Compute acetate uptake
-        numRxnExAc=37 # Position EX_ac(e) in .mat.cmt - Position first rxn + 1 
-        # flux in cycle 2 (the first one is usually 0)
-        uptakeAc1=float(subprocess.check_output(['egrep "fluxes\{2\}\{1\}\{1\}\{1\}" flux_log_template.txt | cut -d"=" -f2 | cut -d" " -f'+str(numRxnExAc)], shell=True))
-        uptakeAc2=float(subprocess.check_output(['egrep "fluxes\{2\}\{1\}\{1\}\{2\}" flux_log_template.txt | cut -d"=" -f2 | cut -d" " -f'+str(numRxnExAc)], shell=True))
-            
-        print(" Total biomass: "+str(round(finalBiomass,6))+" in cycle "+str(endCycle)+". Biomass yield="+str(round(biomassYieldNew,6)))
-
-        totfitness=totfitness+fitness
-        fitnessList.append(fitness)
-        sumTotBiomass=sumTotBiomass+finalBiomass
-        sumTotYield=sumTotYield+biomassYieldNew
-        
-        # Copy individual solution
-        file='IndividualRunsResults/'+'biomass_vs_glc_D_ac_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'        
-        shutil.move('biomass_vs_glc_D_ac_template_plot.pdf',file)
-        if(dirPlot != ''):
-            file2=dirPlot+'biomass_vs_glc_D_ac_'+str(glu1)+'_'+str(ac1)+'_'+str(o21)+'_'+str(glu2)+'_'+str(ac2)+'_'+str(o22)+'_'+str(round(uptakeAc1,1))+'_'+str(round(uptakeAc2,1))+'_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
-            shutil.copy(file,file2)
-        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
-        shutil.move('total_biomass_log_template.txt',file)
-        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
-        shutil.move('media_log_template.txt',file)
-        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
-        shutil.move('flux_log_template.txt',file)   
-    
-  avgfitness=totfitness/repeat
-  sdfitness=statistics.stdev(fitnessList)
-  avgBiomass=sumTotBiomass/repeat
-  avgYield=sumTotYield/repeat
-  print("Fitness_function\tconfiguration\tfitness\tsd\tavg.Biomass\tavg.Yield\tendCycle")
-  print(fitFunc+"\t"+str(glu1)+','+str(ac1)+','+str(o21)+','+str(glu2)+','+str(ac2)+','+str(o22)+','+str(round(uptakeAc1,1))+','+str(round(uptakeAc2,1))+"\t"+str(round(avgfitness,6))+"\t"+str(sdfitness)+"\t"+str(round(avgBiomass,6))+"\t"+str(round(avgYield,6))+"\t"+str(endCycle))
-  with open(dirPlot+"configurationsResults"+fitFunc+".txt", "a") as myfile:
-      myfile.write("Fitness_function\tconfiguration\tfitness\tsd\tavg.Biomass\tavg.Yield\tendCycle\n")
-      myfile.write(fitFunc+"\t"+str(glu1)+','+str(ac1)+','+str(o21)+','+str(glu2)+','+str(ac2)+','+str(o22)+','+str(round(uptakeAc1,1))+','+str(round(uptakeAc2,1))+"\t"+str(round(avgfitness,6))+"\t"+str(sdfitness)+"\t"+str(round(avgBiomass,6))+"\t"+str(round(avgYield,6))+"\t"+str(endCycle)+"\n")
+  # To repeat X times, due to random behaviour in COMETS (in parallel if repeatProcs>1, see replicateRunner; up to X times in adaptive mode):
+  results=replicateRunner.run_replicates(ecoliLongTermFLYCOP_replicate,repeat,(glu1,ac1,o21,glu2,ac2,o22,fitFunc,replicateRunner.abs_prefix(dirPlot),dfbaSetup),
+                                         replicateRunner.replicate_procs(repeatProcs),
+                                         linkFiles=['ecoli_1_tmp.mat.cmt','ecoli_2_tmp.mat.cmt','comets_scr'],copyFiles=['comets_script_template','ecoliLongTerm_layout_template.txt'],
+                                         stopCondition=replicateRunner.sequential_stop(resultsDB.incumbent(dirPlot,fitFunc)))
+  failure=replicateRunner.failed_replicate(results)
+  if failure is not None:
+      # COMETS failed in a run (see cometsWatcher.failurePatterns): the configuration gets fitness 0, and the reason is stored in the results
+      resultsDB.write_failure(dirPlot,'ecoliLongTerm',fitFunc,str(glu1)+','+str(ac1)+','+str(o21)+','+str(glu2)+','+str(ac2)+','+str(o22),
+                              dict(zip(['glu1','ac1','o21','glu2','ac2','o22'],(glu1,ac1,o21,glu2,ac2,o22))),failure,time.time()-startTime)
+      return 0,0
+  # Trajectories of the runs: archived to re-score them with other fitness functions, and in the binary store of the configuration
+  artifacts={}
+  if fitnessArchive.enabled():
+      artifacts['trajectoriesArchive']=fitnessArchive.archive_runs('IndividualRunsResults',dirPlot,(glu1,ac1,o21,glu2,ac2,o22))
+  if trajectoryStore.enabled():
+      trajectoryStore.gather_runs('IndividualRunsResults')
+  else:
+      trajectoryStore.remove_parts('IndividualRunsResults')
+  avgfitness,sdfitness=configuration_results((glu1,ac1,o21,glu2,ac2,o22),fitFunc,results,dirPlot,time.time()-startTime,artifacts)
   
   print("Avg.fitness(sd):\t"+str(avgfitness)+"\t"+str(sdfitness)+"\n")
   if(sdfitness>0.1):
@@ -336,3 +443,55 @@ def ecoliLongTermFLYCOP_oneConf(glu1,ac1,o21,glu2,ac2,o22,fitFunc='MaxYield_MinT
 ################################################################
 
 
+################################################################
+### FUNCTION ecoliLongTermFLYCOP_sweep #########################
+def ecoliLongTermFLYCOP_sweep(configurations,fitFunc='MaxYield_MinTime',dirPlot='',repeat=10,repeatProcs=None):
+  '''
+  Call: results = ecoliLongTermFLYCOP_sweep(configurations)
+
+  INPUTS: configurations: list of (glu1,ac1,o21,glu2,ac2,o22), as arguments of ecoliLongTermFLYCOP_oneConf (e.g. a grid or a batch of the optimizer).
+          fitFunc, dirPlot, repeat, repeatProcs: as in ecoliLongTermFLYCOP_oneConf.
+  OUTPUT: results: list of (avgFitness, sdFitness), one per configuration.
+  All the runs of all the configurations are simulated in lockstep with the in-process backend (dfbaEngine.run_dfba_batch), sharing the LP
+  problem of the base model, and then evaluated as ecoliLongTermFLYCOP_oneConf with backend 'dfba'.
+  '''
+  biomass1=0.01
+  biomass2=0.01
+  baseModel=load_base_model()
+  batch=[]
+  for configuration in configurations:
+    batch.extend([dict(dfba_configuration(*configuration,biomass1,biomass2),rng=replicateRunner.replicate_rng(i)) for i in range(repeat)])
+  trajectories=dfbaEngine.run_dfba_batch([baseModel,baseModel],dfbaEngine.read_layout('ecoliLongTerm_layout_template.txt'),batch,extraCycles=2)
+  results=[]
+  for c,configuration in enumerate(configurations):
+    results.append(ecoliLongTermFLYCOP_oneConf(*configuration,fitFunc=fitFunc,dirPlot=dirPlot,repeat=repeat,repeatProcs=repeatProcs,backend='dfba',
+                                               trajectories=trajectories[c*repeat:(c+1)*repeat]))
+  return results
+# end-def ecoliLongTermFLYCOP_sweep
+################################################################
+
+
+################################################################
+### FUNCTION ecoliLongTermFLYCOP_rescore #######################
+def ecoliLongTermFLYCOP_rescore(dirPlot,fitFunc):
+  '''
+  Call: results = ecoliLongTermFLYCOP_rescore(dirPlot,fitFunc)
+
+  INPUTS: dirPlot: directory of the results of a FLYCOP run, with the runs of its configurations archived (FLYCOP_RESCORE_ARCHIVE=1, see fitnessArchive).
+          fitFunc: registered fitness function (see fitnessFunctions), e.g. other than the one optimized in that FLYCOP run.
+  OUTPUT: results: {configuration: (avgFitness, sdFitness)}, also stored in the results of fitFunc in dirPlot, as ecoliLongTermFLYCOP_oneConf.
+  Configurations are not simulated again: the fitness of each run is computed from its archived trajectories.
+  '''
+  results={}
+  for configuration,storeDir in fitnessArchive.archived_configurations(dirPlot):
+    glu1,ac1,o21,glu2,ac2,o22=configuration
+    runResults=[]
+    for i in trajectoryStore.store_runs(trajectoryStore.open_store(storeDir)):
+      biomass,media,fluxes=trajectoryStore.load_trajectory(storeDir,i)
+      table=cometsLogIO.biomass_vs_media(biomass,media,['glc_D','ac'])
+      measures=replicate_measures(table,fluxes,fluxes[1]['objective'],fluxes[2]['objective'],ac1,ac2)
+      runResults.append(dict(measures,fitness=replicate_fitness(fitFunc,measures)))
+    results[configuration]=configuration_results(configuration,fitFunc,runResults,dirPlot)
+  return results
+# end-def ecoliLongTermFLYCOP_rescore
+################################################################
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Archive of the simulated trajectories of every configuration evaluated in a FLYCOP run, to re-score them later with another fitness function
+# without simulating them again. The consortium pipelines (*FLYCOP.py) save the biomass, media and fluxes needed by all their fitness functions
+# of each run (see trajectoryStore), and each configuration is archived in <dirPlot>/trajectoriesArchive/<configuration>/ (next to the
+# results of the FLYCOP run). The consortium module computes the fitness of archived runs with any registered fitness function
+# (fitnessFunctions in *FLYCOP.py) and stores again the results of that fitness function (<consortium>FLYCOP_rescore, see resultsDB).
+# Example: >>import fitnessArchive
+#          >>fitnessArchive.archive_runs('IndividualRunsResults','../smac-output/ecoliLongTerm_PlotsScenario1/',(-10,-16,-11,-12,-6,-16))
+#          >>fitnessArchive.archived_configurations('../smac-output/ecoliLongTerm_PlotsScenario1/')
+#
+# Call from command line (e.g. in the data analysis directory, with the PlotsScenario directory of a FLYCOP run):
+#   python3 ../Scripts/fitnessArchive.py rescore <consortiumPrefix> <dirPlot> <fitnessFunction>   # replaces the results of <fitnessFunction> in <dirPlot>
+#
+# Environment variables:
+#  FLYCOP_RESCORE_ARCHIVE: 1 to archive the trajectories of the evaluated configurations (default: 0).
+
+import os
+import os.path
+import sys
+import importlib
+import trajectoryStore
+import resultsDB
+
+
+################################################################
+### FUNCTION enabled ###########################################
+def enabled():
+    return os.environ.get('FLYCOP_RESCORE_ARCHIVE','0')=='1'
+### end-function-enabled
+################################################################
+
+
+################################################################
+### FUNCTION configuration_name, archive_dir ###################
+# Canonical name of a configuration (tuple of parameter values, as float, so -10 and -10.0 are the same one), and directory of the archive.
+def configuration_name(configuration):
+    return '_'.join([repr(float(value)) for value in configuration])
+
+def archive_dir(dirPlot):
+    return os.path.join(dirPlot,'trajectoriesArchive')
+### end-function-configuration_name, archive_dir
+################################################################
+
+
+################################################################
+### FUNCTION archive_runs ######################################
+# Archive the runs saved in resultsDir (trajectory_run<i>.npz, see trajectoryStore.save_run) as the runs of a configuration, in a compressed
+# store in the archive of dirPlot, whose directory (relative to dirPlot) is returned. Parts are kept in resultsDir (for the store of the
+# configuration, if enabled).
+def archive_runs(resultsDir,dirPlot,configuration):
+    storeDir=os.path.join(archive_dir(''),configuration_name(configuration))
+    trajectoryStore.gather_runs(resultsDir,os.path.join(dirPlot,storeDir),'npz',removeParts=False)
+    return storeDir
+### end-function-archive_runs
+################################################################
+
+
+################################################################
+### FUNCTION archived_configurations ###########################
+# Configurations archived in dirPlot: list of (configuration tuple, directory of its store), sorted.
+def archived_configurations(dirPlot):
+    archiveDir=archive_dir(dirPlot)
+    if not(os.path.exists(archiveDir)):
+        return []
+    configurations=[]
+    for name in sorted(os.listdir(archiveDir)):
+        if os.path.exists(os.path.join(archiveDir,name,'trajectories.npz')):
+            configurations.append((tuple(float(value) for value in name.split('_')),os.path.join(archiveDir,name)))
+    return configurations
+### end-function-archived_configurations
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv)==5 and sys.argv[1]=='rescore'):
+        consortium=sys.argv[2]
+        dirPlot=os.path.join(sys.argv[3],'')
+        fitFunc=sys.argv[4]
+        sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        module=importlib.import_module(consortium+'FLYCOP')
+        if not hasattr(module,consortium+'FLYCOP_rescore'):
+            print('Re-scoring is not available for '+consortium)
+            sys.exit(1)
+        resultsDB.clear_results(dirPlot,fitFunc)
+        results=getattr(module,consortium+'FLYCOP_rescore')(dirPlot,fitFunc)
+        print(str(len(results))+' configurations re-scored with '+fitFunc+' in the results of '+dirPlot)
+    else:
+        print('Usage: fitnessArchive.py rescore <consortiumPrefix> <dirPlot> <fitnessFunction>')
@@ -7,19 +7,11 @@
 suffix=$1
 cycle=$2
 
-inFile="media_log_${suffix}.txt"
-outFile="media_cycle_"${cycle}".txt"
-
-echo -e "#met\tvalueOneCycle" > $outFile
-
-listMets=`egrep "^media_names" ${inFile} | cut -d{ -f2 | cut -d} -f1 |sed 's/\[e\]//g' | sed 's/\ //g' | sed 's/,/\ /g' | sed 's/'\''//g'`
-for met in ${listMets}
-do
-    numMet=`head -n1 ${inFile} | sed "s/.*{ //" | sed "s/}.*//" | sed "s/'//g" | sed "s/, /\n/g" | egrep -w -n ${met} | cut -d: -f1`
-    # Get a column with values of the media in the given time point. tail preserves just last line if there are several lines for the same cycle.
-    value=`egrep '^media\_'${cycle}'\{'$numMet'\}' ${inFile} | cut -d= -f2 | sed "s/^\ //" | sed "s/;$//" | sed "s/sparse.*/0.0/" | tail -n1`
-    echo -e "${met}\t${value}" >> $outFile
-done
+dirScripts=`dirname $0`
+
+# media_cycle_${cycle}.txt with the composition in the given cycle, from a single pass over media_log_${suffix}.txt (see cometsLogIO.py).
+# The last value in the cycle is kept if there are several lines for the same metabolite.
+python3 ${dirScripts}/cometsLogIO.py media_composition ${suffix} ${cycle}
 
 
 
@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Optional reduction of the base GEMs of a consortium (after initialize_models), before exporting them to COMETS (cometsModelIO)
+# or simulating them in-process (dfbaEngine), so that every cycle solves a smaller LP problem:
+#  1) reactions blocked by FVA under the world_media of the layout (uptake only of metabolites in world_media) are removed,
+#  2) fully coupled reaction chains (through a metabolite only in those 2 reactions) are merged in a single reaction,
+#  3) metabolites without reactions (orphan) are removed.
+# Exchange reactions, the objective reaction and reactions whose bounds change among configurations are always kept, and the reduced
+# model is verified to give the same optimal growth than the original one (otherwise, the original model is used).
+# Example: >>import modelCompression
+#          >>modelCompression.reduce_mat('ModelsInput/iJO1366py_tmp.mat','ModelsInput/iJO1366py_tmp_reduced.mat',mediaMets,['GLCtex_copy1','O2tex','ACtex'])
+#
+# Environment variables:
+#  FLYCOP_REDUCE_MODELS: 1 to use the reduced base models in the consortia pipelines (default: 0).
+
+import os
+import os.path
+import cobra
+import cobra.flux_analysis
+
+
+################################################################
+### FUNCTION enabled ###########################################
+def enabled():
+    return os.environ.get('FLYCOP_REDUCE_MODELS','0')=='1'
+### end-function-enabled
+################################################################
+
+
+################################################################
+### FUNCTION recipe ############################################
+# Recipe of a base model for the cache of strain models (cometsModelCache): a reduced model is a different base model.
+def recipe(strainRecipe):
+    if enabled():
+        return strainRecipe+'_reduced_v1'
+    return strainRecipe
+### end-function-recipe
+################################################################
+
+
+################################################################
+### FUNCTION is_exchange #######################################
+# Exchange reaction (EX_*, met[e] <=>), as taken by COMETS and dfbaEngine.
+def is_exchange(rxn):
+    return rxn.id.find('EX_')==0 and len(rxn.metabolites)==1
+### end-function-is_exchange
+################################################################
+
+
+################################################################
+### FUNCTION media_model #######################################
+# Copy of a model under the conditions of the simulation: no uptake of metabolites out of mediaMets, and bounds in relaxBounds ({rxnId:(lower,upper)}).
+def media_model(model,mediaMets,relaxBounds={}):
+    mediaModel=model.copy()
+    for rxn in mediaModel.reactions:
+        if(is_exchange(rxn) and next(iter(rxn.metabolites)).id not in mediaMets and rxn.lower_bound<0):
+            rxn.lower_bound=0
+    for rxnId,bounds in relaxBounds.items():
+        if rxnId in mediaModel.reactions:
+            mediaModel.reactions.get_by_id(rxnId).bounds=bounds
+    return mediaModel
+### end-function-media_model
+################################################################
+
+
+################################################################
+### FUNCTION optimal_growth ####################################
+def optimal_growth(model):
+    solution=model.optimize()
+    if hasattr(solution,'objective_value'): # COBRApy>=0.6
+        return solution.objective_value if solution.status=='optimal' else 0.0
+    return solution.f if solution.status=='optimal' else 0.0
+### end-function-optimal_growth
+################################################################
+
+
+################################################################
+### FUNCTION merge_coupled_reactions ###########################
+# Merge fully coupled reaction chains: a metabolite only in 2 reactions r1 (a1) and r2 (a2) forces v2=-a1/a2*v1 in steady state,
+# so r2 is added to r1 scaled by -a1/a2 (removing that metabolite), with the bounds of both. Kept reactions are never merged. Returns merged reactions.
+def merge_coupled_reactions(model,keepReactions):
+    numMerged=0
+    merged=True
+    while merged:
+        merged=False
+        for met in list(model.metabolites):
+            rxns=sorted(met.reactions,key=lambda rxn: model.reactions.index(rxn))
+            if(len(rxns)!=2 or any(rxn.id in keepReactions for rxn in rxns)):
+                continue
+            r1,r2=rxns
+            factor=-r1.metabolites[met]/r2.metabolites[met]
+            if(factor>0):
+                lb2,ub2=r2.lower_bound/factor,r2.upper_bound/factor
+            else:
+                lb2,ub2=r2.upper_bound/factor,r2.lower_bound/factor
+            r1.add_metabolites({m:factor*coeff for m,coeff in r2.metabolites.items()})
+            if met in r1.metabolites: # COBRApy 0.5 keeps 0 coefficients
+                r1.pop(met)
+            r1.bounds=(max(r1.lower_bound,lb2),min(r1.upper_bound,ub2))
+            if(r2.gene_reaction_rule!=''):
+                r1.gene_reaction_rule=r2.gene_reaction_rule if r1.gene_reaction_rule=='' else '('+r1.gene_reaction_rule+') and ('+r2.gene_reaction_rule+')'
+            model.remove_reactions([r2])
+            numMerged=numMerged+1
+            merged=True
+    return numMerged
+### end-function-merge_coupled_reactions
+################################################################
+
+
+################################################################
+### FUNCTION reduce_model ######################################
+def reduce_model(model,mediaMets,variableReactions=[],keepReactions=[],tolerance=1e-6):
+    '''
+    Call: reducedModel = reduce_model(model,mediaMets,variableReactions,keepReactions,tolerance)
+
+    INPUTS: model: COBRApy base model (not modified).
+            mediaMets: metabolites ids (e.g. 'glc_D[e]') that could be in the media (world_media of the layout): other ones are not taken up.
+            variableReactions: reactions whose bounds change among strains or configurations: kept, and fully open (-1000,1000) in FVA.
+            keepReactions: other reactions to keep. Exchange and objective reactions are always kept.
+            tolerance: maximum relative difference in optimal growth between the original and the reduced model.
+    OUTPUT: reducedModel: reduced copy of model, or a copy of model without changes if the optimal growth is not the same.
+    '''
+    keep=set(keepReactions)|set(variableReactions)
+    keep.update(rxn.id for rxn in model.reactions if is_exchange(rxn))
+    keep.update(rxn.id for rxn in model.reactions if rxn.objective_coefficient!=0)
+    relaxBounds={rxnId:(-1000,1000) for rxnId in variableReactions}
+    reduced=model.copy()
+    numRxns=len(reduced.reactions)
+    numMets=len(reduced.metabolites)
+    # 1.- Blocked reactions (FVA with fraction of optimum 0), under the media and with variable reactions open
+    blocked=cobra.flux_analysis.find_blocked_reactions(media_model(reduced,mediaMets,relaxBounds))
+    blocked=[getattr(rxnId,'id',rxnId) for rxnId in blocked]
+    reduced.remove_reactions([reduced.reactions.get_by_id(rxnId) for rxnId in blocked if rxnId not in keep])
+    # 2.- Fully coupled reaction chains
+    numMerged=merge_coupled_reactions(reduced,keep)
+    # 3.- Orphan metabolites
+    for met in [met for met in reduced.metabolites if len(met.reactions)==0]:
+        met.remove_from_model()
+    # Verification: same optimal growth, with the base bounds and with the variable reactions open
+    for relax in [{},relaxBounds]:
+        growth=optimal_growth(media_model(model,mediaMets,relax))
+        reducedGrowth=optimal_growth(media_model(reduced,mediaMets,relax))
+        if(abs(growth-reducedGrowth)>tolerance*max(1.0,abs(growth))):
+            print('WARNING! Reduced model '+str(model.id)+' not used: optimal growth '+str(reducedGrowth)+' instead of '+str(growth))
+            return model.copy()
+    print('Reduced model '+str(model.id)+': '+str(numRxns)+' -> '+str(len(reduced.reactions))+' reactions ('+str(numMerged)+' merged), '+str(numMets)+' -> '+str(len(reduced.metabolites))+' metabolites')
+    return reduced
+### end-function-reduce_model
+################################################################
+
+
+################################################################
+### FUNCTION reduce_mat ########################################
+# Reduced base model saved in matOutputFile (matlab format), as the models of initialize_models, and returned. Only built the first time.
+def reduce_mat(matInputFile,matOutputFile,mediaMets,variableReactions=[],keepReactions=[]):
+    if not(os.path.exists(matOutputFile)):
+        reduced=reduce_model(cobra.io.load_matlab_model(matInputFile),mediaMets,variableReactions,keepReactions)
+        cobra.io.save_matlab_model(reduced,matOutputFile,'model')
+    return cobra.io.load_matlab_model(matOutputFile)
+### end-function-reduce_mat
+################################################################
@@ -7,7 +7,7 @@
 # Call:
 #sh plot_biomassX4_vs_mediaItem.sh <suffix> <met1 (without [e])> <strain1> <strain2> <strain3> <strain4>
 
-dirScripts="../../Scripts"
+dirScripts=`dirname $0`
 
 
 suffix=$1
@@ -20,12 +20,11 @@ strain4=$6
 outFile="biomass_vs_"${met1}_${suffix}".txt"
 plotFile="biomass_vs_"${met1}_${suffix}"_plot.pdf"
 
-numMet1=`head -n1 media_log_${suffix}.txt | sed "s/.*{ //" | sed "s/}.*//" | sed "s/'//g" | sed "s/, /\n/g" | egrep -w -n ${met1} | cut -d: -f1`
-
-egrep '\{'$numMet1'\}' media_log_${suffix}.txt | sed "s/media_//" | sed "s/{$numMet1}//" | sed "s/(1, 1)//" | sed "s/sparse.*/0.0/" | sed "s/;$//" | sed "s/\ =\ /\t/" | awk -F"\t" 'BEGIN{oldCycle=0;value=-1}{if($1!=oldCycle){print value; oldCycle=$1; value=$2}else{value=$2}}END{print value}' > media_log_substrate.txt
-
-paste -d'\t' total_biomass_log_${suffix}.txt media_log_substrate.txt > $outFile
-rm media_log_substrate.txt
+# Biomass and media concentrations per cycle, extracted in a single pass over the logs.
+# Not again if $outFile is newer than the media log (already written by the FLYCOP pipeline, see cometsLogIO.py).
+if [ ! ${outFile} -nt media_log_${suffix}.txt ]; then
+    python3 ${dirScripts}/cometsLogIO.py biomass_vs_media ${suffix} ${met1}
+fi
 
 
 
@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Execution of the 'repeat' COMETS runs (replicates) of one consortium configuration, used by *FLYCOP_oneConf.
+# Serially, in the working directory (as always), or in a pool of processes. In the latter case, each replicate runs in its own
+# sub-directory (replicate_<i>) with the files it needs, so COMETS logs and plots (with fixed names) do not collide,
+# and the files each replicate leaves in IndividualRunsResults/ are gathered in IndividualRunsResults/ of the working directory.
+# The wall time of each replicate is added to its results ('wallTime', in seconds).
+# In adaptive mode, 'repeat' is the maximum number of replicates: they are run (one by one, or in rounds of nProcs) until the 95% confidence
+# interval of the average fitness is narrow enough, or as soon as the configuration is discarded anyway: its sd is over the threshold of
+# *FLYCOP_oneConf (0.1) or the upper bound of the interval is below the best fitness found so far in the FLYCOP run (see sequential_stop).
+# With common random numbers (FLYCOP_CRN_SEED), replicate i of every configuration uses the same random stream (order of the models in
+# each cycle in dfbaEngine; randomSeed of the layout in COMETS, checked in its output by cometsLayout.check_seed), so differences among
+# configurations are not hidden by the noise of the replicates (see crnReport.py).
+# A replicate aborted by a failure of COMETS (cometsWatcher.CometsFailure) returns its reason instead of its results ('failure' and
+# 'failureLine', see failed_replicate): no more replicates are run, and the configuration is discarded by *FLYCOP_oneConf.
+#
+# Environment variables:
+#  FLYCOP_REPLICATE_PROCS: default number of processes to run replicates (default: 1, i.e. serially). Each COMETS run takes its own JVM (see comets_scr -Xmx).
+#  FLYCOP_ADAPTIVE_REPEAT: 1 to run replicates in adaptive mode (default: 0, always 'repeat' replicates).
+#  FLYCOP_ADAPTIVE_CI: half-width of the 95% confidence interval of the average fitness to stop in adaptive mode (default: 0.01).
+#  FLYCOP_ADAPTIVE_MIN: minimum number of replicates in adaptive mode (default: 2).
+#  FLYCOP_CRN_SEED: seed of the common random numbers: replicate i of every configuration uses seed FLYCOP_CRN_SEED+i (default: none, random).
+
+import os
+import os.path
+import shutil
+import time
+import math
+import random
+import statistics
+import concurrent.futures
+import cometsWatcher
+
+
+################################################################
+### FUNCTION replicate_procs ###################################
+# Number of processes to run replicates: the given one, or FLYCOP_REPLICATE_PROCS (default 1).
+def replicate_procs(nProcs=None):
+    if nProcs is None:
+        nProcs=int(os.environ.get('FLYCOP_REPLICATE_PROCS','1'))
+    return max(1,nProcs)
+### end-function-replicate_procs
+################################################################
+
+
+################################################################
+### FUNCTION adaptive, t_quantile ##############################
+def adaptive():
+    return os.environ.get('FLYCOP_ADAPTIVE_REPEAT','0')=='1'
+
+# Two-sided 95% quantile of the Student t distribution with df degrees of freedom.
+tQuantiles=[12.706,4.303,3.182,2.776,2.571,2.447,2.365,2.306,2.262,2.228,2.201,2.179,2.160,2.145,2.131,2.120,2.110,2.101,2.093,2.086,
+            2.080,2.074,2.069,2.064,2.060,2.056,2.052,2.048,2.045,2.042]
+def t_quantile(df):
+    return tQuantiles[df-1] if df<=len(tQuantiles) else 1.96
+### end-function-adaptive, t_quantile
+################################################################
+
+
+################################################################
+### FUNCTION crn_seed, replicate_seed, replicate_rng ###########
+# Seed of the common random numbers (None: not used), seed of replicate i (for the COMETS layout, see cometsLayout.seed_layout) and its
+# random.Random (for dfbaEngine, None: a new random one).
+def crn_seed():
+    seed=os.environ.get('FLYCOP_CRN_SEED','')
+    return int(seed) if seed!='' else None
+
+def replicate_seed(i):
+    seed=crn_seed()
+    return None if seed is None else seed+i
+
+def replicate_rng(i):
+    seed=replicate_seed(i)
+    return None if seed is None else random.Random(seed)
+### end-function-crn_seed, replicate_seed, replicate_rng
+################################################################
+
+
+################################################################
+### FUNCTION sequential_stop ###################################
+def sequential_stop(incumbent=None,sdMax=0.1):
+    '''
+    Call: stopCondition = sequential_stop(incumbent,sdMax)
+
+    INPUTS: incumbent: best average fitness found so far in the FLYCOP run (None: unknown).
+            sdMax: sd over which *FLYCOP_oneConf discards a configuration (its fitness is 0).
+    OUTPUT: stopCondition: None if not in adaptive mode (FLYCOP_ADAPTIVE_REPEAT), or function of the results of the replicates run so far
+            (dictionaries with 'fitness'), returning True when no more replicates are needed, for run_replicates.
+    '''
+    if not(adaptive()):
+        return None
+    ciWidth=float(os.environ.get('FLYCOP_ADAPTIVE_CI','0.01'))
+    minRuns=max(2,int(os.environ.get('FLYCOP_ADAPTIVE_MIN','2')))
+    def stopCondition(results):
+        if(len(results)<minRuns):
+            return False
+        fitnessList=[result['fitness'] for result in results]
+        avgfitness=statistics.mean(fitnessList)
+        sdfitness=statistics.stdev(fitnessList)
+        halfWidth=t_quantile(len(results)-1)*sdfitness/math.sqrt(len(results))
+        if(sdfitness>sdMax):
+            print('Adaptive replicates: stop after '+str(len(results))+' runs, sd '+str(sdfitness)+' > '+str(sdMax))
+            return True
+        if(incumbent is not None and avgfitness+halfWidth<incumbent):
+            print('Adaptive replicates: stop after '+str(len(results))+' runs, fitness '+str(avgfitness)+'+-'+str(halfWidth)+' below the best one, '+str(incumbent))
+            return True
+        if(halfWidth<=ciWidth):
+            print('Adaptive replicates: stop after '+str(len(results))+' runs, fitness '+str(avgfitness)+'+-'+str(halfWidth))
+            return True
+        return False
+    return stopCondition
+### end-function-sequential_stop
+################################################################
+
+
+################################################################
+### FUNCTION abs_prefix ########################################
+# Absolute version of a path prefix (such as dirPlot, used as dirPlot+fileName), preserving the final '/'. '' is kept as ''.
+def abs_prefix(pathPrefix):
+    if(pathPrefix==''):
+        return ''
+    absPrefix=os.path.abspath(pathPrefix)
+    if pathPrefix.endswith('/'):
+        absPrefix=absPrefix+'/'
+    return absPrefix
+### end-function-abs_prefix
+################################################################
+
+
+################################################################
+### FUNCTION timed_replicate ###################################
+# Run one replicate, adding its wall time to its results (if it is a dictionary), or returning the reason of a failure of COMETS.
+def timed_replicate(replicateFunction,i,args):
+    startTime=time.time()
+    try:
+        result=replicateFunction(i,*args)
+    except cometsWatcher.CometsFailure as failure:
+        print('Replicate '+str(i)+' aborted, COMETS failure: '+failure.reason+' ('+failure.line+')')
+        result={'failure':failure.reason,'failureLine':failure.line,'run':i}
+    if isinstance(result,dict):
+        result['wallTime']=time.time()-startTime
+    return result
+### end-function-timed_replicate
+################################################################
+
+
+################################################################
+### FUNCTION failed_replicate ##################################
+# First result of a replicate aborted by a failure of COMETS ({'failure': reason, 'failureLine': line, 'run': i, 'wallTime': seconds}), or None.
+def failed_replicate(results):
+    for result in results:
+        if(isinstance(result,dict) and 'failure' in result):
+            return result
+    return None
+### end-function-failed_replicate
+################################################################
+
+
+################################################################
+### FUNCTION run_in_dir ########################################
+# Run one replicate inside its sub-directory (in a worker process).
+def run_in_dir(replicateDir,replicateFunction,i,args):
+    os.chdir(replicateDir)
+    return timed_replicate(replicateFunction,i,args)
+### end-function-run_in_dir
+################################################################
+
+
+################################################################
+### FUNCTION run_batch #########################################
+# Run the replicates of indices in a pool of nProcs processes, each one in its own sub-directory (see run_replicates).
+def run_batch(replicateFunction,indices,args,nProcs,linkFiles,copyFiles):
+    workDir=os.getcwd()
+    if not(os.path.exists('IndividualRunsResults')):
+        os.makedirs('IndividualRunsResults')
+    replicateDirs=[]
+    for i in indices:
+        replicateDir=os.path.join(workDir,'replicate_'+str(i))
+        if os.path.exists(replicateDir):
+            shutil.rmtree(replicateDir)
+        os.makedirs(os.path.join(replicateDir,'IndividualRunsResults'))
+        for fileName in linkFiles:
+            os.symlink(os.path.join(workDir,fileName),os.path.join(replicateDir,fileName))
+        for fileName in copyFiles:
+            shutil.copy2(os.path.join(workDir,fileName),os.path.join(replicateDir,fileName))
+        replicateDirs.append(replicateDir)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(nProcs,len(indices))) as executor:
+        futures=[executor.submit(run_in_dir,replicateDir,replicateFunction,i,args) for i,replicateDir in zip(indices,replicateDirs)]
+        results=[future.result() for future in futures]
+    # Gather individual run results and remove sub-directories
+    for replicateDir in replicateDirs:
+        resultsDir=os.path.join(replicateDir,'IndividualRunsResults')
+        for fileName in os.listdir(resultsDir):
+            shutil.move(os.path.join(resultsDir,fileName),os.path.join(workDir,'IndividualRunsResults',fileName))
+        shutil.rmtree(replicateDir)
+    return results
+### end-function-run_batch
+################################################################
+
+
+################################################################
+### FUNCTION run_replicates ####################################
+def run_replicates(replicateFunction,repeat,args=(),nProcs=1,linkFiles=[],copyFiles=[],stopCondition=None):
+    '''
+    Call: results = run_replicates(replicateFunction,repeat,args,nProcs,linkFiles,copyFiles,stopCondition)
+
+    INPUTS: replicateFunction: module-level function replicateFunction(i,*args), running replicate i in the current directory and
+                               returning its results (None if the whole configuration must be discarded).
+            repeat: number of replicates (maximum number, with stopCondition).
+            args: other arguments of replicateFunction. Paths in them must be absolute if nProcs>1.
+            nProcs: number of processes. 1: serially, in the current directory.
+            linkFiles: files in the current directory only read by the replicates (e.g. models .cmt, comets_scr), symlinked in each sub-directory.
+            copyFiles: files in the current directory that replicates could change (e.g. layout), copied in each sub-directory.
+            stopCondition: function of the results so far, True to stop running replicates (adaptive mode, see sequential_stop). It is checked
+                           after each replicate, serially, or after each round of nProcs replicates. None: all 'repeat' replicates are run.
+    OUTPUT: results: list of replicateFunction results, in replicate order. Serially, it finishes in the first None result or failure
+            (see failed_replicate).
+    '''
+    if(nProcs<=1 or repeat<=1):
+        results=[]
+        for i in range(repeat):
+            results.append(timed_replicate(replicateFunction,i,args))
+            if(results[-1] is None or failed_replicate(results[-1:]) is not None):
+                break
+            if(stopCondition is not None and stopCondition(results)):
+                break
+        return results
+    roundSize=repeat if stopCondition is None else nProcs
+    results=[]
+    for start in range(0,repeat,roundSize):
+        results.extend(run_batch(replicateFunction,list(range(start,min(repeat,start+roundSize))),args,nProcs,linkFiles,copyFiles))
+        if None in results or failed_replicate(results) is not None or (stopCondition is not None and stopCondition(results)):
+            break
+    return results
+### end-function-run_replicates
+################################################################
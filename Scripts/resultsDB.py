@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Database of the results of a FLYCOP run, used by the consortia pipelines (*FLYCOP_oneConf) instead of appending a header and a result line
+# to configurationsResults<fitFunc>.txt for every configuration. It is a SQLite file in the PlotsScenario directory (dirPlot/results.sqlite),
+# written in a single transaction per configuration, so concurrent evaluations (FLYCOPdriver.py workers) can insert at the same time, with:
+#  - configurations: one row per evaluated configuration: consortium, fitness function, parameters, fitness and sd, the rest of the columns
+#    of the configurationsResults table (biomass, yield, endCycle, GRs, PHA... depending on the consortium), wall time and artifacts.
+#  - replicates: one row per run of each configuration: fitness, measures returned by the replicate, wall time and plot file (in dirPlot).
+#  - failures: one row per configuration discarded by a failure of COMETS: reason (see cometsWatcher.failurePatterns), run, line of the
+#    output of COMETS and wall time.
+# The configurationsResults table is exported from it (export_tsv), in the same format, sorted by fitness (as FLYCOPanalyzingResults_*.sh).
+# Example: >>import resultsDB
+#          >>resultsDB.write_results('../smac-output/ecoliLongTerm_PlotsScenario1/','ecoliLongTerm','Yield','-10.0,-16.0,-11.0,-12.0,-6.0,-16.0,0.0,0.0',
+#                                    {'glu1':-10.0,'ac1':-16.0,'o21':-11.0,'glu2':-12.0,'ac2':-6.0,'o22':-16.0},[('fitness',0.8),('sd',0.01),('endCycle',120)],results)
+#
+# Call from command line (e.g. in the data analysis directory, with the PlotsScenario directory of a FLYCOP run):
+#   python3 ../Scripts/resultsDB.py export <dirPlot> <outputFile> [<fitnessFunction>]   # configurationsResults table, sorted by fitness
+#   python3 ../Scripts/resultsDB.py failures <dirPlot>   # configurations discarded by failures of COMETS, and number per reason
+#
+# Environment variables:
+#  FLYCOP_RESULTS_DB: 0 to append the results to configurationsResults<fitFunc>.txt (and failures to configurationsFailures<fitFunc>.txt)
+#                     files, as text, instead of the database (default: 1).
+
+import os
+import os.path
+import sys
+import json
+import time
+import sqlite3
+
+dbName='results.sqlite'
+schema=['CREATE TABLE IF NOT EXISTS configurations (id INTEGER PRIMARY KEY AUTOINCREMENT, consortium TEXT, fitFunc TEXT, configuration TEXT, parameters TEXT,'
+        ' fitness REAL, sd REAL, columns TEXT, wallTime REAL, finished REAL, artifacts TEXT)',
+        'CREATE INDEX IF NOT EXISTS configurationsFitness ON configurations (fitFunc, fitness)',
+        'CREATE INDEX IF NOT EXISTS configurationsConfiguration ON configurations (consortium, configuration)',
+        'CREATE TABLE IF NOT EXISTS replicates (configurationId INTEGER REFERENCES configurations(id), run INTEGER, fitness REAL, measures TEXT,'
+        ' wallTime REAL, plot TEXT, PRIMARY KEY (configurationId, run))',
+        'CREATE TABLE IF NOT EXISTS failures (id INTEGER PRIMARY KEY AUTOINCREMENT, consortium TEXT, fitFunc TEXT, configuration TEXT, parameters TEXT,'
+        ' run INTEGER, reason TEXT, line TEXT, wallTime REAL, finished REAL)']
+
+
+################################################################
+### FUNCTION enabled, db_file ##################################
+def enabled():
+    return os.environ.get('FLYCOP_RESULTS_DB','1')!='0'
+
+def db_file(dirPlot):
+    return os.path.join(dirPlot,dbName)
+### end-function-enabled, db_file
+################################################################
+
+
+################################################################
+### FUNCTION connect ###########################################
+# Connection to the database of dirPlot, created if needed. Writers wait for each other (up to 5 min) instead of failing.
+def connect(dirPlot):
+    if(dirPlot!='' and not os.path.exists(dirPlot)):
+        os.makedirs(dirPlot,exist_ok=True)
+    connection=sqlite3.connect(db_file(dirPlot),timeout=300,isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL') # readers (e.g. exports) do not block writers
+    for statement in schema:
+        connection.execute(statement)
+    return connection
+### end-function-connect
+################################################################
+
+
+################################################################
+### FUNCTION result_lines ######################################
+# Header and line of a configuration in the configurationsResults table: columns is a list of (name, value), after the configuration.
+def result_lines(fitFunc,configuration,columns):
+    header='Fitness_function\tconfiguration\t'+'\t'.join([name for name,value in columns])
+    line=fitFunc+'\t'+configuration+'\t'+'\t'.join([str(value) for name,value in columns])
+    return header,line
+### end-function-result_lines
+################################################################
+
+
+################################################################
+### FUNCTION write_results #####################################
+def write_results(dirPlot,consortium,fitFunc,configuration,parameters,columns,replicates=[],wallTime=None,artifacts={}):
+    '''
+    Call: write_results(dirPlot,consortium,fitFunc,configuration,parameters,columns,replicates,wallTime,artifacts)
+
+    INPUTS: dirPlot: PlotsScenario directory of the FLYCOP run.
+            consortium: consortium prefix (e.g. 'ecoliLongTerm').
+            fitFunc: fitness function.
+            configuration: text of the configuration column of the configurationsResults table (e.g. parameter values separated by ',').
+            parameters: {name: value} of the configuration.
+            columns: list of (name, value) of the configurationsResults table after the configuration, as written in the table (e.g. rounded),
+                     starting with 'fitness' and 'sd'.
+            replicates: list of results of each run (as returned by *FLYCOP_replicate, dictionaries with 'fitness', and optionally 'wallTime'
+                        and 'plot', see replicateRunner).
+            wallTime: seconds to evaluate the configuration.
+            artifacts: {name: path} of other files of the configuration (e.g. its trajectories archive).
+    OUTPUT: the header and line of the configuration are printed, and stored in the database of dirPlot (or appended to
+            configurationsResults<fitFunc>.txt, with FLYCOP_RESULTS_DB=0).
+    '''
+    header,line=result_lines(fitFunc,configuration,columns)
+    print(header)
+    print(line)
+    if not(enabled()):
+        with open(dirPlot+'configurationsResults'+fitFunc+'.txt', 'a') as myfile:
+            myfile.write(header+'\n')
+            myfile.write(line+'\n')
+        return
+    values=dict(columns)
+    connection=connect(dirPlot)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        cursor=connection.execute('INSERT INTO configurations (consortium,fitFunc,configuration,parameters,fitness,sd,columns,wallTime,finished,artifacts) VALUES (?,?,?,?,?,?,?,?,?,?)',
+                                  (consortium,fitFunc,configuration,json.dumps(parameters),float(values['fitness']),float(values['sd']),
+                                   json.dumps([[name,str(value)] for name,value in columns]),wallTime,time.time(),json.dumps(artifacts)))
+        configurationId=cursor.lastrowid
+        for i,result in enumerate(replicates):
+            measures={name:value for name,value in result.items() if name not in ['fitness','wallTime','plot']}
+            connection.execute('INSERT INTO replicates (configurationId,run,fitness,measures,wallTime,plot) VALUES (?,?,?,?,?,?)',
+                               (configurationId,i,float(result['fitness']),json.dumps(measures,default=float),result.get('wallTime'),result.get('plot')))
+        connection.execute('COMMIT')
+    except:
+        connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.close()
+### end-function-write_results
+################################################################
+
+
+################################################################
+### FUNCTION write_failure #####################################
+# Store a configuration discarded by a failure of COMETS in a replicate (failure, see replicateRunner.failed_replicate), with the
+# arguments of write_results, in the database of dirPlot (or appended to configurationsFailures<fitFunc>.txt, with FLYCOP_RESULTS_DB=0).
+def write_failure(dirPlot,consortium,fitFunc,configuration,parameters,failure,wallTime=None):
+    print('Configuration '+configuration+' discarded, COMETS failure in run '+str(failure['run'])+': '+failure['failure'])
+    if not(enabled()):
+        with open(dirPlot+'configurationsFailures'+fitFunc+'.txt', 'a') as myfile:
+            myfile.write('\t'.join([fitFunc,configuration,str(failure['run']),failure['failure'],failure['failureLine']])+'\n')
+        return
+    connection=connect(dirPlot)
+    try:
+        connection.execute('INSERT INTO failures (consortium,fitFunc,configuration,parameters,run,reason,line,wallTime,finished) VALUES (?,?,?,?,?,?,?,?,?)',
+                           (consortium,fitFunc,configuration,json.dumps(parameters),failure['run'],failure['failure'],failure['failureLine'],wallTime,time.time()))
+    finally:
+        connection.close()
+### end-function-write_failure
+################################################################
+
+
+################################################################
+### FUNCTION clear_results #####################################
+# Remove the results of a fitness function in dirPlot (e.g. before re-scoring its configurations), in the database and as text.
+def clear_results(dirPlot,fitFunc):
+    if os.path.exists(db_file(dirPlot)):
+        connection=connect(dirPlot)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM replicates WHERE configurationId IN (SELECT id FROM configurations WHERE fitFunc=?)',(fitFunc,))
+            connection.execute('DELETE FROM configurations WHERE fitFunc=?',(fitFunc,))
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+    if(os.path.exists(dirPlot+'configurationsResults'+fitFunc+'.txt')):
+        os.remove(dirPlot+'configurationsResults'+fitFunc+'.txt')
+### end-function-clear_results
+################################################################
+
+
+################################################################
+### FUNCTION incumbent #########################################
+# Best average fitness of fitFunc among the configurations stored in dirPlot with sd up to sdMax (those not discarded), or None.
+def incumbent(dirPlot,fitFunc,sdMax=0.1):
+    if not(enabled() and os.path.exists(db_file(dirPlot))):
+        return None
+    connection=connect(dirPlot)
+    try:
+        return connection.execute('SELECT MAX(fitness) FROM configurations WHERE fitFunc=? AND sd<=?',(fitFunc,sdMax)).fetchone()[0]
+    finally:
+        connection.close()
+### end-function-incumbent
+################################################################
+
+
+################################################################
+### FUNCTION incumbent_runtime #################################
+# Wall time of the configuration with the best average fitness of fitFunc stored in dirPlot (as incumbent), or None (e.g. for adaptive capping).
+def incumbent_runtime(dirPlot,fitFunc,sdMax=0.1):
+    if not(enabled() and os.path.exists(db_file(dirPlot))):
+        return None
+    connection=connect(dirPlot)
+    try:
+        row=connection.execute('SELECT wallTime FROM configurations WHERE fitFunc=? AND sd<=? AND wallTime IS NOT NULL ORDER BY fitness DESC, id LIMIT 1',
+                               (fitFunc,sdMax)).fetchone()
+    finally:
+        connection.close()
+    return None if row is None else row[0]
+### end-function-incumbent_runtime
+################################################################
+
+
+################################################################
+### FUNCTION replicates_fitness ################################
+# Fitness of the runs of each configuration stored in dirPlot, in the order they were stored: list of (configuration, [fitness per run]).
+def replicates_fitness(dirPlot):
+    connection=connect(dirPlot)
+    try:
+        rows=connection.execute('SELECT configurations.id,configurations.configuration,replicates.fitness FROM configurations JOIN replicates'
+                                ' ON replicates.configurationId=configurations.id ORDER BY configurations.id,replicates.run').fetchall()
+    finally:
+        connection.close()
+    configurations=[]
+    lastId=None
+    for configurationId,configuration,fitness in rows:
+        if(configurationId!=lastId):
+            configurations.append((configuration,[]))
+            lastId=configurationId
+        configurations[-1][1].append(fitness)
+    return configurations
+### end-function-replicates_fitness
+################################################################
+
+
+################################################################
+### FUNCTION failures ##########################################
+# Configurations discarded by failures of COMETS stored in dirPlot, in the order they were stored: list of (fitFunc, configuration, run, reason, line).
+def failures(dirPlot):
+    connection=connect(dirPlot)
+    try:
+        return connection.execute('SELECT fitFunc,configuration,run,reason,line FROM failures ORDER BY id').fetchall()
+    finally:
+        connection.close()
+### end-function-failures
+################################################################
+
+
+################################################################
+### FUNCTION export_tsv ########################################
+def export_tsv(dirPlot,outputFile,fitFunc=None):
+    '''
+    Call: nConfigurations = export_tsv(dirPlot,outputFile,fitFunc)
+
+    INPUTS: dirPlot: PlotsScenario directory of the FLYCOP run, with its results database.
+            outputFile: configurationsResults table written (format of configurationsResults<fitFunc>.txt, with a single header line).
+            fitFunc: fitness function whose results are exported (None: all of them).
+    OUTPUT: nConfigurations: number of configurations written, unique and sorted by decreasing fitness.
+    '''
+    connection=connect(dirPlot)
+    try:
+        query='SELECT fitFunc,configuration,columns FROM configurations'+('' if fitFunc is None else ' WHERE fitFunc=?')+' ORDER BY fitness DESC, id'
+        rows=connection.execute(query,() if fitFunc is None else (fitFunc,)).fetchall()
+    finally:
+        connection.close()
+    lines=[]
+    written=set()
+    for rowFitFunc,configuration,columns in rows:
+        header,line=result_lines(rowFitFunc,configuration,json.loads(columns))
+        if(len(lines)==0):
+            lines.append(header)
+        if line not in written:
+            written.add(line)
+            lines.append(line)
+    with open(outputFile,'w') as f:
+        f.write(''.join(line+'\n' for line in lines))
+    return max(0,len(lines)-1)
+### end-function-export_tsv
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv) in [4,5] and sys.argv[1]=='export'):
+        nConfigurations=export_tsv(os.path.join(sys.argv[2],''),sys.argv[3],sys.argv[4] if len(sys.argv)==5 else None)
+        print(str(nConfigurations)+' configurations exported to '+sys.argv[3])
+    elif(len(sys.argv)==3 and sys.argv[1]=='failures'):
+        rows=failures(os.path.join(sys.argv[2],''))
+        print('Fitness_function\tconfiguration\trun\treason\tline')
+        for row in rows:
+            print('\t'.join([str(value) for value in row]))
+        reasons=sorted(set(row[3] for row in rows))
+        print('# '+str(len(rows))+' configurations discarded'+''.join([', '+reason+': '+str(sum(1 for row in rows if row[3]==reason)) for reason in reasons]))
+    else:
+        print('Usage: resultsDB.py export <dirPlot> <outputFile> [<fitnessFunction>]')
+        print('       resultsDB.py failures <dirPlot>')
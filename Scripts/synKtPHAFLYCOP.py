@@ -9,22 +9,32 @@
 import cobra
 import pandas as pd
 import tabulate
-import re
 import sys
 import getopt
 import os.path
 import copy
-import csv
 import math
 import cobra.flux_analysis.variability
-import massedit
 import subprocess
 import shutil, errno
 import statistics
+import time
+import numpy as np
 import gurobipy
 import optlang
 from cobra import Reaction
 from cobra import Metabolite
+from cometsModelIO import mat_to_comets
+import cometsModelCache
+import cometsLayout
+import cometsLogIO
+import cometsWatcher
+import dfbaEngine
+import replicateRunner
+import resultsDB
+import trajectoryStore
+
+scriptsDir=os.path.dirname(os.path.abspath(__file__))
 
 
 ################################################################
@@ -187,64 +197,249 @@ def initialize_models():
 ################################################################    
 
 
-################################################################    
-### FUNCTION mat_to_comets #####################################    
-# mat_to_comets(modelPath)
-def mat_to_comets(matInputFile):
-    model=cobra.io.load_matlab_model(matInputFile)
-    # Open output file:
-    with open(matInputFile+'.cmt', mode='w') as f:
-        # Print the S matrix
-        f.write("SMATRIX  "+str(len(model.metabolites))+"  "+str(len(model.reactions))+"\n")
-        for x in range(len(model.metabolites)):
-            for y in range(len(model.reactions)):
-                if (model.metabolites[x] in model.reactions[y].metabolites):
-                    coeff=model.reactions[y].get_coefficient(model.metabolites[x])
-                    f.write("    "+str(x+1)+"   "+str(y+1)+"   "+str(coeff)+"\n")
-        f.write("//\n")
-        
-        # Print the bounds
-        f.write("BOUNDS  -1000  1000\n");
-        for y in range(len(model.reactions)):
-            lb=model.reactions[y].lower_bound
-            up=model.reactions[y].upper_bound
-            f.write("    "+str(y+1)+"   "+str(lb)+"   "+str(up)+"\n")
-        f.write("//\n")
-        
-        # Print the objective reaction
-        f.write('OBJECTIVE\n')
-        for y in range(len(model.reactions)):
-            if (model.reactions[y] in model.objective):
-                indexObj=y+1
-        f.write("    "+str(indexObj)+"\n")
-        f.write("//\n")
-        
-        # Print metabolite names
-        f.write("METABOLITE_NAMES\n")
-        for x in range(len(model.metabolites)):
-            f.write("    "+model.metabolites[x].id+"\n")
-        f.write("//\n")
-
-        # Print reaction names
-        f.write("REACTION_NAMES\n")
-        for y in range(len(model.reactions)):
-            f.write("    "+model.reactions[y].id+"\n")
-        f.write("//\n")
-
-        # Print exchange reactions
-        f.write("EXCHANGE_REACTIONS\n")
-        for y in range(len(model.reactions)):
-            if (model.reactions[y].id.find('EX_')==0):
-                f.write(" "+str(y+1))
-        f.write("\n//\n")                
-### end-function-mat_to_comets    
+################################################################
+### FUNCTION build_synecho_model ###############################
+# S.elongatus model secreting sucrPer % of its carbon as sucrose. Saved as matOutputFile and exported to COMETS (matOutputFile.cmt)
+# If the code of build_*_model(), *_model() or initialize_models() change, strainRecipe must change too, to invalidate the cache of strain models (cometsModelCache).
+strainRecipe='synKtPHA_strain_v1'
+def build_synecho_model(sucrPer,matOutputFile):
+    model=synecho_model(sucrPer)
+    cobra.io.save_matlab_model(model,matOutputFile,'model')
+    del(model)
+    mat_to_comets(matOutputFile)
+
+# The same strain as COBRApy model (also for the in-process backend, dfbaEngine).
+def synecho_model(sucrPer):
+    if not(os.path.exists('ModelsInput/iSynecho_cscBandSPS_over.mat')):
+        initialize_models()
+    model=cobra.io.load_matlab_model('ModelsInput/iSynecho_cscBandSPS_over.mat')
+    # To un-limit the sucrose production, for the flux variability analysis
+    model.reactions.get_by_id('SUCRtex').bounds=(-1000,1000)
+    dictSucrValue=cobra.flux_analysis.variability.flux_variability_analysis(model,{'EX_sucr(e)'},fraction_of_optimum=1-(sucrPer/100))
+    sucrLimit=dictSucrValue['EX_sucr(e)']['maximum']
+    model.reactions.get_by_id('SUCRtex').bounds=(sucrLimit,1000)
+    model.reactions.get_by_id('EX_sucr(e)').bounds=(sucrLimit,sucrLimit)
+    return model
+### end-function-build_synecho_model
+################################################################
+
+
+################################################################
+### FUNCTION build_putida_model ################################
+# P.putida model, when KT is growing (phaPhase=False) or when NH4 is exhausted and it produces PHA (phaPhase=True).
+# Saved as matOutputFile and exported to COMETS (matOutputFile.cmt)
+def build_putida_model(phaPhase,matOutputFile):
+    model=putida_model(phaPhase)
+    cobra.io.save_matlab_model(model,matOutputFile,'model')
+    del(model)
+    mat_to_comets(matOutputFile)
+
+# The same strain as COBRApy model (also for the in-process backend, dfbaEngine).
+def putida_model(phaPhase):
+    if not(os.path.exists('ModelsInput/iJN1411_sucr_notNO3_PHA.mat')):
+        initialize_models()
+    # To put the same uptakes in transporters (*tex) that in Exchange reactions, due to COMETS limits with *tex rxn's rather than EX_ rxn's.
+    model=cobra.io.load_matlab_model('ModelsInput/iJN1411_sucr_notNO3_PHA.mat')
+    if(phaPhase):
+        model.reactions.get_by_id('EX_nh4(e)').bounds=(0,0)
+    model.reactions.get_by_id('EX_sucr(e)').bounds=(-3.1,0)
+    model.reactions.get_by_id('SUCRtex').bounds=(0,3.1)
+    if(phaPhase):
+        model.reactions.get_by_id('C80aPHAtex').bounds=(0,1000)
+        model.reactions.get_by_id('DM_C80aPHA').bounds=(0,0)
+        # PHA production proportional to sucrose intakes
+        coeff=float(1.83/3.1) # 0.59032258: 3.1 sucr generates 1.83 PHA in the single model in COBRA
+        model.reactions.get_by_id('SUCRtex').subtract_metabolites({model.metabolites.get_by_id('C80aPHA[c]'): coeff})
+        model.reactions.get_by_id('SUCRtex').subtract_metabolites({model.metabolites.get_by_id('C80aPHA[e]'): -coeff})
+    return model
+
+# Metabolites kept in world_media of the layout even with initial value 0: those secreted by any strain, and those in the fitness.
+def layout_keep_metabolites(sucrPer,mediaMets):
+    return cometsLayout.secreted_metabolites('ModelsInput/synKtPHA_secreted.txt',[lambda: synecho_model(sucrPer),lambda: putida_model(False),lambda: putida_model(True)],mediaMets)+['sucr[e]','nh4[e]','C80aPHA[e]','so4[e]','no3[e]','pi[e]','hco3[e]']
+### end-function-build_putida_model
+################################################################
+
+
+################################################################
+### FUNCTION log_needs #########################################
+# Logs needed by a fitness function (selective logging, see cometsLogIO): {'flux': reactions of the flux log per strain, None if it is not needed}.
+# No fitness function reads fluxes, so COMETS does not write the flux log.
+def log_needs(fitFunc):
+    return {'flux':None}
+
+# Write the flux log in COMETS runs (always with FLYCOP_SELECTIVE_LOGS=0, unless logs are consumed through named pipes, see cometsWatcher)
+def flux_log_needed(fitFunc):
+    return log_needs(fitFunc)['flux'] is not None or not(cometsLogIO.selective_logs() or cometsWatcher.fifo_logs())
+### end-function-log_needs
+################################################################
+
+
+################################################################
+### FUNCTION synKtPHAFLYCOP_replicate ##########################
+# One COMETS run (replicate i, with its two phases) of a configuration, in the current directory, already with the models and layout of the configuration.
+# Steps 5-7 of synKtPHAFLYCOP_oneConf. It is run by replicateRunner, serially or in parallel (dirPlot must be absolute in the latter case).
+# It returns None if NH4 is not exhausted in the first phase.
+# With dfbaSetup (models 1, 2 and 2_b, layout, initial biomasses and media), both phases are simulated in-process by dfbaEngine instead of COMETS (no logs).
+def synKtPHAFLYCOP_replicate(i,sucrPer,biomass1,biomass2,nh4,fitFunc,maxCycles,maxCycles2,dirPlot,maxBiomass,maxPha,dfbaSetup=None):
+    stopCondition=lambda cycle,concentrations: concentrations['nh4']<float(0.01)
+    if dfbaSetup is None:
+        # First phase stopped 2 cycles after NH4 is exhausted (endCycle below; cycle endCycle+1 is needed to stitch the logs), instead of running up to maxCycles.
+        logs={'media':'media_log_template1.txt','biomass':'total_biomass_log_template1.txt'}
+        if flux_log_needed(fitFunc):
+            logs['flux']='flux_log_template1.txt'
+        # Same random stream in replicate i of every configuration, with common random numbers (see replicateRunner; kept in the 2nd phase)
+        cometsLayout.seed_layout('synKtPHA_layout_template.txt',replicateRunner.replicate_seed(i))
+        if cometsWatcher.fifo_logs():
+            # Logs of both phases consumed through named pipes and kept in memory (nothing written to disk but an optional gzip copy)
+            lastCycle1,logs1=cometsWatcher.run_comets_fifo('comets_script_template','output1.txt',logs,stopCondition,extraCycles=2,archive=cometsWatcher.archive_files(logs,'run'+str(i)+'_1'))
+        else:
+            cometsWatcher.run_comets('comets_script_template','output1.txt',logs,stopCondition,extraCycles=2)
+            logs1=logs
+        cometsLayout.check_seed('output1.txt',replicateRunner.replicate_seed(i))
+        totalBiomass1=cometsLogIO.read_total_biomass_log(logs1['biomass'])
+        media1=cometsLogIO.read_media_log(logs1['media'])
+    else:
+        # Strain models run per cycle always in the same order: 1)Synecho 2)KT (see synKtPHAFLYCOP_oneConf)
+        trajectories1=dfbaEngine.run_dfba(dfbaSetup['models'][0:2],dfbaSetup['layout'],dfbaSetup['initialPop'],dfbaSetup['media'],stopCondition=stopCondition,extraCycles=2,randomOrder=False)
+        totalBiomass1=trajectories1['biomass']
+        media1=trajectories1['media']
+
+    # 6.- Biomass and media per cycle in the first phase, read in a single pass over the logs (or simulated): [cycle, biomass1, biomass2, sucr, nh4, C80aPHA]
+    table1=cometsLogIO.biomass_vs_media(totalBiomass1,media1,['sucr','nh4','C80aPHA'])
+    cometsLogIO.write_table('biomass_vs_sucr_nh4_C80aPHA_template1.txt',table1)
+    # [R call] Run script to generate one graph:
+    title=str(sucrPer)+'-'+str(biomass1)+'-'+str(biomass2)+'-'+str(nh4)
+    print(title)
+    subprocess.call([scriptsDir+"/plot_biomassX2_vs_3mediaItem.sh 'template1' 'sucr' 'nh4' 'C80aPHA' '"+str(50)+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
+
+    # 7.1.- Determine endCycle: when nh4 is exhausted
+    iniBiomass=float(table1[0,1]+table1[0,2])
+    nh4Rows=np.flatnonzero(table1[:,4]<float(0.01))
+    endCycle=int(table1[nh4Rows[0],0]) if nh4Rows.size>0 else 0
+    if(endCycle==0):
+        endCycle=int(table1[-1,0])
+        return None # If after 72h the NH4 is not exhausted, PHA will not be generated!! (the configuration gets fitness 0)
+    finalBiomassV=table1[endCycle]
+    biomass1New=float(finalBiomassV[1])
+    biomass2New=float(finalBiomassV[2])
+    if dfbaSetup is None:
+        # Get metabolite value in endCycle (at the end of first phase) in a python dictionary (one seek in the media log, indexed by cycle)
+        metDict=cometsLogIO.media_composition(logs1['media'],media1,endCycle)
+        # Write new layout: model 2_b, biomass and media in endCycle, and logs of the 2nd phase (metabolites of the 1st layout are kept, even with value 0)
+        spec=cometsLayout.read_layout_spec('synKtPHA_layout_template.txt')
+        cometsLayout.write_layout(spec,'synKtPHA_layout_template2.txt',list(spec['media']),models=['strain_1_tmp.mat.cmt','strain_2_b_tmp.mat.cmt'],
+                                  initialPop=[biomass1New,biomass2New],media={met+'[e]':value for met,value in metDict.items()},
+                                  parameters={'maxCycles':maxCycles2,'totalbiomasslogname':'total_biomass_log_template2.txt','medialogname':'media_log_template2.txt',
+                                              'fluxlogname':'flux_log_template2.txt'})
+        # Rename files to avoid to change COMETS files                
+        shutil.move('synKtPHA_layout_template.txt','synKtPHA_layout_template1.txt')
+        shutil.move('synKtPHA_layout_template2.txt','synKtPHA_layout_template.txt') 
+        # 2nd COMETS run
+        if cometsWatcher.fifo_logs():
+            logs={'media':'media_log_template2.txt','biomass':'total_biomass_log_template2.txt'}
+            lastCycle2,logs2=cometsWatcher.run_comets_fifo('comets_script_template','output2.txt',logs,archive=cometsWatcher.archive_files(logs,'run'+str(i)+'_2'))
+            # Biomass and media of the second phase for its plot (extracted from the logs by the plot script otherwise)
+            cometsLogIO.write_table('biomass_vs_sucr_nh4_C80aPHA_template2.txt',cometsLogIO.biomass_vs_media(cometsLogIO.read_total_biomass_log(logs2['biomass']),
+                                                                                                          cometsLogIO.read_media_log(logs2['media']),['sucr','nh4','C80aPHA']))
+        else:
+            cometsWatcher.run_comets('comets_script_template','output2.txt',{})
+    else:
+        # 2nd phase from the biomass and media composition in endCycle, with model 2_b
+        composition={name:float(media1['media'][endCycle,x]) for x,name in enumerate(media1['names'])}
+        trajectories2=dfbaEngine.run_dfba([dfbaSetup['models'][0],dfbaSetup['models'][2]],dfbaSetup['layout'],[biomass1New,biomass2New],composition,maxCycles=maxCycles2,randomOrder=False)
+        cometsLogIO.write_table('biomass_vs_sucr_nh4_C80aPHA_template2.txt',cometsLogIO.biomass_vs_media(trajectories2['biomass'],trajectories2['media'],['sucr','nh4','C80aPHA']))
+    # [R call] Run script to generate one graph:
+    title=str(sucrPer)+'-'+str(biomass1New)+'-'+str(biomass2New)+'-'+str(nh4)
+    print(title)
+    subprocess.call([scriptsDir+"/plot_biomassX2_vs_3mediaItem.sh 'template2' 'sucr' 'nh4' 'C80aPHA' '"+str(maxCycles2/10)+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
+
+    if dfbaSetup is None:
+        # Generate combined files (biomass, flux, media) with output COMETS 1 and 2, renumbering the cycles of the second one (one pass over each log):
+        if cometsWatcher.fifo_logs():
+            logs={logKind:list(lines) for logKind,lines in cometsLogIO.stitch_log_lines(logs1,logs2,endCycle,maxCycles2).items()}
+        else:
+            cometsLogIO.stitch_logs('template1','template2','template',endCycle,maxCycles2)
+            logs={'media':'media_log_template.txt','biomass':'total_biomass_log_template.txt'}
+        biomass=cometsLogIO.read_total_biomass_log(logs['biomass'])
+        media=cometsLogIO.read_media_log(logs['media'])
+    else:
+        trajectories=dfbaEngine.concat_trajectories(trajectories1,trajectories2,endCycle)
+        biomass=trajectories['biomass']
+        media=trajectories['media']
+
+    # Biomass and media per cycle in the combined logs (or trajectories): [cycle, biomass1, biomass2, metabolite1, ...]
+    table=cometsLogIO.biomass_vs_media(biomass,media,['so4','no3','pi','hco3'])
+    cometsLogIO.write_table('biomass_vs_so4_no3_pi_hco3_template.txt',table)
+    tableProducts=cometsLogIO.biomass_vs_media(biomass,media,['sucr','nh4','C80aPHA'])
+    cometsLogIO.write_table('biomass_vs_sucr_nh4_C80aPHA_template.txt',tableProducts)
+    # Plot combined
+    title=str(sucrPer)+'-'+str(biomass1)+'-'+str(biomass2)+'-'+str(nh4)
+    print(title)
+    subprocess.call([scriptsDir+"/plot_biomassX2_vs_4mediaItem.sh 'template' 'so4' 'no3' 'pi' 'hco3' '"+str(100)+"' '"+str(title)+"' 'blue' 'cyan' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
+    
+    # 7.- Compute fitness (measure to optimize):
+    # 7.1.- Determine endCycle: maxCycle
+    maxCycle=biomass.shape[0]-1
+    iniBiomass=float(table[0,1]+table[0,2])
+    if(maxCycles>-1):
+        endCycle=maxCycles2
+    else: # compute end when no3, so4 or pi is exhausted
+        exhaustedRows=np.flatnonzero((table[:,3]<float(0.0001))|(table[:,4]<float(0.0001))|(table[:,5]<float(0.0001)))
+        endCycle=int(table[exhaustedRows[0],0]) if exhaustedRows.size>0 else 0
+        if(endCycle==0):
+            endCycle=maxCycles2
+    finalBiomassV=table[endCycle]
+
+    # To measure products
+    subprocess.call([scriptsDir+"/plot_biomassX2_vs_3mediaItem.sh 'template' 'sucr' 'nh4' 'C80aPHA' '"+str(float(endCycle/10))+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
+    finalLineV=tableProducts[endCycle]
+    totSucr=float(finalLineV[3])
+    totPha=float(finalLineV[5])
+    print(str(totPha)+" PHA in cycle "+str(endCycle))
+    finalBiomass=float(finalBiomassV[1])+float(finalBiomassV[2])
+    
+    # 7.2.- Compute fitness: maximize PHA
+    fitTime=1-(float(endCycle)/float(maxCycle))
+    fitBiomass=float((finalBiomass-iniBiomass)/maxBiomass)
+    fitPHA=float(totPha/maxPha)
+    
+    if(fitFunc=='MaxPHA'):
+        fitness=fitPHA
+    elif(fitFunc=='PHA_Biomass'):
+        fitness=float(0.5*fitPHA+0.5*fitBiomass)
+
+    print(" Fitness: "+str(round(fitness,6))+" in cycle "+str(endCycle))
+
+    # Copy individual solution
+    file='IndividualRunsResults/'+'biomass_vs_sucr_nh4_C80aPHA_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
+    shutil.move('biomass_vs_sucr_nh4_C80aPHA_template_plot.pdf',file)        
+    plotFile=None
+    if(dirPlot != ''):
+        file2=dirPlot+'biomass_'+str(sucrPer)+'_'+str(biomass1)+'_'+str(biomass2)+'_'+str(nh4)+'_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
+        shutil.move(file,file2)
+        plotFile=os.path.basename(file2)
+    if(dfbaSetup is None and trajectoryStore.enabled()):
+        # Biomass and media in the binary trajectory store of the configuration, instead of the text logs (the flux log, only written
+        # with FLYCOP_SELECTIVE_LOGS=0, is kept as text: models of strain 2 are different in both phases)
+        trajectoryStore.save_run('IndividualRunsResults',i,biomass,media)
+        trajectoryStore.remove_logs(['total_biomass_log_template.txt','media_log_template.txt'])
+    elif(dfbaSetup is None and not cometsWatcher.fifo_logs()):
+        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
+        shutil.move('total_biomass_log_template.txt',file)
+        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
+        shutil.move('media_log_template.txt',file)
+    if(dfbaSetup is None and os.path.exists('flux_log_template.txt')):
+        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
+        shutil.move('flux_log_template.txt',file)
+    return {'fitness':fitness,'totPha':totPha,'totSucr':totSucr,'endCycle':endCycle,'plot':plotFile}
+### end-function-synKtPHAFLYCOP_replicate
 ################################################################
 
 
 ################################################################
 ### FUNCTION synKtPHAFLYCOP_oneConf ############################
 # maxCycles2=1000,500 or -1 meaning when so4, no3 or pi is exhausted.
-def synKtPHAFLYCOP_oneConf(sucrPer=30,biomassSynecho=3.5,biomassKT=0.1,nh4=18,fitFunc='MaxPHA',maxCycles=1000,dirPlot='',repeat=3):
+def synKtPHAFLYCOP_oneConf(sucrPer=30,biomassSynecho=3.5,biomassKT=0.1,nh4=18,fitFunc='MaxPHA',maxCycles=1000,dirPlot='',repeat=3,repeatProcs=None,backend=None):
   '''
   Call: avgFitness, sdFitness = cleaning_oneConf(sucrPer,biomassSynecho,biomassKT,nh4)
 
@@ -255,14 +450,15 @@ def synKtPHAFLYCOP_oneConf(sucrPer=30,biomassSynecho=3.5,biomassKT=0.1,nh4=18,fi
           fitFunc: fitness function to optimize.
           maxCycles: cycles in COMETS run.
           dirPlot: copy of the graphs with several run results.
-          repeat: number of runs with the same configuration.
+          repeat: number of runs with the same configuration (maximum number, in adaptive mode: see replicateRunner).
+          repeatProcs: number of runs executed in parallel (default: FLYCOP_REPLICATE_PROCS environment variable, or 1).
+          backend: 'comets' (COMETS runs) or 'dfba' (in-process dynamic FBA of the layout with the COBRApy models, see dfbaEngine; without .cmt files nor logs).
+                   Default: FLYCOP_BACKEND environment variable, or 'comets'.
   OUTPUT: avgFitness: average fitness of 'repeat' COMETS runs with the same configuration (due to it is not deterministic)
           sdFitness: standard deviation of fitness during 'repeat' COMETS runs (see above)
   '''
 
-  if not(os.path.exists('ModelsInput/iSynecho_cscBandSPS_over.mat')):
-      initialize_models()
-
+  startTime=time.time()
   # Determine initial biomasses.
   biomass1=biomassSynecho
   biomass2=biomassKT
@@ -279,51 +475,25 @@ def synKtPHAFLYCOP_oneConf(sucrPer=30,biomassSynecho=3.5,biomassKT=0.1,nh4=18,fi
 
   # Single GEMs parameter modifications
   # ===================================  
-  if not(os.path.exists('strain_1_tmp.mat.cmt')):
-    # 1.1.- [COBRApy] Establish modifications in model 1 
-    model=cobra.io.load_matlab_model('ModelsInput/iSynecho_cscBandSPS_over.mat')
-    # To un-limit the sucrose production, for the flux variability analysis
-    model.reactions.get_by_id('SUCRtex').bounds=(-1000,1000)
-    dictSucrValue=cobra.flux_analysis.variability.flux_variability_analysis(model,{'EX_sucr(e)'},fraction_of_optimum=1-(sucrPer/100))
-    sucrLimit=dictSucrValue['EX_sucr(e)']['maximum']
-    model.reactions.get_by_id('SUCRtex').bounds=(sucrLimit,1000)
-    model.reactions.get_by_id('EX_sucr(e)').bounds=(sucrLimit,sucrLimit)
-    cobra.io.save_matlab_model(model,'strain_1_tmp.mat','model')
-    del(model)
-
-    # 1.2.1.- [COBRApy] Establish modifications in model 2.1 (when KT is growing)
-    # To put the same uptakes in transporters (*tex) that in Exchange reactions, due to COMETS limits with *tex rxn's rather than EX_ rxn's.
-    model=cobra.io.load_matlab_model('ModelsInput/iJN1411_sucr_notNO3_PHA.mat')
-    model.reactions.get_by_id('EX_sucr(e)').bounds=(-3.1,0)
-    model.reactions.get_by_id('SUCRtex').bounds=(0,3.1)
-    cobra.io.save_matlab_model(model,'strain_2_tmp.mat','model')
-
-    # 1.2.2.- [COBRApy] Establish modifications in model 2.2 (when NH4 is exhausted and it produces PHA)
-    # To put the same uptakes in transporters (*tex) that in Exchange reactions, due to COMETS limits with *tex rxn's rather than EX_ rxn's.
-    model=cobra.io.load_matlab_model('ModelsInput/iJN1411_sucr_notNO3_PHA.mat')
-    model.reactions.get_by_id('EX_nh4(e)').bounds=(0,0)
-    model.reactions.get_by_id('EX_sucr(e)').bounds=(-3.1,0)
-    model.reactions.get_by_id('SUCRtex').bounds=(0,3.1)
-    model.reactions.get_by_id('C80aPHAtex').bounds=(0,1000) 
-    model.reactions.get_by_id('DM_C80aPHA').bounds=(0,0)
-    # PHA production proportional to sucrose intakes
-    coeff=float(1.83/3.1) # 0.59032258: 3.1 sucr generates 1.83 PHA in the single model in COBRA
-    model.reactions.get_by_id('SUCRtex').subtract_metabolites({model.metabolites.get_by_id('C80aPHA[c]'): coeff})
-    model.reactions.get_by_id('SUCRtex').subtract_metabolites({model.metabolites.get_by_id('C80aPHA[e]'): -coeff})
-    cobra.io.save_matlab_model(model,'strain_2_b_tmp.mat','model')
-    del(model)
-    
-    # 2.- [python] 
-    mat_to_comets('strain_1_tmp.mat')
-    mat_to_comets('strain_2_tmp.mat')
-    mat_to_comets('strain_2_b_tmp.mat')
+  dfbaSetup=None
+  if(dfbaEngine.backend(backend)=='dfba'):
+    # 1.- [COBRApy] Models 1, 2.1 and 2.2 kept in memory, with the initial biomasses and NH4, for dfbaEngine (steps 2 and 4 are not needed).
+    dfbaSetup={'models':[synecho_model(sucrPer),putida_model(False),putida_model(True)],'layout':dfbaEngine.read_layout('synKtPHA_layout_template.txt'),
+               'initialPop':[biomass1,biomass2],'media':{'nh4[e]':nh4}}
+  elif not(os.path.exists('strain_1_tmp.mat.cmt')):
+    # 1.- [COBRApy] Establish modifications in models 1, 2.1 and 2.2, and 2.- [python] export them to COMETS format.
+    # Through the cache of strain models: models 2.1 and 2.2 do not depend on the configuration, and model 1 only on sucrPer.
+    cometsModelCache.cached_cmt(['ModelsInput/iJB785.mat','ModelsInput/iJN1411.mat'],strainRecipe,{'strain':'synecho','sucrPer':sucrPer},'strain_1_tmp.mat.cmt',lambda: build_synecho_model(sucrPer,'strain_1_tmp.mat'))
+    cometsModelCache.cached_cmt(['ModelsInput/iJB785.mat','ModelsInput/iJN1411.mat'],strainRecipe,{'strain':'putida','phase':'growth'},'strain_2_tmp.mat.cmt',lambda: build_putida_model(False,'strain_2_tmp.mat'))
+    cometsModelCache.cached_cmt(['ModelsInput/iJB785.mat','ModelsInput/iJN1411.mat'],strainRecipe,{'strain':'putida','phase':'PHA'},'strain_2_b_tmp.mat.cmt',lambda: build_putida_model(True,'strain_2_b_tmp.mat'))
 
     # Community parameter modifications
     # =================================            
-    # 4.- [shell script] Write automatically the COMETS parameter about initial biomass of 3 strains, depending on proportions, and initial media concentrations.
-    massedit.edit_files(['synKtPHA_layout_template.txt'],["re.sub(r'XXX','"+str(biomass1)+"',line)"], dry_run=False)
-    massedit.edit_files(['synKtPHA_layout_template.txt'],["re.sub(r'YYY','"+str(biomass2)+"',line)"], dry_run=False)
-    massedit.edit_files(['synKtPHA_layout_template.txt'],["re.sub(r'XXNH4XX','"+str(nh4)+"',line)"], dry_run=False)
+    # 4.- [python] Write the COMETS layout with the initial biomass of 3 strains, depending on proportions, and initial media concentrations,
+    # in a single write (world_media without metabolites that are never in the media).
+    spec=cometsLayout.read_layout_spec('synKtPHA_layout_template.txt')
+    cometsLayout.write_layout(spec,'synKtPHA_layout_template.txt',layout_keep_metabolites(sucrPer,list(spec['media'])),initialPop=[biomass1,biomass2],media={'nh4[e]':nh4},
+                              parameters=None if flux_log_needed(fitFunc) else {'writefluxlog':'false'})
   # end-if building models
 
   # 5.- [COMETS by command line] Run COMETS
@@ -333,198 +503,41 @@ def synKtPHAFLYCOP_oneConf(sucrPer=30,biomassSynecho=3.5,biomassKT=0.1,nh4=18,fi
   sumPha=0
   sumSucr=0
   fitnessList=[]
-  # To repeat X times, due to random behaviour in COMETS. In this synKtPHA case, repeat could be 1, because we assume sucrose must be produced by Synecho before KT takes it, so we fix the strain models run per cycle to 1)Synecho 2)KT.
-  for i in range(repeat):
-        with open("output1.txt", "w") as f:
-            subprocess.call(['./comets_scr','comets_script_template'], stdout=f)
-
-        # 6.- [R call] Run script to generate one graph:
-        title=str(sucrPer)+'-'+str(biomass1)+'-'+str(biomass2)+'-'+str(nh4)
-        print(title)
-        subprocess.call(["../../Scripts/plot_biomassX2_vs_3mediaItem.sh 'template1' 'sucr' 'nh4' 'C80aPHA' '"+str(50)+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
-
-        # 7.1.- Determine endCycle: when nh4 is exhausted
-        with open("biomass_vs_sucr_nh4_C80aPHA_template1.txt", "r") as sources:        
-            lines = sources.readlines()
-            iniPointV=lines[0].split()
-            iniBiomass=float(iniPointV[1])+float(iniPointV[2])
-            endCycle=0
-            for line in lines:
-                #endCycle=int(line.split()[0])
-                nh4Conc=float(line.split()[4])
-                if(nh4Conc<float(0.01)):
-                    endCycle=int(line.split()[0])
-                    break;
-            if(endCycle==0):
-                endCycle=int(line.split()[0])
-                return 0,0; # If after 72h the NH4 is not exhausted, PHA will not be generated!!
-            finalBiomassV=lines[endCycle].split()
-        biomass1New=float(finalBiomassV[1])
-        biomass2New=float(finalBiomassV[2])
-        # Get metabolite value in endCycle (at the end of first phase) in a python dictionary
-        subprocess.call(["../../Scripts/get_media_composition_oneCycle.sh 'template1' '"+str(endCycle)+"'"],shell=True)
-        fileMedia="media_cycle_"+str(endCycle)+".txt"
-        metDict = {}
-        with open(fileMedia) as f:
-            reader = csv.reader(f,delimiter='\t')
-            metDict= {rows[0]:rows[1] for rows in reader}
-        # Read and write new layout
-        if os.path.exists('synKtPHA_layout_template2.txt'): # delete previous content
-            os.remove("synKtPHA_layout_template2.txt") 
-        with open("synKtPHA_layout_template.txt", "r") as layIn:
-            with open("synKtPHA_layout_template2.txt", "a") as layOut:
-                lines = layIn.readlines()
-                for line in lines:
-                    if 'model_file' in line:
-                        layOut.write("model_file\tstrain_1_tmp.mat.cmt\tstrain_2_b_tmp.mat.cmt\n")
-                    elif '[e]' in line:
-                        met=re.sub('\[e\]',r'',line.split()[0])
-                        layOut.write("\t\t\t"+met+"[e]\t"+metDict[met]+"\n")
-                    elif line.startswith('\t\t0\t0'):
-                        layOut.write("\t\t0\t0\t"+str(biomass1New)+"\t"+str(biomass2New)+"\n")
-                    elif 'maxCycles' in line:
-                        layOut.write("    maxCycles = "+str(maxCycles2)+"\n")
-                    elif 'totalbiomasslogname' in line:
-                        layOut.write("    totalbiomasslogname = total_biomass_log_template2.txt\n")
-                    elif 'medialogname' in line:
-                        layOut.write("    medialogname = media_log_template2.txt\n")
-                    elif 'fluxlogname' in line:
-                        layOut.write("    fluxlogname = flux_log_template2.txt\n")
-                    else: # if not line to change, directly copy them
-                        layOut.write(line)                    
-        # Rename files to avoid to change COMETS files                
-        shutil.move('synKtPHA_layout_template.txt','synKtPHA_layout_template1.txt')
-        shutil.move('synKtPHA_layout_template2.txt','synKtPHA_layout_template.txt') 
-        # 2nd COMETS run
-        with open("output2.txt", "w") as f:
-            subprocess.call(['./comets_scr','comets_script_template'], stdout=f)
-        # [R call] Run script to generate one graph:
-        title=str(sucrPer)+'-'+str(biomass1New)+'-'+str(biomass2New)+'-'+str(nh4)
-        print(title)
-        subprocess.call(["../../Scripts/plot_biomassX2_vs_3mediaItem.sh 'template2' 'sucr' 'nh4' 'C80aPHA' '"+str(maxCycles2/10)+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
-
-        # Generate combined files (biomass, flux, media) with output COMETS 1 and 2:
-        # A.-biomass
-        #   head 1-n template1.txt + template2.txt (without header or the first line wiht the same values)
-        subprocess.call(["head -n"+str(endCycle+1)+" total_biomass_log_template1.txt > total_biomass_log_template.txt"],shell=True)
-        subprocess.call(["tail -n"+str(maxCycles2)+" total_biomass_log_template2.txt > temp_biomass2.txt"],shell=True)
-        count=endCycle+1
-        with open("temp_biomass2.txt", "r") as fin:
-            with open("total_biomass_log_template.txt", "a") as fout:
-                lines = fin.readlines()
-                for line in lines:
-                    fout.write(str(count)+"\t"+str(line.split()[1])+"\t"+str(line.split()[2])+"\n")
-                    count=count+1
-        os.remove("temp_biomass2.txt")
-        # B.-media
-        #egrep media_n+1{1} --> no.line
-        #head 1-no.line template1.txt + template 2.txt, without header and replacing media_i by i=i+n
-        # First file fragment
-        cmd="grep -n 'media_"+str(endCycle+1)+"{1}' media_log_template1.txt | cut -d: -f1"
-        numLine1=int(subprocess.check_output(cmd,shell=True).decode('utf-8').strip())
-        subprocess.call(["head -n"+str(numLine1-1)+" media_log_template1.txt > media_log_template.txt"],shell=True)
-        # Second file fragment, replacing no.cycles consecutive to the last in first fragment
-        cmd="grep -n 'media_1{1}' media_log_template2.txt | cut -d: -f1"
-        numLine2=int(subprocess.check_output(cmd,shell=True).decode('utf-8').strip())
-        cmd="wc -l media_log_template2.txt | cut -d' ' -f1"
-        totLines2=int(subprocess.check_output(cmd,shell=True).decode('utf-8').strip())
-        subprocess.call(["tail -n"+str(totLines2-numLine2+1)+" media_log_template2.txt > temp_media2.txt"],shell=True)
-        for x in range(1,maxCycles2+1): # +1 because max in range(1,range) is no.iterations+1
-            subprocess.call(["egrep '^media_"+str(x)+"\{' temp_media2.txt | sed 's/media_"+str(x)+"{/media_"+str(x+endCycle)+"{/' >> media_log_template.txt"],shell=True)
-        os.remove("temp_media2.txt")
-        # C.-fluxes
-        # fluxes{cycle}{1}{1}{modelNumber}
-        # First file fragment
-        cmd="grep -n 'fluxes{"+str(endCycle+1)+"}{1}{1}{1}' flux_log_template1.txt | cut -d: -f1"
-        numLine1=int(subprocess.check_output(cmd,shell=True).decode('utf-8').strip())
-        subprocess.call(["head -n"+str(numLine1-1)+" flux_log_template1.txt > flux_log_template.txt"],shell=True)
-        # Second file fragment, replacing no.cycles consecutive to the last in first fragment
-        # Not to remove any cycle, because the first one is different, given the last biomass and media composition in first part. Here there isn't cycle=0.
-        for x in range(1,maxCycles2+1):
-            subprocess.call(["egrep '^fluxes\{"+str(x)+"\}' flux_log_template2.txt | sed 's/fluxes{"+str(x)+"}/fluxes{"+str(x+endCycle)+"}/' >> flux_log_template.txt"],shell=True)                    
-
-        # Plot combined
-        title=str(sucrPer)+'-'+str(biomass1)+'-'+str(biomass2)+'-'+str(nh4)
-        print(title)
-        subprocess.call(["../../Scripts/plot_biomassX2_vs_4mediaItem.sh 'template' 'so4' 'no3' 'pi' 'hco3' '"+str(100)+"' '"+str(title)+"' 'blue' 'cyan' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
-        
-        # 7.- Compute fitness (measure to optimize):
-        # 7.1.- Determine endCycle: maxCycle
-        cmd="wc -l total_biomass_log_template.txt | cut -d' ' -f1"
-        maxCycle=-1+int(subprocess.check_output(cmd,shell=True).decode('utf-8').strip())
-        with open("biomass_vs_so4_no3_pi_hco3_template.txt", "r") as sources:        
-            lines = sources.readlines()
-            iniPointV=lines[0].split()
-            iniBiomass=float(iniPointV[1])+float(iniPointV[2])
-            if(maxCycles>-1):
-                endCycle=maxCycles2
-            else: # compute end when no3, so4 or pi is exhausted
-                endCycle=0
-                for line in lines:
-                    so4Conc=float(line.split()[3])
-                    no3Conc=float(line.split()[4])
-                    piConc=float(line.split()[5])
-                    #hco3Conc=float(line.split()[6])
-                    if(so4Conc<float(0.0001) or no3Conc<float(0.0001) or piConc<float(0.0001)):
-                        #    #if(hco3Conc<float(0.0001)):
-                        endCycle=int(line.split()[0])
-                        break;
-                if(endCycle==0):
-                    endCycle=maxCycles2
-            finalBiomassV=lines[endCycle].split()
-
-        # To measure products
-        subprocess.call(["../../Scripts/plot_biomassX2_vs_3mediaItem.sh 'template' 'sucr' 'nh4' 'C80aPHA' '"+str(float(endCycle/10))+"' '"+str(title)+"' 'blue' 'black' 'darkmagenta' 'Synecho' 'KT'"],shell=True)
-        with open("biomass_vs_sucr_nh4_C80aPHA_template.txt", "r") as sources:        
-            lines = sources.readlines()
-        finalLineV=lines[endCycle].split()
-        totSucr=float(finalLineV[3])
-        totPha=float(finalLineV[5])
-        print(str(totPha)+" PHA in cycle "+str(endCycle))
-        finalBiomass=float(finalBiomassV[1])+float(finalBiomassV[2])
-        
-        # 7.2.- Compute fitness: maximize PHA
-        fitTime=1-(float(endCycle)/float(maxCycle))
-        fitBiomass=float((finalBiomass-iniBiomass)/maxBiomass)
-        fitPHA=float(totPha/maxPha)
-        
-        if(fitFunc=='MaxPHA'):
-            fitness=fitPHA
-        elif(fitFunc=='PHA_Biomass'):
-            fitness=float(0.5*fitPHA+0.5*fitBiomass)
-
-        print(" Fitness: "+str(round(fitness,6))+" in cycle "+str(endCycle))
-
-        totfitness=totfitness+fitness
-        fitnessList.append(fitness)
-        sumPha=sumPha+totPha
-        sumSucr=sumSucr+totSucr
-
-        # Copy individual solution
-        file='IndividualRunsResults/'+'biomass_vs_sucr_nh4_C80aPHA_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
-        shutil.move('biomass_vs_sucr_nh4_C80aPHA_template_plot.pdf',file)        
-        if(dirPlot != ''):
-            file2=dirPlot+'biomass_'+str(sucrPer)+'_'+str(biomass1)+'_'+str(biomass2)+'_'+str(nh4)+'_run'+str(i)+'_'+str(fitness)+'_'+str(endCycle)+'.pdf'
-            shutil.move(file,file2)
-        file='IndividualRunsResults/'+'total_biomass_log_run'+str(i)+'.txt'
-        shutil.move('total_biomass_log_template.txt',file)
-        file='IndividualRunsResults/'+'media_log_run'+str(i)+'.txt'
-        shutil.move('media_log_template.txt',file)
-        file='IndividualRunsResults/'+'flux_log_run'+str(i)+'.txt'
-        shutil.move('flux_log_template.txt',file)   
-
-  avgfitness=totfitness/repeat
-  if(repeat>1):
+  # To repeat X times, due to random behaviour in COMETS (in parallel if repeatProcs>1, see replicateRunner). In this synKtPHA case, repeat could be 1, because we assume sucrose must be produced by Synecho before KT takes it, so we fix the strain models run per cycle to 1)Synecho 2)KT. In adaptive mode, up to X times.
+  results=replicateRunner.run_replicates(synKtPHAFLYCOP_replicate,repeat,(sucrPer,biomass1,biomass2,nh4,fitFunc,maxCycles,maxCycles2,replicateRunner.abs_prefix(dirPlot),maxBiomass,maxPha,dfbaSetup),
+                                         replicateRunner.replicate_procs(repeatProcs),
+                                         linkFiles=['strain_1_tmp.mat.cmt','strain_2_tmp.mat.cmt','strain_2_b_tmp.mat.cmt','comets_scr'],
+                                         copyFiles=['comets_script_template','synKtPHA_layout_template.txt'],
+                                         stopCondition=replicateRunner.sequential_stop(resultsDB.incumbent(dirPlot,fitFunc)))
+  failure=replicateRunner.failed_replicate(results)
+  if failure is not None:
+      # COMETS failed in a run (see cometsWatcher.failurePatterns): the configuration gets fitness 0, and the reason is stored in the results
+      resultsDB.write_failure(dirPlot,'synKtPHA',fitFunc,str(sucrPer)+","+str(biomassSynecho)+","+str(biomassKT)+","+str(nh4),
+                              {'sucrPer':sucrPer,'biomassSynecho':biomassSynecho,'biomassKT':biomassKT,'nh4':nh4},failure,time.time()-startTime)
+      return 0,0
+  if trajectoryStore.enabled():
+      # Trajectories of all the runs in the binary store of the configuration
+      trajectoryStore.gather_runs('IndividualRunsResults')
+  if None in results:
+      return 0,0; # If after 72h the NH4 is not exhausted, PHA will not be generated!!
+  for result in results:
+      totfitness=totfitness+result['fitness']
+      fitnessList.append(result['fitness'])
+      sumPha=sumPha+result['totPha']
+      sumSucr=sumSucr+result['totSucr']
+  endCycle=results[-1]['endCycle'] # Value of the last run
+
+  avgfitness=totfitness/len(results)
+  if(len(results)>1):
       sdfitness=statistics.stdev(fitnessList)
   else:
       sdfitness=0.0
-  avgPha=sumPha/repeat
-  avgSucr=sumSucr/repeat
-  print("Fitness_function\tconfiguration\tfitness\tsd\tC80aPHA(mM)\tsucr(mM)\tendCycle")
-  print(fitFunc+"\t"+str(sucrPer)+","+str(biomassSynecho)+","+str(biomassKT)+","+str(nh4)+"\t"+str(round(avgfitness,6))+"\t"+str(sdfitness)+"\t"+str(round(avgPha,6))+"\t"+str(round(avgSucr,6))+"\t"+str(endCycle))
-  with open(dirPlot+"configurationsResults"+fitFunc+".txt", "a") as myfile:
-      myfile.write("Fitness_function\tconfiguration\tfitness\tsd\tC80aPHA(mM)\tsucr(mM)\tendCycle\n")
-      myfile.write(fitFunc+"\t"+str(sucrPer)+","+str(biomassSynecho)+","+str(biomassKT)+","+str(nh4)+"\t"+str(round(avgfitness,6))+"\t"+str(sdfitness)+"\t"+str(round(avgPha,6))+"\t"+str(round(avgSucr,6))+"\t"+str(endCycle)+"\n")
+  avgPha=sumPha/len(results)
+  avgSucr=sumSucr/len(results)
+  resultsDB.write_results(dirPlot,'synKtPHA',fitFunc,str(sucrPer)+","+str(biomassSynecho)+","+str(biomassKT)+","+str(nh4),
+                          {'sucrPer':sucrPer,'biomassSynecho':biomassSynecho,'biomassKT':biomassKT,'nh4':nh4},
+                          [('fitness',round(avgfitness,6)),('sd',sdfitness),('C80aPHA(mM)',round(avgPha,6)),('sucr(mM)',round(avgSucr,6)),('endCycle',endCycle)],
+                          results,time.time()-startTime)
   
   print("Avg.fitness(sd):\t"+str(avgfitness)+"\t("+str(sdfitness)+")\n")
   if(sdfitness>0.1):
@@ -22,12 +22,17 @@ import subprocess
 import shutil, errno
 import statistics
 import importlib
+import time
 
 # Load code of individual run
 sys.path.append('../Scripts')
 import synKtPHAFLYCOP
+import workspacePool
+import cometsWatcher
+import resultsDB
 
     
+startTime = time.time() # Wall time of this evaluation, limited by the SMAC cutoff
 # Parsing parameters:
 # Reading the first 5 arguments in SMAC
 instance = sys.argv[1]
@@ -42,31 +47,32 @@ biomassKT = float(sys.argv[11])
 nh4 = float(sys.argv[13])
 
 
-# Copy the template directory
-if (os.path.exists(dst)):
-    shutil.rmtree(dst)
-try:
-    shutil.copytree(src, dst)
-except OSError as exc: # python >2.5
-    if exc.errno == errno.ENOTDIR:
-        shutil.copy(src, dst)
-    else: raise
-    
-os.chdir(dst)
+# SMAC cutoff enforced on the simulations (see cometsWatcher), capped with the wall time of the best configuration so far (FLYCOP_ADAPTIVE_CAPPING=1)
+cometsWatcher.set_deadline(cometsWatcher.evaluation_cutoff(cutoff,resultsDB.incumbent_runtime(os.path.normpath(os.path.join(src,dirPlots)),'MaxPHA')),startTime)
+# Check out a workspace: a copy of the template directory with the models already initialized (prepared only once), reset to its original content
+workspace=workspacePool.checkout(src,dst,synKtPHAFLYCOP.initialize_models)
+os.chdir(workspace['dir'])
 
 if not os.path.exists(dirPlots):
-    os.makedirs(dirPlots)
-    
+    os.makedirs(dirPlots,exist_ok=True) # exist_ok: other concurrent evaluations (FLYCOPdriver.py) could create it at the same time
 
-# At a higher level: Running the wrapper-script in SMAC: 
-avgfitness,sdfitness=synKtPHAFLYCOP.synKtPHAFLYCOP_oneConf(sucrPer,biomassSynecho,biomassKT,nh4,'MaxPHA',1000,dirPlots,3)
 
-# Print wrapper Output:
-print('Result of algorithm run: SAT, 0, 0, '+str(1-avgfitness)+', 0, '+str(seed)+', '+str(sdfitness)) # fitness maximize
-#print('Result of algorithm run: SAT, 0, 0, '+str(avgfitness)+', 0, '+str(seed)+', '+str(sdfitness)) # fitness minimize
+# At a higher level: Running the wrapper-script in SMAC: 
+try:
+    avgfitness,sdfitness=synKtPHAFLYCOP.synKtPHAFLYCOP_oneConf(sucrPer,biomassSynecho,biomassKT,nh4,'MaxPHA',1000,dirPlots,3)
+except cometsWatcher.CutoffExceeded:
+    avgfitness=None # COMETS stopped at the cutoff: reported as TIMEOUT
 
-# Remove the temporal dir for this run result
+# Release the workspace for this run result (its content is reset to the prepared template)
 os.chdir('..')
-shutil.rmtree(dst)
+workspacePool.release(workspace)
 
 
+# Print wrapper Output:
+runtime=str(round(time.time()-startTime,2))
+if avgfitness is None:
+    print('Result of algorithm run: TIMEOUT, '+runtime+', 0, 1, 0, '+str(seed)+', 0') # fitness 0 (as a crashed run)
+else:
+    print('Result of algorithm run: SAT, '+runtime+', 0, '+str(1-avgfitness)+', 0, '+str(seed)+', '+str(sdfitness)) # fitness maximize
+    #print('Result of algorithm run: SAT, '+runtime+', 0, '+str(avgfitness)+', 0, '+str(seed)+', '+str(sdfitness)) # fitness minimize
+
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Check of cometsLogIO against the shell pipelines it replaced (egrep, sed, awk, paste over the COMETS logs), on short logs in fixtures/:
+# media_log_test.txt (3 metabolites, cycles 0-5), total_biomass_log_test.txt (2 strains, cycles 0-5) and flux_log_test.txt (2 models,
+# 4 reactions, cycles 1-6). The legacy commands are those of plot_biomassX2_vs_2mediaItem.sh and coGrowth4EcoliFLYCOP.py before cometsLogIO.
+# Call (from FLYCOP root directory):
+#   python3 -m pytest Scripts/tests
+
+import os
+import os.path
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cometsLogIO
+
+fixturesDir=os.path.join(os.path.dirname(os.path.abspath(__file__)),'fixtures')
+
+# Legacy plot_biomassX2_vs_2mediaItem.sh, without the plot: writes biomass_vs_<met1>_<met2>_<suffix>.txt
+legacyBiomassVsMedia=r'''
+suffix=$1
+met1=$2
+met2=$3
+outFile="biomass_vs_"${met1}_${met2}_${suffix}".txt"
+numMet1=`head -n1 media_log_${suffix}.txt | sed "s/.*{ //" | sed "s/}.*//" | sed "s/'//g" | sed "s/, /\n/g" | egrep -w -n ${met1} | cut -d: -f1`
+numMet2=`head -n1 media_log_${suffix}.txt | sed "s/.*{ //" | sed "s/}.*//" | sed "s/'//g" | sed "s/, /\n/g" | egrep -w -n ${met2} | cut -d: -f1`
+met1File="media_log_substrate_"${met1}".txt"
+egrep '\{'$numMet1'\}' media_log_${suffix}.txt | sed "s/media_//" | sed "s/{$numMet1}//" | sed "s/(1, 1)//" | sed "s/sparse.*/0.0/" | sed "s/;$//" | sed "s/\ =\ /\t/" | awk -F"\t" 'BEGIN{oldCycle=0;value=-1}{if($1!=oldCycle){print value; oldCycle=$1; value=$2}else{value=$2}}END{print value}' > $met1File
+met2File="media_log_substrate_"${met2}".txt"
+egrep '\{'$numMet2'\}' media_log_${suffix}.txt | sed "s/media_//" | sed "s/{$numMet2}//" | sed "s/(1, 1)//" | sed "s/sparse.*/0.0/" | sed "s/;$//" | sed "s/\ =\ /\t/" | awk -F"\t" 'BEGIN{oldCycle=0;value=-1}{if($1!=oldCycle){print value; oldCycle=$1; value=$2}else{value=$2}}END{print value}' > $met2File
+paste -d'\t' total_biomass_log_${suffix}.txt ${met1File} ${met2File} > $outFile
+rm ${met1File} ${met2File}
+'''
+
+
+################################################################
+### FUNCTION legacy_mean_positive_flux #########################
+# Legacy mean of the positive fluxes of the reaction in column numRxn (1-based, .cmt order) of a model, in numCycles+1 rows from iniCycle.
+def legacy_mean_positive_flux(model,iniCycle,numCycles,numRxn):
+    return float(subprocess.check_output([r'egrep "fluxes\{.*\}\{1\}\{1\}\{'+str(model)+r'\}" flux_log_test.txt | egrep -A'+str(numCycles)+r' "fluxes\{"'+str(iniCycle)+r'"\}\{1\}\{1\}\{'+str(model)+r'\}" | cut -d"=" -f2 | cut -d" " -f'+str(numRxn+1)+' | awk \'{if($1>0){sum+=$1}} END {if(NR>0){print sum/NR}}\''], shell=True))
+### end-function-legacy_mean_positive_flux
+################################################################
+
+
+################################################################
+### CLASS TestCometsLogIO ######################################
+@unittest.skipIf(shutil.which('bash') is None or shutil.which('egrep') is None or shutil.which('awk') is None,'legacy shell pipelines need bash, egrep and awk')
+class TestCometsLogIO(unittest.TestCase):
+    def setUp(self):
+        self.cwd=os.getcwd()
+        self.tmpDir=tempfile.mkdtemp()
+        for fixture in os.listdir(fixturesDir):
+            shutil.copy(os.path.join(fixturesDir,fixture),self.tmpDir)
+        os.chdir(self.tmpDir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpDir)
+
+    def test_biomass_vs_media(self):
+        subprocess.check_call(['bash','-c',legacyBiomassVsMedia,'legacy','test','glc_D','ac'])
+        legacy=np.loadtxt('biomass_vs_glc_D_ac_test.txt',ndmin=2)
+        table=cometsLogIO.biomass_vs_media(cometsLogIO.read_total_biomass_log('total_biomass_log_test.txt'),cometsLogIO.read_media_log('media_log_test.txt'),['glc_D','ac'])
+        np.testing.assert_array_equal(table,legacy)
+        # The table file written by python (command line of plot_*.sh) has the same values
+        cometsLogIO.write_table('biomass_vs_glc_D_ac_py.txt',table)
+        np.testing.assert_array_equal(np.loadtxt('biomass_vs_glc_D_ac_py.txt',ndmin=2),legacy)
+
+    def test_read_media_log(self):
+        media=cometsLogIO.read_media_log('media_log_test.txt')
+        self.assertEqual(media['names'],['glc_D[e]','ac[e]','o2[e]'])
+        np.testing.assert_array_equal(media['cycles'],np.arange(6))
+        subprocess.check_call(['bash','-c',legacyBiomassVsMedia,'legacy','test','ac','o2'])
+        legacy=np.loadtxt('biomass_vs_ac_o2_test.txt',ndmin=2)
+        np.testing.assert_array_equal(media['media'][:,[media['index']['ac'],media['index']['o2']]],legacy[:,3:])
+
+    def test_biomass_vs_media_aligned_by_cycle(self):
+        # Media log written every 2 cycles: each biomass row is matched with the media of the same cycle, not of the same position
+        with open('media_log_test.txt') as f:
+            lines=[line for line in f if line.startswith('media_names') or int(line[6:line.index('{')])%2==0]
+        biomass=cometsLogIO.read_total_biomass_log('total_biomass_log_test.txt')
+        media=cometsLogIO.read_media_log(lines)
+        full=cometsLogIO.read_media_log('media_log_test.txt')
+        table=cometsLogIO.biomass_vs_media(biomass,media,['glc_D','ac'])
+        np.testing.assert_array_equal(table[:,0],[0,2,4])
+        np.testing.assert_array_equal(table,cometsLogIO.biomass_vs_media(biomass,full,['glc_D','ac'])[[0,2,4]])
+        # Media log cut before the biomass log: only the cycles in both
+        table=cometsLogIO.biomass_vs_media(biomass[1:],media,['glc_D'])
+        np.testing.assert_array_equal(table[:,0],[2,4])
+
+    def test_mean_positive_flux(self):
+        reactionNames={1:['EX_glc','EX_ac','BIOMASS','EX_o2'],2:['EX_glc','EX_ac','BIOMASS','EX_o2']}
+        fluxes=cometsLogIO.read_flux_log('flux_log_test.txt',reactionNames)
+        for model in [1,2]:
+            for iniCycle,numCycles in [(1,0),(2,2),(1,5),(3,3)]:
+                for numRxn,rxnId in enumerate(reactionNames[model][1:3],2):
+                    self.assertAlmostEqual(cometsLogIO.mean_positive_flux(fluxes[model],iniCycle,numCycles,rxnId),
+                                           legacy_mean_positive_flux(model,iniCycle,numCycles,numRxn),places=6)
+        self.assertIsNone(cometsLogIO.mean_positive_flux(fluxes[1],7,2,'BIOMASS'))
+### end-class-TestCometsLogIO
+################################################################
+
+
+if __name__ == '__main__':
+    unittest.main()
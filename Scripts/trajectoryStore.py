@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Binary store of the biomass, media and flux trajectories of the runs of a configuration, used by the consortia pipelines (*FLYCOP.py)
+# instead of keeping the text logs of each run (total_biomass_log_runN.txt, media_log_runN.txt, flux_log_runN.txt) in IndividualRunsResults.
+# Each run saves its arrays (save_run, a trajectory_runN.npz part, as the logs moved there before), and the parts of all the runs are then
+# gathered in the store of the configuration (gather_runs), one chunk of arrays per run:
+#  - 'npz': IndividualRunsResults/trajectories.npz, compressed.
+#  - 'npy': IndividualRunsResults/trajectories/, one .npy file per array, read memory-mapped.
+# Example: >>import trajectoryStore
+#          >>trajectoryStore.save_run('IndividualRunsResults',0,biomass,media,fluxes)  # biomass, media, fluxes: as read by cometsLogIO
+#          >>trajectoryStore.gather_runs('IndividualRunsResults')
+#          >>acetate=trajectoryStore.load_media('IndividualRunsResults','ac')  # {run: (cycles, concentrations)}
+#          >>biomass,media,fluxes=trajectoryStore.load_trajectory('IndividualRunsResults',0)
+#
+# Environment variables:
+#  FLYCOP_TRAJECTORY_STORE: 'npz' or 'npy' to keep the trajectories of the runs in a binary store (default: 'text', the COMETS logs).
+#  FLYCOP_TRAJECTORY_FLOAT32: 1 to store values as float32, half the size (default: 0, float64).
+
+import os
+import os.path
+import re
+import shutil
+import numpy as np
+import cometsLogIO
+
+
+################################################################
+### FUNCTION store_format, enabled, store_dtype ################
+def store_format():
+    storeFormat=os.environ.get('FLYCOP_TRAJECTORY_STORE','text')
+    if storeFormat not in ['text','npz','npy']:
+        raise ValueError('Unknown FLYCOP_TRAJECTORY_STORE: '+storeFormat+" (expected 'text', 'npz' or 'npy')")
+    return storeFormat
+
+def enabled():
+    return store_format()!='text'
+
+def store_dtype():
+    return np.float32 if os.environ.get('FLYCOP_TRAJECTORY_FLOAT32','0')=='1' else np.float64
+### end-function-store_format, enabled, store_dtype
+################################################################
+
+
+################################################################
+### FUNCTION save_run ##########################################
+def save_run(resultsDir,i,biomass,media,fluxes=None,objectives={}):
+    '''
+    Call: save_run(resultsDir,i,biomass,media,fluxes,objectives)
+
+    INPUTS: resultsDir: directory of the results of the configuration (e.g. 'IndividualRunsResults').
+            i: number of the run (replicate).
+            biomass: total biomass array, as read_total_biomass_log (cycles x (1+strains)).
+            media: media, as read_media_log (only 'cycles', 'media' and 'names' are stored).
+            fluxes: flux tables by model number, as read_flux_log (None: without fluxes).
+            objectives: {model number: id of its objective reaction}, as cometsLogIO.cmt_objective.
+    OUTPUT: resultsDir/trajectory_run<i>.npz: arrays of the run (uncompressed), to be gathered in the store of the configuration by gather_runs.
+    '''
+    dtype=store_dtype()
+    arrays={'biomass':np.asarray(biomass[:,1:],dtype=dtype),'biomass_cycles':np.asarray(biomass[:,0],dtype=np.int32),
+            'media':np.asarray(media['media'],dtype=dtype),'media_cycles':np.asarray(media['cycles'],dtype=np.int32),'media_names':np.array(media['names'],dtype=str)}
+    if fluxes is not None:
+        for model,fluxTable in fluxes.items():
+            names=sorted(fluxTable['index'],key=fluxTable['index'].get)
+            arrays['flux'+str(model)]=np.asarray(fluxTable['fluxes'],dtype=dtype)
+            arrays['flux'+str(model)+'_cycles']=np.asarray(fluxTable['cycles'],dtype=np.int32)
+            arrays['flux'+str(model)+'_reactions']=np.array(names,dtype=str)
+    for model,objRxn in objectives.items():
+        arrays['objective'+str(model)]=np.array(objRxn,dtype=str)
+    np.savez(os.path.join(resultsDir,'trajectory_run'+str(i)+'.npz'),**arrays)
+### end-function-save_run
+################################################################
+
+
+################################################################
+### FUNCTION remove_logs #######################################
+# Remove the text logs of a run already saved in the store (those not written, e.g. consumed through named pipes, are skipped).
+def remove_logs(logFiles):
+    for logFile in logFiles:
+        if os.path.exists(logFile):
+            os.remove(logFile)
+### end-function-remove_logs
+################################################################
+
+
+################################################################
+### FUNCTION run_parts, remove_parts ###########################
+# Parts saved by the runs in resultsDir: {run: trajectory_run<i>.npz file}, and their removal (e.g. once archived, without store).
+def run_parts(resultsDir):
+    parts={}
+    for fileName in os.listdir(resultsDir):
+        match=re.match(r'trajectory_run(\d+)\.npz$',fileName)
+        if match:
+            parts[int(match.group(1))]=os.path.join(resultsDir,fileName)
+    return parts
+
+def remove_parts(resultsDir):
+    for partFile in run_parts(resultsDir).values():
+        os.remove(partFile)
+### end-function-run_parts, remove_parts
+################################################################
+
+
+################################################################
+### FUNCTION gather_runs #######################################
+# Gather the parts saved by the runs (trajectory_run<i>.npz) in resultsDir in the store of the configuration in storeDir (default: resultsDir),
+# with arrays named 'run<i>.<array>', keeping the runs already in the store. Parts are removed unless removeParts is False.
+def gather_runs(resultsDir,storeDir=None,storeFormat=None,removeParts=True):
+    parts=run_parts(resultsDir)
+    if(len(parts)==0):
+        return
+    if storeDir is None:
+        storeDir=resultsDir
+    if storeFormat is None:
+        storeFormat=store_format()
+    if not(os.path.exists(storeDir)):
+        os.makedirs(storeDir,exist_ok=True)
+    if(storeFormat=='npy'):
+        arraysDir=os.path.join(storeDir,'trajectories')
+        if not(os.path.exists(arraysDir)):
+            os.makedirs(arraysDir)
+        for i,partFile in parts.items():
+            with np.load(partFile) as part:
+                for name in part.files:
+                    np.save(os.path.join(arraysDir,'run'+str(i)+'.'+name+'.npy'),part[name])
+    else:
+        storeFile=os.path.join(storeDir,'trajectories.npz')
+        arrays={}
+        if os.path.exists(storeFile):
+            with np.load(storeFile) as store:
+                arrays={name:store[name] for name in store.files}
+        for i,partFile in parts.items():
+            with np.load(partFile) as part:
+                arrays.update({'run'+str(i)+'.'+name:part[name] for name in part.files})
+        np.savez_compressed(storeFile+'.tmp.npz',**arrays)
+        shutil.move(storeFile+'.tmp.npz',storeFile)
+    if removeParts:
+        remove_parts(resultsDir)
+### end-function-gather_runs
+################################################################
+
+
+################################################################
+### FUNCTION open_store, store_names, store_runs ###############
+# Arrays of the store in resultsDir: {name: array}, memory-mapped in a 'npy' store, and decompressed when accessed in a 'npz' one.
+def open_store(resultsDir):
+    storeDir=os.path.join(resultsDir,'trajectories')
+    if os.path.isdir(storeDir):
+        return {fileName[:-4]:np.load(os.path.join(storeDir,fileName),mmap_mode='r') for fileName in os.listdir(storeDir) if fileName.endswith('.npy')}
+    return np.load(os.path.join(resultsDir,'trajectories.npz'))
+
+def store_names(store):
+    return store.files if hasattr(store,'files') else list(store)
+
+# Numbers of the runs in a store, sorted.
+def store_runs(store):
+    return sorted(set(int(name.split('.')[0][3:]) for name in store_names(store)))
+### end-function-open_store, store_names, store_runs
+################################################################
+
+
+################################################################
+### FUNCTION load_trajectory ###################################
+def load_trajectory(resultsDir,i):
+    '''
+    Call: biomass, media, fluxes = load_trajectory(resultsDir,i)
+
+    INPUTS: resultsDir: directory with the store of the configuration (see gather_runs).
+            i: number of the run.
+    OUTPUT: biomass, media, fluxes: as read_total_biomass_log, read_media_log (without 'offsets') and read_flux_log from the logs of that run,
+            so they can be used by cometsLogIO functions (e.g. biomass_vs_media, flux_at). fluxes is {} if they were not stored, and each
+            flux table has also 'objective' (id of the objective reaction of that model) if it was given to save_run.
+    '''
+    store=open_store(resultsDir)
+    prefix='run'+str(i)+'.'
+    biomass=np.hstack([np.asarray(store[prefix+'biomass_cycles'],dtype=float).reshape(-1,1),store[prefix+'biomass']])
+    names=[str(name) for name in store[prefix+'media_names']]
+    media={'cycles':np.asarray(store[prefix+'media_cycles'],dtype=int),'media':store[prefix+'media'],'names':names,'index':cometsLogIO.media_index(names)}
+    fluxes={}
+    for name in store_names(store):
+        match=re.match(re.escape(prefix)+r'flux(\d+)$',name)
+        if match:
+            model=int(match.group(1))
+            fluxes[model]={'cycles':np.asarray(store[name+'_cycles'],dtype=int),'fluxes':store[name],
+                           'index':{str(rxnId):x for x,rxnId in enumerate(store[name+'_reactions'])}}
+            if prefix+'objective'+str(model) in store_names(store):
+                fluxes[model]['objective']=str(store[prefix+'objective'+str(model)])
+    return biomass,media,fluxes
+### end-function-load_trajectory
+################################################################
+
+
+################################################################
+### FUNCTION load_biomass, load_media, load_flux ###############
+# Trajectory of one strain (1-based, as in the logs), metabolite (id with or without compartment) or reaction of a strain in all the runs
+# of the store: {run: (cycles, values)}. Runs without fluxes of that strain are skipped in load_flux.
+def load_biomass(resultsDir,strain):
+    store=open_store(resultsDir)
+    return {i:(store['run'+str(i)+'.biomass_cycles'],store['run'+str(i)+'.biomass'][:,strain-1]) for i in store_runs(store)}
+
+def load_media(resultsDir,met):
+    store=open_store(resultsDir)
+    trajectories={}
+    for i in store_runs(store):
+        index=cometsLogIO.media_index([str(name) for name in store['run'+str(i)+'.media_names']])
+        trajectories[i]=(store['run'+str(i)+'.media_cycles'],store['run'+str(i)+'.media'][:,index[met]])
+    return trajectories
+
+def load_flux(resultsDir,strain,rxnId):
+    store=open_store(resultsDir)
+    names=store_names(store)
+    trajectories={}
+    for i in store_runs(store):
+        name='run'+str(i)+'.flux'+str(strain)
+        if name in names:
+            reactions=[str(reaction) for reaction in store[name+'_reactions']]
+            trajectories[i]=(store[name+'_cycles'],store[name][:,reactions.index(rxnId)])
+    return trajectories
+### end-function-load_biomass, load_media, load_flux
+################################################################
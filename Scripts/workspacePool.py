@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+
+############ FLYCOP ############
+# Author: FLYCOP contributors
+# 2026
+################################
+
+# Pool of prepared working directories for the evaluation of consortium configurations (used by *_wrapperFLYCOP_v*.py).
+# 1) The template directory is prepared only once: copied to <template>_prepared, and initialize_models() run inside it.
+# 2) Each evaluation checks out a free workspace <dst>_<i> (a copy of the prepared template), locked while it is in use,
+#    and it is reset to the prepared content (only removing new files and restoring modified ones) when it is checked out and released.
+# So, per-evaluation setup does not copy the template nor initialize GEMs again.
+# Workspaces are created in the current directory (MicrobialCommunities), at the same level as the template, to preserve relative paths.
+#
+# Call from a wrapper:
+#   workspace=workspacePool.checkout(src,dst,ecoliLongTermFLYCOP.initialize_models)
+#   os.chdir(workspace['dir'])
+#   ...
+#   os.chdir('..')
+#   workspacePool.release(workspace)
+# Call from command line (in MicrobialCommunities directory):
+#   python3 ../Scripts/workspacePool.py prepare <templateDir> <consortiumPrefix>    # one-time preparation, e.g. ecoliLongTerm_TemplateOptimizeConsortiumV0 ecoliLongTerm
+#   python3 ../Scripts/workspacePool.py clean <templateDir> <dst>                   # remove prepared template and workspaces of a pool
+
+import os
+import os.path
+import sys
+import fcntl
+import glob
+import json
+import shutil
+import importlib
+
+manifestName='.workspaceManifest.json'
+
+
+################################################################
+### FUNCTION dir_manifest ######################################
+# {relativePath: [size, mtime_ns]} of every file in a directory (except the manifest itself), and {relativePath: None} of every subdirectory
+# (so empty directories of the template are also kept by reset)
+def dir_manifest(path):
+    manifest={}
+    for root,dirs,files in os.walk(path):
+        for name in dirs:
+            if not os.path.islink(os.path.join(root,name)):
+                manifest[os.path.relpath(os.path.join(root,name),path)]=None
+        for name in files:
+            filePath=os.path.join(root,name)
+            relPath=os.path.relpath(filePath,path)
+            if relPath!=manifestName:
+                st=os.lstat(filePath)
+                manifest[relPath]=[st.st_size,st.st_mtime_ns]
+    return manifest
+### end-function-dir_manifest
+################################################################
+
+
+################################################################
+### FUNCTION prepared_dir ######################################
+def prepared_dir(src):
+    return os.path.normpath(src)+'_prepared'
+### end-function-prepared_dir
+################################################################
+
+
+################################################################
+### FUNCTION prepare ###########################################
+def prepare(src,initializeFunction):
+    '''
+    Call: prepared = prepare(src,initializeFunction)
+
+    INPUTS: src: template directory (e.g. 'ecoliLongTerm_TemplateOptimizeConsortiumV0/').
+            initializeFunction: initialize_models() function of the consortium, run inside the prepared template.
+    OUTPUT: prepared: prepared template directory. It is only built again if the template content changes.
+    '''
+    prepared=prepared_dir(src)
+    srcManifest=dir_manifest(src)
+    with open(prepared+'.lock','a') as lockFile:
+        fcntl.flock(lockFile,fcntl.LOCK_EX)
+        manifestFile=os.path.join(prepared,manifestName)
+        if os.path.exists(manifestFile):
+            with open(manifestFile) as f:
+                if(json.load(f)['source']==srcManifest):
+                    return prepared
+            shutil.rmtree(prepared)
+        elif os.path.exists(prepared):
+            shutil.rmtree(prepared)
+        shutil.copytree(src,prepared)
+        path=os.getcwd()
+        os.chdir(prepared)
+        try:
+            initializeFunction()
+        finally:
+            os.chdir(path)
+        with open(manifestFile,'w') as f:
+            json.dump({'source':srcManifest,'prepared':dir_manifest(prepared)},f)
+    return prepared
+### end-function-prepare
+################################################################
+
+
+################################################################
+### FUNCTION reset #############################################
+# Restore the workspace to the prepared template content: remove files/directories not in the manifest of the prepared template,
+# create again missing directories and copy again missing or modified files.
+def reset(workspaceDir,prepared,preparedManifest):
+    for root,dirs,files in os.walk(workspaceDir,topdown=True):
+        relRoot=os.path.relpath(root,workspaceDir)
+        for name in list(dirs):
+            relPath=os.path.normpath(os.path.join(relRoot,name))
+            if os.path.islink(os.path.join(root,name)):
+                os.remove(os.path.join(root,name))
+                dirs.remove(name)
+            elif(relPath not in preparedManifest or preparedManifest[relPath] is not None):
+                shutil.rmtree(os.path.join(root,name))
+                dirs.remove(name)
+        for name in files:
+            relPath=os.path.normpath(os.path.join(relRoot,name))
+            if(relPath not in preparedManifest or preparedManifest[relPath] is None):
+                os.remove(os.path.join(root,name))
+    for relPath,fileStat in preparedManifest.items():
+        filePath=os.path.join(workspaceDir,relPath)
+        if fileStat is None:
+            os.makedirs(filePath,exist_ok=True)
+            continue
+        size,mtime=fileStat
+        try:
+            st=os.lstat(filePath)
+            if [st.st_size,st.st_mtime_ns]==[size,mtime]:
+                continue
+            os.remove(filePath)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(filePath),exist_ok=True)
+        shutil.copy2(os.path.join(prepared,relPath),filePath)
+### end-function-reset
+################################################################
+
+
+################################################################
+### FUNCTION checkout ##########################################
+def checkout(src,dst,initializeFunction):
+    '''
+    Call: workspace = checkout(src,dst,initializeFunction)
+
+    INPUTS: src: template directory (e.g. 'ecoliLongTerm_TemplateOptimizeConsortiumV0/').
+            dst: prefix of the workspaces in this pool (e.g. 'ecoliLongTerm_TestTempV11'). Workspaces are <dst>_0, <dst>_1, ...
+            initializeFunction: initialize_models() function of the consortium (only run in the one-time preparation).
+    OUTPUT: workspace: dictionary with 'dir' (workspace directory, reset to the prepared template) and the lock held until release(workspace).
+    '''
+    prepared=prepare(src,initializeFunction)
+    with open(os.path.join(prepared,manifestName)) as f:
+        preparedManifest=json.load(f)['prepared']
+    i=0
+    while True:
+        workspaceDir=dst+'_'+str(i)
+        lockFile=open(workspaceDir+'.lock','a')
+        try:
+            fcntl.flock(lockFile,fcntl.LOCK_EX|fcntl.LOCK_NB)
+        except BlockingIOError:
+            lockFile.close()
+            i=i+1
+            continue
+        break
+    if os.path.exists(workspaceDir):
+        reset(workspaceDir,prepared,preparedManifest)
+    else:
+        shutil.copytree(prepared,workspaceDir)
+        os.remove(os.path.join(workspaceDir,manifestName))
+    return {'dir':workspaceDir,'prepared':prepared,'preparedManifest':preparedManifest,'lock':lockFile}
+### end-function-checkout
+################################################################
+
+
+################################################################
+### FUNCTION release ###########################################
+# Reset the workspace (to free disk space from run results) and release it for other evaluations.
+def release(workspace):
+    try:
+        reset(workspace['dir'],workspace['prepared'],workspace['preparedManifest'])
+    finally:
+        fcntl.flock(workspace['lock'],fcntl.LOCK_UN)
+        workspace['lock'].close()
+### end-function-release
+################################################################
+
+
+################################################################
+### FUNCTION clean #############################################
+# Remove the prepared template and all the workspaces of a pool (at the end of a FLYCOP run).
+def clean(src,dst):
+    for path in glob.glob(glob.escape(dst)+'_*'):
+        suffix=path[len(dst)+1:]
+        if suffix.isdigit() and os.path.isdir(path):
+            shutil.rmtree(path)
+        elif suffix.endswith('.lock') and suffix[:-len('.lock')].isdigit():
+            os.remove(path)
+    prepared=prepared_dir(src)
+    if os.path.exists(prepared):
+        shutil.rmtree(prepared)
+    if os.path.exists(prepared+'.lock'):
+        os.remove(prepared+'.lock')
+### end-function-clean
+################################################################
+
+
+if __name__ == '__main__':
+    if(len(sys.argv)==4 and sys.argv[1]=='prepare'):
+        sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        consortiumModule=importlib.import_module(sys.argv[3]+'FLYCOP')
+        print('Prepared template: '+prepare(sys.argv[2],consortiumModule.initialize_models))
+    elif(len(sys.argv)==4 and sys.argv[1]=='clean'):
+        clean(sys.argv[2],sys.argv[3])
+    else:
+        print('Usage: workspacePool.py prepare <templateDir> <consortiumPrefix> | clean <templateDir> <dst>')